@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Gold Mine Productivity Analyzer - Benchmark Suite
+Times every API route (through the Flask test client) and the analysis helpers (called
+directly) against seeded synthetic datasets, and saves the results as JSON.
+Run with: python benchmark.py --sizes 1000,100000 --output bench.json
+Compare:  python benchmark.py --compare baseline.json bench.json
+Load:     python benchmark.py --load --workers 1,2,4 --sizes 100000 --output load.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from threading import Thread
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)  # Add 10000000 with --sizes; seeding it takes minutes
+MAX_DAYS = 3650  # Larger datasets get more sites rather than centuries of history
+REGRESSION_THRESHOLD = 1.25  # --compare flags cases whose p50 grew by more than this factor
+
+ENTRY = {
+    "date": "2026-01-01", "shift": "Day", "goldExtracted": 40.0, "oreProcessed": 1500.0, "workers": 25,
+    "equipmentHours": 200.0, "weather": "Clear", "operationalCost": 20000.0, "site": "Site 1"
+}
+PLANS = [{"workers": 25, "equipmentHours": 200, "oreProcessed": 1200, "shift": shift, "weather": "Clear"} for shift in ("Day", "Evening", "Night")]
+
+# (name, method, path, JSON body); cached insights are timed cold (unique query) and cached
+ROUTES = [
+    ('forecast', 'GET', '/api/ml/forecast', None),
+    ('optimize', 'GET', '/api/ml/optimize', None),
+    ('efficiency', 'GET', '/api/ml/efficiency', None),
+    ('cost-prediction', 'GET', '/api/ml/cost-prediction', None),
+    ('market-analysis', 'GET', '/api/ml/market-analysis', None),
+    ('profitability', 'GET', '/api/ml/profitability', None),
+    ('trends', 'GET', '/api/ml/trends', None),
+    ('percentiles', 'GET', '/api/ml/percentiles', None),
+    ('sites', 'GET', '/api/ml/sites', None),
+    ('forecast-range', 'GET', '/api/ml/forecast?from=2000-01-01', None),
+    ('report-range', 'GET', '/api/ml/report?from=2000-01-01', None),
+    ('chart-production', 'GET', '/api/charts/production', None),
+    ('chart-cost', 'GET', '/api/charts/cost', None),
+    ('chart-shift', 'GET', '/api/charts/shift', None),
+    ('chart-market', 'GET', '/api/charts/market', None),
+    ('scenarios', 'GET', '/api/ml/scenarios', None),
+    ('risk-100k', 'GET', '/api/ml/risk?paths=100000&seed=1', None),
+    ('predict', 'POST', '/api/ml/predict', PLANS),
+    ('models', 'GET', '/api/ml/models', None),
+    ('production-page', 'GET', '/api/production-data?limit=1000', None),
+    ('gold-price', 'GET', '/api/gold-price', None),
+    ('dashboard', 'GET', '/', None),
+    ('metrics', 'GET', '/metrics', None),
+    ('add-entry', 'POST', '/api/production-data', ENTRY),
+]
+# Read endpoints a dashboard polls, cycled through by every --load client
+LOAD_PATHS = [
+    '/api/gold-price', '/api/ml/forecast', '/api/ml/optimize', '/api/ml/profitability', '/api/ml/percentiles',
+    '/api/charts/production', '/api/charts/cost', '/api/production-data?limit=100', '/api/ml/forecast?from=2000-01-01'
+]
+CACHED_ROUTES = {'forecast', 'optimize', 'efficiency', 'cost-prediction', 'market-analysis', 'profitability', 'trends',
+                 'percentiles', 'sites', 'chart-production', 'chart-cost', 'chart-shift'}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def measure(call, iterations, budget):
+    """Time call() after one warm-up: up to `iterations` runs, stopping early (after 3) once budget seconds are spent"""
+    import numpy as np
+
+    call()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < iterations:
+        begin = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - begin)
+        if len(latencies) >= 3 and time.perf_counter() - started > budget:
+            break
+    latencies = np.array(latencies) * 1000
+    return {
+        "iterations": len(latencies),
+        "p50Ms": float(np.percentile(latencies, 50)),
+        "p99Ms": float(np.percentile(latencies, 99)),
+        "meanMs": float(latencies.mean()),
+        "throughput": len(latencies) / (latencies.sum() / 1000),
+        "peakRssMb": peak_rss_mb()
+    }
+
+
+def route_cases(client):
+    """Callables driving each route through the test client"""
+    counter = iter(range(10 ** 9))
+
+    def request(method, path, body, cold):
+        def call():
+            url = path
+            if cold:
+                # A unique query parameter misses the response cache, so the insight is recomputed
+                url += ('&' if '?' in path else '?') + f"bench={next(counter)}"
+            response = client.open(url, method=method, json=body)
+            response.get_data()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return call
+
+    for name, method, path, body in ROUTES:
+        yield f"route:{name}", request(method, path, body, cold=True)
+        if name in CACHED_ROUTES:
+            yield f"route:{name} (cached)", request(method, path, body, cold=False)
+
+
+def helper_cases(gm):
+    """Callables invoking the analysis helpers directly on the seeded state"""
+    import numpy as np
+
+    stats = gm.aggregates.snapshot()
+    models = gm.model_trainer.current()
+    regression = models.models[None].regression
+    view = gm.production_store.view()
+    daily = gm.daily_index.daily()
+    partition = gm.Partition(gm.production_store.view, gm.aggregates, gm.daily_index, gm.production_model)
+    breakeven = gm.calculate_breakeven_price(stats)
+    prices, workers, hours = np.arange(1500, 3001, 10.0), np.arange(15, 36.0), np.arange(100, 301, 10.0)
+    mixes = np.full((1, len(regression.labels['weather'])), 1 / len(regression.labels['weather']))
+
+    yield "helper:aggregate_snapshot", gm.aggregates.snapshot
+    yield "helper:analyze_shift_performance", lambda: gm.analyze_shift_performance(stats)
+    yield "helper:analyze_weather_impact", lambda: gm.analyze_weather_impact(stats)
+    yield "helper:analyze_worker_efficiency", lambda: gm.analyze_worker_efficiency(stats, regression)
+    yield "helper:analyze_equipment_utilization", lambda: gm.analyze_equipment_utilization(stats)
+    yield "helper:analyze_cost_efficiency", lambda: gm.analyze_cost_efficiency(stats)
+    yield "helper:calculate_breakeven_price", lambda: gm.calculate_breakeven_price(stats)
+    yield "helper:analyze_price_sensitivity", lambda: gm.analyze_price_sensitivity(stats, breakeven)
+    yield "helper:daily_index", gm.daily_index.daily
+    yield "helper:regression_fit", gm.production_model.fit
+    yield "helper:seasonal_fit", lambda: gm.SeasonalFit.fit(daily)
+    yield "helper:simulate_scenarios", lambda: gm.simulate_scenarios(regression, stats, prices, workers, hours, mixes)
+    yield "helper:site_analysis", lambda: gm.site_analysis(partition, models.models[None])
+    yield "helper:lttb", lambda: gm.lttb(np.arange(len(view), dtype=np.float64), view['goldExtracted'], 500)
+    yield "helper:generate_training_data", lambda: gm.generate_training_data(days=max(len(view) // 3, 1), seed=1)
+
+
+def run_dataset(rows, seed, iterations, budget, cases):
+    """Seed a fresh store with about `rows` rows and time every case; runs in its own process"""
+    import gold_mine_productivity_analyzere as gm
+
+    gm.GOLD_PRICE_SOURCES.clear()  # Simulated prices only: upstream latency is not what is measured
+    sites = max(1, math.ceil(rows / (len(gm.SHIFT_MULTIPLIERS) * MAX_DAYS)))
+    days = max(1, math.ceil(rows / (len(gm.SHIFT_MULTIPLIERS) * sites)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        gm.create_app({
+            'DATA_PATH': os.path.join(directory, 'bench.db'), 'TRAINING_DAYS': days, 'TRAINING_SITES': sites,
+            'TRAINING_SEED': seed, 'HEADLESS': True
+        })
+        started = time.perf_counter()
+        gm.initialize_state()
+        gm.model_trainer.current(timeout=None)
+        seed_seconds = time.perf_counter() - started
+
+        client = gm.app.test_client()
+        results = []
+        for name, call in [*route_cases(client), *helper_cases(gm)]:
+            if cases and not any(case in name for case in cases):
+                continue
+            try:
+                result = {"name": name, **measure(call, iterations, budget)}
+            except Exception as e:
+                result = {"name": name, "error": str(e)}
+            results.append(result)
+            print(f"  {rows:>9} rows  {name:<45} " + (
+                f"p50 {result['p50Ms']:9.2f} ms  p99 {result['p99Ms']:9.2f} ms" if 'error' not in result else f"FAILED: {result['error']}"
+            ), flush=True)
+
+        gm.production_log.close()
+        # This process is a pool worker, where the risk pool's own atexit shutdown never runs and
+        # exiting would wait on its workers forever
+        gm.risk_pool().shutdown()
+        return {
+            "rows": len(gm.production_store),
+            "sites": sites,
+            "days": days,
+            "seedSeconds": seed_seconds,
+            "peakRssMb": peak_rss_mb(),
+            "results": results
+        }
+
+
+def seed_database(path, rows, seed):
+    """Write a seeded production database (and its snapshots and saved models) for --load; runs in its own process"""
+    import gold_mine_productivity_analyzere as gm
+
+    gm.GOLD_PRICE_SOURCES.clear()
+    sites = max(1, math.ceil(rows / (len(gm.SHIFT_MULTIPLIERS) * MAX_DAYS)))
+    days = max(1, math.ceil(rows / (len(gm.SHIFT_MULTIPLIERS) * sites)))
+    gm.create_app({'DATA_PATH': path, 'TRAINING_DAYS': days, 'TRAINING_SITES': sites, 'TRAINING_SEED': seed, 'HEADLESS': True})
+    gm.initialize_state()
+    gm.model_trainer.current(timeout=None)
+    gm.production_log.close()
+    return {"rows": len(gm.production_store), "sites": sites, "days": days}
+
+
+def start_gunicorn(path, workers, threads, log_path):
+    """Serve the database at path from `workers` gunicorn processes on a free port; returns (process, port)"""
+    config = {'DATA_PATH': path, 'HEADLESS': True}
+    log_file = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads), '-b', '127.0.0.1:0',
+         f"gold_mine_productivity_analyzere:create_app({config!r})"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), stdout=log_file, stderr=subprocess.STDOUT
+    )
+    log_file.close()
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        with open(log_path) as log:
+            listening = re.search(r'Listening at: http://127\.0\.0\.1:(\d+)', log.read())
+        if listening:
+            return process, int(listening.group(1))
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    process.kill()
+    with open(log_path) as log:
+        raise RuntimeError(f"gunicorn did not start:\n{log.read()[-2000:]}")
+
+
+def stop_gunicorn(process):
+    process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def drive_load(port, paths, seconds, threads):
+    """GET paths round-robin from `threads` keep-alive connections for `seconds`; returns (latencies in ms, errors)
+
+    Runs in client processes, so the load generator is not one interpreter's GIL.
+    """
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        for request_number in range(offset, 10 ** 12):
+            begin = time.perf_counter()
+            if begin >= deadline:
+                break
+            try:
+                connection.request('GET', paths[request_number % len(paths)])
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            (latencies if ok else errors).append((time.perf_counter() - begin) * 1000)
+        connection.close()
+
+    clients = [Thread(target=client, args=(offset,)) for offset in range(threads)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return latencies, len(errors)
+
+
+def run_load(sizes, seed, worker_counts, clients, client_processes, seconds, warmup, threads, cases):
+    """For each dataset size, serve it from each worker count behind gunicorn and drive it with concurrent clients"""
+    import numpy as np
+
+    paths = [path for path in LOAD_PATHS if not cases or any(case in path for case in cases)]
+    report = report_header(seed)
+    report["load"] = {"clients": clients, "clientProcesses": client_processes, "seconds": seconds, "threads": threads, "paths": paths}
+    context = multiprocessing.get_context('spawn')
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'load.db')
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                dataset = pool.submit(seed_database, path, rows, seed).result()
+            dataset["results"] = []
+            for workers in worker_counts:
+                process, port = start_gunicorn(path, workers, threads, os.path.join(directory, f'gunicorn-{workers}.log'))
+                try:
+                    with ProcessPoolExecutor(client_processes, mp_context=context) as pool:
+                        share = [clients // client_processes + (index < clients % client_processes) for index in range(client_processes)]
+                        # Warm-up: every worker loads the snapshot and fills its caches on its first requests
+                        list(pool.map(drive_load, [port] * client_processes, [paths] * client_processes, [warmup] * client_processes, share))
+                        runs = list(pool.map(drive_load, [port] * client_processes, [paths] * client_processes, [seconds] * client_processes, share))
+                finally:
+                    stop_gunicorn(process)
+                latencies = np.array([latency for run_latencies, _ in runs for latency in run_latencies])
+                result = {
+                    "name": f"load:{workers} workers",
+                    "workers": workers,
+                    "requests": len(latencies),
+                    "errors": sum(errors for _, errors in runs),
+                    "throughput": len(latencies) / seconds,
+                    "p50Ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                    "p99Ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+                    "meanMs": float(latencies.mean()) if len(latencies) else None
+                }
+                dataset["results"].append(result)
+                baseline = dataset["results"][0]["throughput"]
+                print(f"  {dataset['rows']:>9} rows  {workers:>3} workers  {result['throughput']:9.1f} req/s"
+                      f" (x{result['throughput'] / baseline if baseline else 0:4.2f})  p50 {result['p50Ms'] or 0:8.2f} ms"
+                      f"  p99 {result['p99Ms'] or 0:8.2f} ms  errors {result['errors']}", flush=True)
+            report["datasets"].append(dataset)
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_header(seed):
+    import numpy as np
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "datasets": []
+    }
+
+
+def run(sizes, seed, iterations, budget, cases):
+    """Benchmark each size in a fresh process, so state and peak RSS do not carry over"""
+    report = report_header(seed)
+    context = multiprocessing.get_context('spawn')
+    for rows in sizes:
+        # Not a multiprocessing.Pool: its daemonic workers could not start the risk endpoint's process pool
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            report["datasets"].append(pool.submit(run_dataset, rows, seed, iterations, budget, cases).result())
+    return report
+
+
+def compare(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """Print p50 changes between two reports; returns the number of cases that regressed beyond threshold"""
+    with open(baseline_path) as baseline_file, open(current_path) as current_file:
+        baseline, current = json.load(baseline_file), json.load(current_file)
+
+    def index(report):
+        return {
+            (dataset['rows'], result['name']): result
+            for dataset in report['datasets'] for result in dataset['results'] if 'error' not in result
+        }
+
+    before, after = index(baseline), index(current)
+    regressions = 0
+    print(f"{baseline.get('commit') or baseline_path} -> {current.get('commit') or current_path}")
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key]['p50Ms'] / before[key]['p50Ms'] if before[key]['p50Ms'] else math.inf
+        flag = 'REGRESSION' if ratio > threshold else ''
+        regressions += bool(flag)
+        print(f"  {key[0]:>9} rows  {key[1]:<45} {before[key]['p50Ms']:9.2f} -> {after[key]['p50Ms']:9.2f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gold Mine Productivity Analyzer benchmarks")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="Comma-separated dataset sizes in rows")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the synthetic data generator")
+    parser.add_argument('--iterations', type=int, default=50, help="Maximum timed runs per case")
+    parser.add_argument('--budget', type=float, default=2.0, help="Seconds per case after which timing stops (minimum 3 runs)")
+    parser.add_argument('--cases', default='', help="Comma-separated substrings; only matching cases run")
+    parser.add_argument('--output', default='bench.json', help="Where to write the JSON report")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Compare two reports instead of running")
+    parser.add_argument('--load', action='store_true', help="Load-test gunicorn worker counts with concurrent HTTP clients instead")
+    parser.add_argument('--workers', default=','.join(str(2 ** power) for power in range(int(math.log2(os.cpu_count() or 1)) + 1)),
+                        help="Comma-separated gunicorn worker counts for --load (default: powers of two up to the CPU count)")
+    parser.add_argument('--clients', type=int, default=64, help="Concurrent keep-alive client connections for --load")
+    parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 1) // 4),
+                        help="Processes the --load clients are spread over; they share the machine with the workers")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker for --load")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds per worker count for --load")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Unmeasured seconds of load before each --load measurement")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    cases = [case for case in args.cases.split(',') if case]
+    if args.load:
+        worker_counts = [int(workers) for workers in args.workers.split(',')]
+        client_processes = min(args.client_processes, args.clients)
+        report = run_load(sizes, args.seed, worker_counts, args.clients, client_processes, args.duration, args.warmup, args.threads, cases)
+    else:
+        report = run(sizes, args.seed, args.iterations, args.budget, cases)
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
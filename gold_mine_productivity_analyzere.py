@@ -5,19 +5,80 @@ AI-Powered Mining Operations Optimization with ML Predictions
 Run with: python gold_mine_productivity_analyzer.py
 """
 
-from flask import Flask, render_template_string, request, jsonify
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import argparse
+import bisect
+import contextlib
+from collections import namedtuple, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import csv
+import functools
+import gzip
+import hashlib
+import hmac
+import importlib.util
+import io
+import itertools
 import json
+import logging
+import mimetypes
+import mmap
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import queue
+import re
+import sqlite3
+import atexit
 import random
-import time
 import math
-import numpy as np
-from datetime import datetime, timedelta
-import webbrowser
-from threading import Timer
+from datetime import datetime
+from threading import Timer, Lock, Thread, Event, Condition, get_ident
+import urllib.parse
 import urllib.request
 import urllib.error
 
+logger = logging.getLogger(__name__)
+
+def lazy_import(name):
+    """Import a module on first attribute access, keeping it off the startup path"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+np = lazy_import('numpy')
+
+DEFAULT_CONFIG = {
+    'DATA_PATH': os.environ.get('GOLD_MINE_DATA', 'gold_mine_production.db'),
+    'TRAINING_DAYS': 90,
+    'TRAINING_SITES': 1,
+    'TRAINING_SEED': None,
+    'HEADLESS': os.environ.get('GOLD_MINE_HEADLESS') == '1',
+    'STARTUP_BUDGET_SECONDS': 0.5,
+    'VENDOR_PATH': os.environ.get('GOLD_MINE_VENDOR', 'vendor'),  # Local copies of Chart.js and Font Awesome, used when present
+    'MODEL_RETRAIN_ROWS': 100,  # Retrain once this many rows arrived since the last model snapshot...
+    'MODEL_RETRAIN_SECONDS': 60,  # ...or once any have and the snapshot is this old
+    'METRICS_ENABLED': os.environ.get('GOLD_MINE_METRICS', '1') != '0',  # Timing histograms and counters on /metrics
+    'PROFILE_TOKEN': os.environ.get('GOLD_MINE_PROFILE_TOKEN'),  # Requests carrying it in X-Profile-Token are profiled; unset disables profiling
+    'PROFILE_INTERVAL': 0.001  # Seconds between stack samples of a profiled request
+}
+
 app = Flask(__name__)
+app.config.update(DEFAULT_CONFIG)
 
 # HTML Template (embedded)
 HTML_TEMPLATE = """
@@ -28,7 +89,7 @@ HTML_TEMPLATE = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Gold Mine Productivity Analyzer</title>
     <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js" defer></script>
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: linear-gradient(135deg, #f39c12 0%, #d35400 100%); min-height: 100vh; color: #333; }
@@ -141,6 +202,10 @@ HTML_TEMPLATE = """
                             <label for="date">Date</label>
                             <input type="date" id="date" required>
                         </div>
+                        <div class="form-group">
+                            <label for="site">Site / Pit</label>
+                            <input type="text" id="site" placeholder="Site 1">
+                        </div>
                         <div class="form-group">
                             <label for="shift">Shift</label>
                             <select id="shift" required>
@@ -262,6 +327,7 @@ HTML_TEMPLATE = """
 
     <script>
         let productionData = [];
+        let dataVersion = 0; // Rows the server had when we last synced
         let mlModel = null;
         let currentGoldPrice = 2000; // Default fallback price
         let goldPriceHistory = [];
@@ -269,13 +335,62 @@ HTML_TEMPLATE = """
         document.addEventListener('DOMContentLoaded', function() {
             setupFormSubmission();
             updateDisplay();
+            syncProductionData();
             fetchGoldPrice();
             // Set today's date as default
             document.getElementById('date').value = new Date().toISOString().split('T')[0];
-            // Update gold price every 5 minutes
-            setInterval(fetchGoldPrice, 300000);
+            subscribeToEvents();
         });
 
+        let activeInsight = null; // Endpoint behind the insights panel, refreshed when the models retrain
+
+        function subscribeToEvents() {
+            if (!window.EventSource) {
+                // Update gold price every 5 minutes
+                setInterval(fetchGoldPrice, 300000);
+                return;
+            }
+            // The server pushes new entries, price ticks and model versions; EventSource reconnects on its own
+            const events = new EventSource('/api/events');
+            events.addEventListener('entries', event => {
+                const update = JSON.parse(event.data);
+                if (update.version <= dataVersion) {
+                    return; // Our own POST, already applied
+                }
+                if (update.entries && update.version - update.rows === dataVersion) {
+                    keepRecent(update.entries);
+                    dataVersion = update.version;
+                    updateDisplay();
+                } else {
+                    syncProductionData();
+                }
+            });
+            events.addEventListener('price', event => {
+                applyGoldPrice(JSON.parse(event.data));
+                refreshInsights();
+            });
+            events.addEventListener('insights', () => refreshInsights());
+            events.addEventListener('resync', () => {
+                syncProductionData();
+                fetchGoldPrice();
+                refreshInsights();
+            });
+        }
+
+        function refreshInsights() {
+            if (!activeInsight) {
+                return;
+            }
+            fetch(activeInsight)
+            .then(response => response.json())
+            .then(result => {
+                if (result.insights) {
+                    displayMLInsights(result.insights, false);
+                }
+            })
+            .catch(error => console.log('Insight refresh failed'));
+        }
+
         function setupFormSubmission() {
             const form = document.getElementById('production-form');
             form.addEventListener('submit', function(e) {
@@ -287,6 +402,7 @@ HTML_TEMPLATE = """
         function recordProductionData() {
             const formData = {
                 date: document.getElementById('date').value,
+                site: document.getElementById('site').value,
                 shift: document.getElementById('shift').value,
                 goldExtracted: parseFloat(document.getElementById('gold-extracted').value),
                 oreProcessed: parseFloat(document.getElementById('ore-processed').value),
@@ -307,8 +423,13 @@ HTML_TEMPLATE = """
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
                 if (result.success) {
-                    productionData = result.productionData;
-                    updateDisplay();
+                    if (result.version === dataVersion + 1) {
+                        keepRecent([result.productionEntry]);
+                        dataVersion = result.version;
+                        updateDisplay();
+                    } else {
+                        syncProductionData(); // Other entries landed meanwhile
+                    }
                     document.getElementById('production-form').reset();
                     document.getElementById('date').value = new Date().toISOString().split('T')[0];
                     showNotification('Production data recorded successfully!', 'success');
@@ -322,6 +443,45 @@ HTML_TEMPLATE = """
             });
         }
 
+        let pendingSync = null;
+        const RECENT_ENTRIES = 100; // Entries kept: the stats read the last 7, the table the 10 latest by date
+
+        function keepRecent(entries) {
+            productionData.push(...entries);
+            productionData.splice(0, Math.max(productionData.length - RECENT_ENTRIES, 0));
+        }
+
+        function syncProductionData() {
+            // Coalesce overlapping syncs so the same delta is never appended twice
+            if (!pendingSync) {
+                // The first load takes only the latest page; later syncs only the rows added since
+                pendingSync = (dataVersion ? fetchProductionPage(`since=${dataVersion}`) : fetchLatestPage())
+                .catch(error => console.log('Production data sync failed'))
+                .finally(() => { pendingSync = null; });
+            }
+            return pendingSync;
+        }
+
+        function fetchLatestPage() {
+            return fetchProductionPage('latest=1', true);
+        }
+
+        function fetchProductionPage(params, replace = false) {
+            return fetch(`/api/production-data?${params}&limit=${RECENT_ENTRIES}`)
+            .then(response => response.json())
+            .then(result => {
+                if (result.nextCursor !== null) {
+                    return fetchLatestPage(); // More new rows than are kept: skip to the latest page
+                }
+                if (replace) {
+                    productionData = [];
+                }
+                keepRecent(result.productionData);
+                dataVersion = result.version;
+                updateDisplay();
+            });
+        }
+
         function updateDisplay() {
             updateStats();
             displayProductionEntries();
@@ -379,6 +539,12 @@ HTML_TEMPLATE = """
             return (n * sumXY - sumX * sumY) / (n * sumXX - sumX * sumX);
         }
 
+        // Entries carry free text (site names), so every value goes through this before innerHTML
+        const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+        function escapeHtml(value) {
+            return String(value).replace(/[&<>"']/g, character => HTML_ESCAPES[character]);
+        }
+
         function displayProductionEntries() {
             const container = document.getElementById('production-entries-container');
             
@@ -387,9 +553,16 @@ HTML_TEMPLATE = """
                 return;
             }
 
-            const sortedData = [...productionData].sort((a, b) => new Date(b.date) - new Date(a.date));
+            // Ten most recent by date in one pass, rather than sorting the whole history
+            const latestData = [];
+            productionData.forEach(entry => {
+                if (latestData.length === 10 && entry.date <= latestData[9].date) return;
+                const index = latestData.findIndex(other => entry.date > other.date);
+                latestData.splice(index === -1 ? latestData.length : index, 0, entry);
+                latestData.length = Math.min(latestData.length, 10);
+            });
             
-            container.innerHTML = sortedData.slice(0, 10).map(entry => {
+            container.innerHTML = latestData.map(entry => {
                 const efficiency = ((entry.goldExtracted / entry.oreProcessed) * 100).toFixed(2);
                 const costPerOunce = (entry.operationalCost / entry.goldExtracted).toFixed(0);
                 
@@ -400,14 +573,14 @@ HTML_TEMPLATE = """
                 
                 return `
                     <div class="production-entry">
-                        <h4>${entry.date} - ${entry.shift} Shift <span class="${badgeClass}">${badgeText}</span></h4>
+                        <h4>${escapeHtml(entry.date)} - ${escapeHtml(entry.site)}, ${escapeHtml(entry.shift)} Shift <span class="${badgeClass}">${badgeText}</span></h4>
                         <div class="production-details">
-                            <div><strong>Gold:</strong> ${entry.goldExtracted} oz</div>
-                            <div><strong>Ore:</strong> ${entry.oreProcessed} tons</div>
-                            <div><strong>Workers:</strong> ${entry.workers}</div>
-                            <div><strong>Equipment:</strong> ${entry.equipmentHours}h</div>
-                            <div><strong>Weather:</strong> ${entry.weather}</div>
-                            <div><strong>Cost:</strong> $${entry.operationalCost.toLocaleString()}</div>
+                            <div><strong>Gold:</strong> ${escapeHtml(entry.goldExtracted)} oz</div>
+                            <div><strong>Ore:</strong> ${escapeHtml(entry.oreProcessed)} tons</div>
+                            <div><strong>Workers:</strong> ${escapeHtml(entry.workers)}</div>
+                            <div><strong>Equipment:</strong> ${escapeHtml(entry.equipmentHours)}h</div>
+                            <div><strong>Weather:</strong> ${escapeHtml(entry.weather)}</div>
+                            <div><strong>Cost:</strong> $${escapeHtml(entry.operationalCost.toLocaleString())}</div>
                             <div><strong>Efficiency:</strong> ${efficiency}%</div>
                             <div><strong>Cost/oz:</strong> $${costPerOunce}</div>
                         </div>
@@ -424,7 +597,8 @@ HTML_TEMPLATE = """
 
             document.getElementById('loading-overlay').style.display = 'flex';
 
-            fetch('/api/ml/forecast')
+            activeInsight = '/api/ml/forecast';
+            fetch(activeInsight)
             .then(response => response.json())
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
@@ -446,7 +620,8 @@ HTML_TEMPLATE = """
 
             document.getElementById('loading-overlay').style.display = 'flex';
 
-            fetch('/api/ml/optimize')
+            activeInsight = '/api/ml/optimize';
+            fetch(activeInsight)
             .then(response => response.json())
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
@@ -467,7 +642,8 @@ HTML_TEMPLATE = """
 
             document.getElementById('loading-overlay').style.display = 'flex';
 
-            fetch('/api/ml/efficiency')
+            activeInsight = '/api/ml/efficiency';
+            fetch(activeInsight)
             .then(response => response.json())
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
@@ -488,7 +664,8 @@ HTML_TEMPLATE = """
 
             document.getElementById('loading-overlay').style.display = 'flex';
 
-            fetch('/api/ml/cost-prediction')
+            activeInsight = '/api/ml/cost-prediction';
+            fetch(activeInsight)
             .then(response => response.json())
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
@@ -509,7 +686,8 @@ HTML_TEMPLATE = """
 
             document.getElementById('loading-overlay').style.display = 'flex';
 
-            fetch('/api/ml/market-analysis')
+            activeInsight = '/api/ml/market-analysis';
+            fetch(activeInsight)
             .then(response => response.json())
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
@@ -531,7 +709,8 @@ HTML_TEMPLATE = """
 
             document.getElementById('loading-overlay').style.display = 'flex';
 
-            fetch('/api/ml/profitability')
+            activeInsight = '/api/ml/profitability';
+            fetch(activeInsight)
             .then(response => response.json())
             .then(result => {
                 document.getElementById('loading-overlay').style.display = 'none';
@@ -548,34 +727,7 @@ HTML_TEMPLATE = """
         function fetchGoldPrice() {
             fetch('/api/gold-price')
             .then(response => response.json())
-            .then(result => {
-                if (result.success) {
-                    currentGoldPrice = result.price;
-                    goldPriceHistory.push({
-                        price: result.price,
-                        timestamp: new Date().toISOString(),
-                        change: result.change || 0,
-                        source: result.source || 'unknown'
-                    });
-                    
-                    // Keep only last 24 hours of price data
-                    const dayAgo = new Date(Date.now() - 24 * 60 * 60 * 1000);
-                    goldPriceHistory = goldPriceHistory.filter(entry => 
-                        new Date(entry.timestamp) > dayAgo
-                    );
-                    
-                    updateStats();
-                    
-                    // Show data source status
-                    if (result.source === 'intelligent_simulation') {
-                        console.log('Using intelligent market simulation (APIs unavailable)');
-                    } else if (result.source === 'static_fallback') {
-                        console.log('Using static fallback price');
-                    } else {
-                        console.log(`Gold price from: ${result.source}`);
-                    }
-                }
-            })
+            .then(applyGoldPrice)
             .catch(error => {
                 console.log('Gold price fetch failed, using local fallback');
                 // Enhanced local fallback with realistic patterns
@@ -594,20 +746,51 @@ HTML_TEMPLATE = """
             });
         }
 
-        function displayMLInsights(insights) {
+        function applyGoldPrice(result) {
+            if (result.success) {
+                currentGoldPrice = result.price;
+                goldPriceHistory.push({
+                    price: result.price,
+                    timestamp: new Date().toISOString(),
+                    change: result.change || 0,
+                    source: result.source || 'unknown'
+                });
+                
+                // Keep only last 24 hours of price data
+                const dayAgo = new Date(Date.now() - 24 * 60 * 60 * 1000);
+                goldPriceHistory = goldPriceHistory.filter(entry => 
+                    new Date(entry.timestamp) > dayAgo
+                );
+                
+                updateStats();
+                
+                // Show data source status
+                if (result.source === 'intelligent_simulation') {
+                    console.log('Using intelligent market simulation (APIs unavailable)');
+                } else if (result.source === 'static_fallback') {
+                    console.log('Using static fallback price');
+                } else {
+                    console.log(`Gold price from: ${result.source}`);
+                }
+            }
+        }
+
+        function displayMLInsights(insights, scroll = true) {
             const container = document.getElementById('ml-insights-container');
             const section = document.getElementById('ml-insights-section');
             
             container.innerHTML = insights.map(insight => `
                 <div class="ml-insights">
-                    <h3>${insight.title}</h3>
-                    <p>${insight.description}</p>
-                    ${insight.confidence ? `<p><strong>Confidence:</strong> ${insight.confidence}%</p>` : ''}
+                    <h3>${escapeHtml(insight.title)}</h3>
+                    <p>${escapeHtml(insight.description)}</p>
+                    ${insight.confidence ? `<p><strong>Confidence:</strong> ${escapeHtml(insight.confidence)}%</p>` : ''}
                 </div>
             `).join('');
             
             section.style.display = 'block';
-            section.scrollIntoView({ behavior: 'smooth' });
+            if (scroll) {
+                section.scrollIntoView({ behavior: 'smooth' });
+            }
         }
 
         function showChartsSection() {
@@ -618,31 +801,48 @@ HTML_TEMPLATE = """
         function generateCharts() {
             if (productionData.length === 0) return;
 
-            // Destroy existing charts
-            Chart.helpers.each(Chart.instances, function(instance) {
-                instance.destroy();
+            // The server aggregates and downsamples each series to about one point per pixel
+            const points = Math.min(2000, Math.max(100, Math.round(window.innerWidth)));
+            const charts = {
+                production: generateProductionChart,
+                shift: generateShiftChart,
+                cost: generateCostChart,
+                weather: generateWeatherChart,
+                profitability: generateProfitabilityChart,
+                market: generateMarketChart
+            };
+            Object.entries(charts).forEach(([name, generate]) => {
+                fetch(`/api/charts/${name}?points=${points}`)
+                .then(response => response.json())
+                .then(series => {
+                    if (series.error) {
+                        throw new Error(series.error);
+                    }
+                    generate(series);
+                })
+                .catch(error => console.log(`Chart ${name} failed: ${error.message}`));
             });
+        }
 
-            generateProductionChart();
-            generateShiftChart();
-            generateCostChart();
-            generateWeatherChart();
-            generateProfitabilityChart();
-            generateMarketChart();
+        function chartContext(id) {
+            // Charts redraw asynchronously, so replace whatever is on the canvas now
+            const existing = Chart.getChart(id);
+            if (existing) {
+                existing.destroy();
+            }
+            return document.getElementById(id).getContext('2d');
         }
 
-        function generateProductionChart() {
-            const ctx = document.getElementById('productionChart').getContext('2d');
-            
-            const sortedData = [...productionData].sort((a, b) => new Date(a.date) - new Date(b.date));
+        function generateProductionChart(series) {
+            const ctx = chartContext('productionChart');
             
             new Chart(ctx, {
                 type: 'line',
                 data: {
-                    labels: sortedData.map(d => d.date),
+                    labels: series.labels,
                     datasets: [{
                         label: 'Gold Production (oz)',
-                        data: sortedData.map(d => d.goldExtracted),
+                        data: series.values,
                         borderColor: '#f39c12',
                         backgroundColor: 'rgba(243, 156, 18, 0.1)',
                         tension: 0.4,
@@ -670,30 +870,16 @@ HTML_TEMPLATE = """
             });
         }
 
-        function generateShiftChart() {
-            const ctx = document.getElementById('shiftChart').getContext('2d');
-            
-            const shiftData = {};
-            productionData.forEach(entry => {
-                if (!shiftData[entry.shift]) {
-                    shiftData[entry.shift] = { total: 0, count: 0 };
-                }
-                shiftData[entry.shift].total += entry.goldExtracted;
-                shiftData[entry.shift].count += 1;
-            });
-
-            const avgByShift = Object.keys(shiftData).map(shift => ({
-                shift,
-                avg: shiftData[shift].total / shiftData[shift].count
-            }));
+        function generateShiftChart(series) {
+            const ctx = chartContext('shiftChart');
 
             new Chart(ctx, {
                 type: 'bar',
                 data: {
-                    labels: avgByShift.map(d => d.shift),
+                    labels: series.labels,
                     datasets: [{
                         label: 'Average Gold Production',
-                        data: avgByShift.map(d => d.avg),
+                        data: series.values,
                         backgroundColor: ['#3498db', '#e74c3c', '#9b59b6'],
                         borderColor: ['#2980b9', '#c0392b', '#8e44ad'],
                         borderWidth: 1
@@ -720,17 +906,17 @@ HTML_TEMPLATE = """
             });
         }
 
-        function generateCostChart() {
-            const ctx = document.getElementById('costChart').getContext('2d');
+        function generateCostChart(series) {
+            const ctx = chartContext('costChart');
             
             new Chart(ctx, {
                 type: 'scatter',
                 data: {
                     datasets: [{
                         label: 'Cost vs Production',
-                        data: productionData.map(d => ({
-                            x: d.operationalCost,
-                            y: d.goldExtracted
+                        data: series.x.map((x, i) => ({
+                            x: x,
+                            y: series.y[i]
                         })),
                         backgroundColor: '#e74c3c',
                         borderColor: '#c0392b',
@@ -763,29 +949,15 @@ HTML_TEMPLATE = """
             });
         }
 
-        function generateWeatherChart() {
-            const ctx = document.getElementById('weatherChart').getContext('2d');
-            
-            const weatherData = {};
-            productionData.forEach(entry => {
-                if (!weatherData[entry.weather]) {
-                    weatherData[entry.weather] = { total: 0, count: 0 };
-                }
-                weatherData[entry.weather].total += entry.goldExtracted;
-                weatherData[entry.weather].count += 1;
-            });
-
-            const avgByWeather = Object.keys(weatherData).map(weather => ({
-                weather,
-                avg: weatherData[weather].total / weatherData[weather].count
-            }));
+        function generateWeatherChart(series) {
+            const ctx = chartContext('weatherChart');
 
             new Chart(ctx, {
                 type: 'doughnut',
                 data: {
-                    labels: avgByWeather.map(d => d.weather),
+                    labels: series.labels,
                     datasets: [{
-                        data: avgByWeather.map(d => d.avg),
+                        data: series.values,
                         backgroundColor: [
                             '#f39c12', '#3498db', '#95a5a6', 
                             '#2ecc71', '#e74c3c', '#9b59b6'
@@ -804,12 +976,13 @@ HTML_TEMPLATE = """
             });
         }
 
-        function generateProfitabilityChart() {
-            const ctx = document.getElementById('profitabilityChart').getContext('2d');
+        function generateProfitabilityChart(series) {
+            const ctx = chartContext('profitabilityChart');
             
-            const profitabilityData = productionData.map(entry => ({
-                x: entry.goldExtracted,
-                y: ((entry.goldExtracted * currentGoldPrice - entry.operationalCost) / (entry.goldExtracted * currentGoldPrice)) * 100
+            // The series holds cost per ounce; the margin follows from the current price
+            const profitabilityData = series.x.map((gold, i) => ({
+                x: gold,
+                y: (1 - series.y[i] / currentGoldPrice) * 100
             }));
 
             new Chart(ctx, {
@@ -854,11 +1027,11 @@ HTML_TEMPLATE = """
             });
         }
 
-        function generateMarketChart() {
-            const ctx = document.getElementById('marketChart').getContext('2d');
+        function generateMarketChart(series) {
+            const ctx = chartContext('marketChart');
             
-            // Use gold price history if available, otherwise simulate
-            let priceData = goldPriceHistory.length > 0 ? goldPriceHistory : [];
+            // Use the server's price history if available, otherwise simulate
+            let priceData = series.labels.map((timestamp, i) => ({ price: series.values[i], timestamp: timestamp }));
             if (priceData.length === 0) {
                 // Generate sample price trend
                 const basePrice = currentGoldPrice;
@@ -933,191 +1106,3273 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Production entry schema
+NUMERIC_FIELDS = ('goldExtracted', 'oreProcessed', 'workers', 'equipmentHours', 'operationalCost', 'efficiency', 'costPerOunce')
+CATEGORICAL_FIELDS = ('shift', 'weather', 'site')
+ENTRY_FIELDS = ('date', 'shift', 'goldExtracted', 'oreProcessed', 'workers', 'equipmentHours', 'weather', 'operationalCost', 'efficiency', 'costPerOunce', 'site')
+AGGREGATE_FIELDS = NUMERIC_FIELDS + ('goldPerWorker', 'laborCostPerOunce', 'equipmentCostPerOunce')
+SKETCH_FIELDS = ('costPerOunce', 'efficiency', 'goldExtracted')  # Fields with streaming quantile sketches
+LOG_FIELDS = ENTRY_FIELDS + ('createdAt',)
+REQUIRED_FIELDS = ('date', 'shift', 'goldExtracted', 'oreProcessed', 'workers', 'equipmentHours', 'weather', 'operationalCost')
+DEFAULT_SITE = 'Site 1'  # Entries recorded without a site, including every entry from before sites existed
+UPLOAD_FIELDS = REQUIRED_FIELDS + ('site',)
+BULK_CHUNK_ROWS = 5000
+PRICE_BUCKET_DOLLARS = 1  # Cached insights are reused while the gold price stays within this bucket
+DERIVED_SNAPSHOT_VERSION = 1  # Bump whenever a persisted listener's attributes change shape
+SNAPSHOT_MAGIC = b'GMSNAP1\n'
+SNAPSHOT_ALIGNMENT = 64  # Byte alignment of the arrays in a snapshot file
+MAX_BULK_ERRORS = 1000
+MAX_SITES = 1000  # Each site keeps a partition with its own aggregates and daily index, so new ones are capped
+MAX_SITE_LENGTH = 64
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+MAX_SCENARIOS = 500000  # Price x workers x equipment hours x weather mix cells per /api/ml/scenarios request
+RISK_CHUNK_PATHS = 50000  # Monte Carlo paths simulated (and held in memory) per task
+PROFIT_RISK_PATHS = 100000  # Paths behind the profitability insight's risk assessment
+PROFIT_RISK_HORIZON = 30  # Days each of those paths covers
+MAX_RISK_PATHS = 20000000
+DEFAULT_CHART_POINTS = 500
+MAX_CHART_POINTS = 5000
+EVENT_QUEUE_SIZE = 256  # Undelivered events held per dashboard stream before it is told to resync
+EVENT_MAX_ENTRIES = 100  # Larger batches are announced by version only; dashboards fetch the delta
+EVENT_KEEPALIVE_SECONDS = 15
+EVENT_POLL_SECONDS = 1  # How often a worker with open streams checks for other workers' commits
+GOLD_MONTHLY_VOLATILITY = 0.05  # Used until the price history is long enough to estimate it
+BULK_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet'
+}
+COLUMN_DTYPES = {
+    'date': 'datetime64[D]',
+    'shift': 'int16',
+    'goldExtracted': 'float64',
+    'oreProcessed': 'float64',
+    'workers': 'int32',
+    'equipmentHours': 'float64',
+    'weather': 'int16',
+    'operationalCost': 'float64',
+    'efficiency': 'float64',
+    'costPerOunce': 'float64',
+    'site': 'int16',
+    'createdAt': 'datetime64[us]'
+}
+
 # Production data storage
-production_entries = []
+class ProductionView:
+    """Consistent, zero-copy snapshot of the production store's columns"""
 
-# Global gold price data
-current_gold_price = 2000  # Default fallback price
-gold_price_history = []
+    def __init__(self, columns, categories, length, user_offset, first_row=0, rows=None, positions=None):
+        self._columns = columns
+        self._categories = categories
+        self._length = length
+        self.user_offset = user_offset
+        self.first_row = first_row
+        self.rows = rows  # Store row of each index, for views over a non-contiguous selection
+        self._positions = positions  # Indices into columns this view selects; see select()
+        self._gathered = {}
 
-# Simulated historical data for ML training
-def generate_training_data():
-    """Generate realistic gold mining production data for ML training"""
-    training_data = []
-    base_date = datetime.now() - timedelta(days=90)
-    
-    for i in range(90):
-        date = base_date + timedelta(days=i)
-        
-        # Simulate realistic mining patterns
-        shifts = ['Day', 'Evening', 'Night']
-        weather_conditions = ['Clear', 'Partly Cloudy', 'Cloudy', 'Light Rain', 'Heavy Rain', 'Windy']
-        
-        for shift in shifts:
-            # Base production varies by shift
-            shift_multipliers = {'Day': 1.2, 'Evening': 1.0, 'Night': 0.8}
-            base_production = 35 * shift_multipliers[shift]
-            
-            # Weather impact on production
-            weather = np.random.choice(weather_conditions, p=[0.3, 0.25, 0.2, 0.15, 0.05, 0.05])
-            weather_multipliers = {
-                'Clear': 1.1, 'Partly Cloudy': 1.0, 'Cloudy': 0.95,
-                'Light Rain': 0.85, 'Heavy Rain': 0.6, 'Windy': 0.9
-            }
-            
-            # Calculate production with realistic variations
-            production_factor = weather_multipliers[weather] * (0.8 + 0.4 * np.random.random())
-            gold_extracted = base_production * production_factor
-            
-            # Ore processing correlates with gold production but has variance
-            ore_efficiency = 0.025 + 0.015 * np.random.random()  # 2.5-4% efficiency range
-            ore_processed = gold_extracted / ore_efficiency
-            
-            # Workers and equipment hours
-            workers = np.random.randint(18, 32)
-            equipment_hours = workers * 8 * (0.8 + 0.4 * np.random.random())
-            
-            # Operational costs
-            base_cost_per_worker = 200 + 100 * np.random.random()
-            equipment_cost_per_hour = 50 + 25 * np.random.random()
-            operational_cost = workers * base_cost_per_worker + equipment_hours * equipment_cost_per_hour
-            
-            training_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'shift': shift,
-                'goldExtracted': round(gold_extracted, 2),
-                'oreProcessed': round(ore_processed, 1),
-                'workers': workers,
-                'equipmentHours': round(equipment_hours, 1),
-                'weather': weather,
-                'operationalCost': round(operational_cost, 2),
-                'efficiency': round((gold_extracted / ore_processed) * 100, 2),
-                'costPerOunce': round(operational_cost / gold_extracted, 2)
-            })
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, field):
+        if self._positions is None:
+            return self._columns[field]
+        column = self._gathered.get(field)
+        if column is None:
+            column = self._gathered[field] = self._columns[field][self._positions]
+        return column
+
+    def labels(self, field):
+        """Category labels for a dictionary-encoded column, indexed by code"""
+        return self._categories[field]
+
+    def record(self, index):
+        """Materialize a single row as the entry dict used by the JSON API"""
+        record = {}
+        position = index if self._positions is None else self._positions[index]
+        for field in ENTRY_FIELDS:
+            value = self._columns[field][position]
+            if field in CATEGORICAL_FIELDS:
+                value = self._categories[field][value]
+            elif field == 'date':
+                value = str(value)
+            elif field == 'workers':
+                value = int(value)
+            else:
+                value = float(value)
+            record[field] = value
+        row = self.first_row + index if self.rows is None else self.rows[index]
+        if row >= self.user_offset:
+            record['id'] = int(row - self.user_offset + 1)
+            record['createdAt'] = str(self._columns['createdAt'][position])
+        return record
+
+    def records(self, start=0, stop=None):
+        """Materialize a range of rows as entry dicts"""
+        stop = self._length if stop is None else min(stop, self._length)
+        return [self.record(i) for i in range(start, stop)]
+
+    def _store_rows(self, rows):
+        return self.first_row + rows if self.rows is None else self.rows[rows]
+
+    def take(self, rows):
+        """Copy of the given rows (indices into this view) as a view of its own"""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {field: self[field][rows] for field in self._columns}
+        return ProductionView(columns, self._categories, len(rows), self.user_offset, rows=self._store_rows(rows))
+
+    def select(self, rows):
+        """The given rows (indices into this view) as a view of their own, each column copied on first read"""
+        rows = np.asarray(rows, dtype=np.int64)
+        positions = rows if self._positions is None else self._positions[rows]
+        return ProductionView(self._columns, self._categories, len(rows), self.user_offset, rows=self._store_rows(rows), positions=positions)
+
+
+class LockedState:
+    """Pickles an object's attributes without its lock, so derived state can be snapshotted
     
-    return training_data
+    Snapshots are taken on the production log's writer thread, the only thread that appends,
+    so the attributes cannot change while they are written out.
+    """
 
-# Initialize with training data
-historical_data = generate_training_data()
+    def __getstate__(self):
+        with self._lock:
+            state = dict(self.__dict__)
+        del state['_lock']
+        return state
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
 
-@app.route('/api/production-data', methods=['POST'])
-def add_production_data():
-    """Add new production data entry"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['date', 'shift', 'goldExtracted', 'oreProcessed', 'workers', 'equipmentHours', 'weather', 'operationalCost']
-        for field in required_fields:
-            if field not in data or data[field] == '':
-                return jsonify({"error": f"Missing field: {field}"}), 400
-        
-        # Calculate derived metrics
-        efficiency = (float(data['goldExtracted']) / float(data['oreProcessed'])) * 100
-        cost_per_ounce = float(data['operationalCost']) / float(data['goldExtracted'])
-        
-        # Create production entry
-        production_entry = {
-            "id": len(production_entries) + 1,
-            "date": data['date'],
-            "shift": data['shift'],
-            "goldExtracted": float(data['goldExtracted']),
-            "oreProcessed": float(data['oreProcessed']),
-            "workers": int(data['workers']),
-            "equipmentHours": float(data['equipmentHours']),
-            "weather": data['weather'],
-            "operationalCost": float(data['operationalCost']),
-            "efficiency": round(efficiency, 2),
-            "costPerOunce": round(cost_per_ounce, 2),
-            "createdAt": datetime.now().isoformat()
-        }
-        
-        production_entries.append(production_entry)
-        
-        return jsonify({
-            "success": True,
-            "productionEntry": production_entry,
-            "productionData": production_entries
-        })
+
+class ProductionStore(LockedState):
+    """Columnar production store backed by growable NumPy arrays"""
+
+    def __init__(self, capacity=1024):
+        self._lock = Lock()
+        self._length = 0
+        self._capacity = capacity
+        self._columns = {field: np.empty(capacity, dtype=dtype) for field, dtype in COLUMN_DTYPES.items()}
+        self._categories = {field: [] for field in CATEGORICAL_FIELDS}
+        self._category_codes = {field: {} for field in CATEGORICAL_FIELDS}
+        self._listeners = []
+        self.user_offset = 0
+
+    def __len__(self):
+        return self._length
+
+    def _encode(self, field, label):
+        codes = self._category_codes[field]
+        if label not in codes:
+            codes[label] = len(self._categories[field])
+            self._categories[field].append(label)
+        return codes[label]
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_columns'] = {field: column[:state['_length']] for field, column in state['_columns'].items()}
+        state['_capacity'] = state['_length']
+        return state
+
+    def _reserve(self, extra):
+        required = self._length + extra
+        if required <= self._capacity:
+            return
+        capacity = max(self._capacity, 1024)
+        while capacity < required:
+            capacity *= 2
+        for field, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._length] = column[:self._length]
+            self._columns[field] = grown
+        self._capacity = capacity
+
+    def extend(self, entries):
+        """Append entry dicts; returns the index of the first appended row"""
+        entries = list(entries)
+        with self._lock:
+            self._reserve(len(entries))
+            start = self._length
+            for offset, entry in enumerate(entries):
+                row = start + offset
+                for field in ENTRY_FIELDS:
+                    value = (entry.get('site') or DEFAULT_SITE) if field == 'site' else entry[field]
+                    if field in CATEGORICAL_FIELDS:
+                        value = self._encode(field, value)
+                    self._columns[field][row] = value
+                self._columns['createdAt'][row] = entry.get('createdAt', 'NaT')
+            self._length = start + len(entries)
+            self._notify(start)
+            return start
+
+    def extend_columns(self, columns, labels, skip=()):
+        """Append whole column arrays; categorical columns hold codes into labels[field]
         
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        Listeners in skip are not told, e.g. ones restored from a snapshot that already holds these rows.
+        """
+        length = len(columns['goldExtracted'])
+        with self._lock:
+            self._reserve(length)
+            start = self._length
+            stop = start + length
+            for field in ENTRY_FIELDS:
+                values = np.asarray(columns[field])
+                if field in CATEGORICAL_FIELDS:
+                    remap = np.array([self._encode(field, str(label)) for label in labels[field]], dtype=np.int16)
+                    values = remap[values] if len(remap) else values
+                self._columns[field][start:stop] = values
+            self._columns['createdAt'][start:stop] = columns.get('createdAt', np.datetime64('NaT'))
+            self._length = stop
+            self._notify(start, skip)
+            return start
 
-@app.route('/api/ml/forecast')
-def production_forecast():
-    """Generate ML-based production forecast"""
-    all_data = historical_data + production_entries
-    
-    if len(all_data) < 10:
-        return jsonify({"insights": [{"title": "Insufficient Data", "description": "Need more historical data for accurate forecasting."}]})
-    
-    insights = []
-    
-    # Analyze recent trends
-    recent_data = all_data[-21:]  # Last 3 weeks
-    recent_production = [entry['goldExtracted'] for entry in recent_data]
-    trend = calculate_linear_trend(recent_production)
-    
-    # Weekly forecast
-    weekly_forecast = []
-    base_production = np.mean(recent_production)
-    
-    for day in range(7):
-        forecast_value = base_production + (trend * day)
-        weekly_forecast.append(max(0, forecast_value))
-    
-    total_forecast = sum(weekly_forecast)
-    
-    insights.append({
-        "title": "7-Day Production Forecast",
-        "description": f"Predicted total production: {total_forecast:.1f} oz gold. Daily average: {total_forecast/7:.1f} oz. Trend analysis shows {'increasing' if trend > 0 else 'decreasing' if trend < 0 else 'stable'} production pattern.",
-        "confidence": 85
-    })
-    
-    # Seasonal analysis
-    weather_impact = analyze_weather_impact(all_data)
-    insights.append({
-        "title": "Weather Impact Analysis",
-        "description": f"Clear weather conditions increase production by {weather_impact['clear_boost']:.1f}%. Heavy rain reduces production by {weather_impact['rain_penalty']:.1f}%. Consider weather forecasts for operational planning.",
-        "confidence": 78
-    })
-    
-    # Efficiency predictions
-    efficiency_data = [entry['efficiency'] for entry in all_data]
-    avg_efficiency = np.mean(efficiency_data)
-    efficiency_trend = calculate_linear_trend(efficiency_data[-14:])  # 2-week trend
-    
-    insights.append({
-        "title": "Efficiency Optimization Forecast",
-        "description": f"Current efficiency averaging {avg_efficiency:.2f}%. Trend shows {'improving' if efficiency_trend > 0 else 'declining'} efficiency. Target: achieve 4.5% efficiency for optimal gold recovery.",
-        "confidence": 82
-    })
-    
-    return jsonify({"insights": insights})
+    def subscribe(self, listener):
+        """Register a callable that receives a view of every appended batch"""
+        self._listeners.append(listener)
 
-@app.route('/api/ml/optimize')
-def optimize_operations():
-    """Generate operational optimization recommendations"""
-    all_data = historical_data + production_entries
+    def _notify(self, start, skip=()):
+        listeners = [listener for listener in self._listeners if listener not in skip]
+        if not listeners or start == self._length:
+            return
+        columns = {field: column[start:self._length] for field, column in self._columns.items()}
+        categories = {field: tuple(labels) for field, labels in self._categories.items()}
+        batch = ProductionView(columns, categories, self._length - start, self.user_offset, first_row=start)
+        for listener in listeners:
+            listener(batch)
+
+    def append(self, entry):
+        """Append a single entry dict; returns its row index"""
+        return self.extend([entry])
+
+    def mark_user_offset(self, offset=None):
+        """Record that rows from offset (default: here) on are user-recorded entries"""
+        with self._lock:
+            self.user_offset = self._length if offset is None else offset
+
+    def view(self):
+        """Zero-copy view of the rows committed so far"""
+        with self._lock:
+            length = self._length
+            columns = {field: column[:length] for field, column in self._columns.items()}
+            categories = {field: tuple(labels) for field, labels in self._categories.items()}
+            return ProductionView(columns, categories, length, self.user_offset)
+
+
+def shallow_copy(value):
+    """A new instance with the same attribute values; cheaper than copy.copy for the many small aggregates"""
+    clone = object.__new__(type(value))
+    clone.__dict__.update(value.__dict__)
+    return clone
+
+
+class RunningStats:
+    """Welford mean/variance plus running sum, min/max and their row indices"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.argmin = -1
+        self.argmax = -1
+
+    def update(self, values, first_row=0, rows=None):
+        """Fold a batch of values in using Chan's parallel combination"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        batch_count = len(values)
+        batch_mean = float(np.mean(values))
+        batch_m2 = float(np.sum((values - batch_mean) ** 2))
+        count = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / count
+        self.m2 += batch_m2 + delta * delta * self.count * batch_count / count
+        self.count = count
+        self.total += float(np.sum(values))
+        low = int(np.argmin(values))
+        if values[low] < self.minimum:
+            self.minimum = float(values[low])
+            self.argmin = int(rows[low]) if rows is not None else first_row + low
+        high = int(np.argmax(values))
+        if values[high] > self.maximum:
+            self.maximum = float(values[high])
+            self.argmax = int(rows[high]) if rows is not None else first_row + high
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def snapshot(self):
+        return shallow_copy(self)
+
+
+class QuantileSketch:
+    """KLL quantile sketch: mergeable, with memory and query cost bounded by k, not by the row count
     
-    insights = []
+    Level h holds items that each stand for 2^h inputs. A full level is sorted and every
+    other item (from a random offset) moves up a level, so quantiles stay within roughly
+    1.7/k of the true rank.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+
+    def _capacity(self, level):
+        return max(math.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            odd = items[:len(items) % 2]  # An odd item out stays behind
+            promoted = items[len(odd) + random.getrandbits(1)::2]
+            self.levels[level] = odd
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level = 0  # A new level lowers every capacity below it
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def snapshot(self):
+        """A copy sharing the level arrays, which updates replace rather than write into"""
+        clone = shallow_copy(self)
+        clone.levels = list(self.levels)
+        return clone
+
+    def merge(self, other):
+        """Fold another sketch in, e.g. another partition's or another worker's"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def quantile(self, q):
+        """Approximate q-quantile(s), 0 <= q <= 1"""
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        ranks = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        result = items[order][np.minimum(ranks, len(items) - 1)]
+        return result if np.ndim(q) else float(result)
+
+
+class TopK:
+    """The k largest values seen, with their rows and payload columns; mergeable and bounded"""
+
+    def __init__(self, k=10, payload=()):
+        self.k = k
+        self.values = np.empty(0)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.payload = {field: np.empty(0) for field in payload}
+
+    def _keep(self, values, rows, payload):
+        if len(values) > self.k:
+            best = np.argpartition(values, len(values) - self.k)[-self.k:]
+            values, rows, payload = values[best], rows[best], {field: column[best] for field, column in payload.items()}
+        self.values, self.rows, self.payload = values, rows, payload
+
+    def update(self, values, rows, payload):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) > self.k:
+            # Only the batch's own top k can make the cut
+            best = np.argpartition(values, len(values) - self.k)[-self.k:]
+            values, rows, payload = values[best], np.asarray(rows)[best], {field: np.asarray(payload[field])[best] for field in self.payload}
+        self._keep(
+            np.concatenate([self.values, values]),
+            np.concatenate([self.rows, np.asarray(rows, dtype=np.int64)]),
+            {field: np.concatenate([column, np.asarray(payload[field], dtype=np.float64)]) for field, column in self.payload.items()}
+        )
+
+    def merge(self, other):
+        self.update(other.values, other.rows, other.payload)
+
+    def snapshot(self):
+        """A copy sharing the arrays, which updates replace rather than write into"""
+        clone = shallow_copy(self)
+        clone.payload = dict(self.payload)
+        return clone
+
+
+class RunningComoment:
+    """Running co-moment of two series, for covariance and correlation"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, xs, ys):
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if not len(xs):
+            return
+        batch_count = len(xs)
+        batch_mean_x = float(np.mean(xs))
+        batch_mean_y = float(np.mean(ys))
+        batch_c = float(np.sum((xs - batch_mean_x) * (ys - batch_mean_y)))
+        count = self.count + batch_count
+        delta_x = batch_mean_x - self.mean_x
+        delta_y = batch_mean_y - self.mean_y
+        self.c_xy += batch_c + delta_x * delta_y * self.count * batch_count / count
+        self.mean_x += delta_x * batch_count / count
+        self.mean_y += delta_y * batch_count / count
+        self.count = count
+
+    @property
+    def covariance(self):
+        return self.c_xy / self.count if self.count else 0.0
+
+    def snapshot(self):
+        return shallow_copy(self)
+
+
+def aggregate_column(data, field):
+    """A numeric column of data, or one of the per-entry ratios the aggregates also track"""
+    if field == 'goldPerWorker':
+        return data['goldExtracted'] / data['workers']
+    if field == 'laborCostPerOunce':
+        return data['workers'] * 250 / data['goldExtracted']  # Estimated worker cost per day
+    if field == 'equipmentCostPerOunce':
+        return data['equipmentHours'] * 75 / data['goldExtracted']  # Estimated equipment cost per hour
+    return data[field]
+
+
+class GroupAggregate:
+    """Running statistics for one slice of the data (overall, a shift or a weather)"""
+
+    def __init__(self):
+        self.stats = {field: RunningStats() for field in AGGREGATE_FIELDS}
+        self.production_cost = RunningComoment()
+        self.sketches = {field: QuantileSketch() for field in SKETCH_FIELDS}
+        self.top_production = TopK(10, payload=('equipmentHours',))
+
+    def __getitem__(self, field):
+        return self.stats[field]
+
+    @property
+    def count(self):
+        return self.stats['goldExtracted'].count
+
+    def update(self, series, first_row=0, rows=None):
+        for field, values in series.items():
+            self.stats[field].update(values, first_row, rows)
+        self.production_cost.update(series['goldExtracted'], series['operationalCost'])
+        for field, sketch in self.sketches.items():
+            sketch.update(series[field])
+        gold = series['goldExtracted']
+        self.top_production.update(gold, first_row + np.arange(len(gold)) if rows is None else rows, series)
+
+    def correlation(self):
+        """Pearson correlation of goldExtracted and operationalCost"""
+        std_product = self.stats['goldExtracted'].std * self.stats['operationalCost'].std
+        return self.production_cost.covariance / std_product if std_product else 0.0
+
+    def snapshot(self):
+        """Copy-on-write copy: the scalar moments are copied, the sketch and top-k arrays shared"""
+        clone = GroupAggregate.__new__(GroupAggregate)
+        clone.stats = {field: stats.snapshot() for field, stats in self.stats.items()}
+        clone.production_cost = self.production_cost.snapshot()
+        clone.sketches = {field: sketch.snapshot() for field, sketch in self.sketches.items()}
+        clone.top_production = self.top_production.snapshot()
+        return clone
+
+
+AggregateSnapshot = namedtuple('AggregateSnapshot', ['overall', 'by_shift', 'by_weather'])
+
+
+class AggregateEngine(LockedState):
+    """Running aggregates kept globally, per shift and per weather, updated on insert"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.overall = GroupAggregate()
+        self.by_shift = {}
+        self.by_weather = {}
+        self._best_profit = (None, -1)
+        self._best_profit_value = -math.inf
+
+    @staticmethod
+    def _series(batch):
+        return {field: aggregate_column(batch, field) for field in AGGREGATE_FIELDS}
+
+    def _update_groups(self, groups, codes, labels, series, first_row):
+        for code in np.unique(codes):
+            mask = codes == code
+            group = groups.setdefault(labels[code], GroupAggregate())
+            group.update({field: values[mask] for field, values in series.items()}, rows=first_row + np.flatnonzero(mask))
+
+    def __call__(self, batch):
+        """Store listener: fold a freshly appended batch into the aggregates"""
+        series = self._series(batch)
+        with self._lock:
+            self.overall.update(series, batch.first_row)
+            self._update_groups(self.by_shift, batch['shift'], batch.labels('shift'), series, batch.first_row)
+            self._update_groups(self.by_weather, batch['weather'], batch.labels('weather'), series, batch.first_row)
+            price, best_row = self._best_profit
+            if price is not None:
+                profits = batch['goldExtracted'] * price - batch['operationalCost']
+                candidate = int(np.argmax(profits))
+                if best_row < 0 or profits[candidate] > self._best_profit_value:
+                    self._best_profit = (price, batch.first_row + candidate)
+                    self._best_profit_value = float(profits[candidate])
+
+    def snapshot(self):
+        """Constant-size copy of the aggregates for a request to read"""
+        with self._lock:
+            return AggregateSnapshot(
+                self.overall.snapshot(),
+                {label: group.snapshot() for label, group in self.by_shift.items()},
+                {label: group.snapshot() for label, group in self.by_weather.items()}
+            )
+
+    def best_profit_row(self, gold_price, data):
+        """Row with the highest profit at gold_price; rescans only when the price moves"""
+        with self._lock:
+            price, best_row = self._best_profit
+            # The cached row may have landed after the caller's view was taken
+            if price == gold_price and 0 <= best_row < len(data):
+                return best_row
+        profits = data['goldExtracted'] * gold_price - data['operationalCost']
+        best_row = int(np.argmax(profits))
+        with self._lock:
+            # Only cache if no rows landed after the caller's view was taken
+            if self.overall.count == len(data):
+                self._best_profit = (gold_price, best_row)
+                self._best_profit_value = float(profits[best_row])
+        return best_row
+
+
+class RollingRegression:
+    """Least-squares trend over the last `window` values, kept as running sums and updated in O(1) per value
     
-    # Shift optimization
-    shift_analysis = analyze_shift_performance(all_data)
-    best_shift = max(shift_analysis.keys(), key=lambda k: shift_analysis[k]['avg_production'])
+    x is the position within the window (0 = oldest), so Sum(x) and Sum(x^2) are closed-form in
+    the window's fill; Sum(y) and Sum(xy) slide with each new value.
+    """
+
+    RESUM_EVERY = 4096  # Recompute the sums exactly now and then so rounding error cannot accumulate
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque(maxlen=window)
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self._pushes = 0
+
+    @property
+    def count(self):
+        return len(self._values)
+
+    def push(self, value):
+        value = float(value)
+        if len(self._values) == self.window:
+            # The oldest value (x = 0) leaves; every remaining value moves one step left
+            self.sum_y -= self._values[0]
+            self.sum_xy -= self.sum_y
+        self.sum_xy += len(self._values) * value if len(self._values) < self.window else (self.window - 1) * value
+        self.sum_y += value
+        self._values.append(value)
+        self._pushes += 1
+        if self._pushes >= self.RESUM_EVERY:
+            self._resum()
+
+    def extend(self, values):
+        if len(values) >= self.window:
+            self._values.clear()
+            self._values.extend(np.asarray(values[-self.window:], dtype=np.float64).tolist())
+            self._resum()
+            return
+        for value in values:
+            self.push(value)
+
+    def _resum(self):
+        values = np.fromiter(self._values, dtype=np.float64, count=len(self._values))
+        self.sum_y = float(np.sum(values))
+        self.sum_xy = float(np.dot(np.arange(len(values)), values))
+        self._pushes = 0
+
+    @property
+    def slope(self):
+        n = len(self._values)
+        if n < 2:
+            return 0.0
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self.sum_xy - sum_x * self.sum_y) / (n * sum_xx - sum_x ** 2)
+
+    @property
+    def mean(self):
+        return self.sum_y / len(self._values) if self._values else 0.0
+
+    @property
+    def last(self):
+        return self._values[-1] if self._values else 0.0
+
+    def trend(self):
+        return Trend(self.slope, self.mean, self.last, self.count)
+
+    @classmethod
+    def fit(cls, values):
+        """Trend of a whole (short) series, such as a run of daily totals"""
+        roller = cls(max(len(values), 1))
+        roller.extend(values)
+        return roller.trend()
+
+
+Trend = namedtuple('Trend', ['slope', 'mean', 'last', 'count'])
+
+TREND_SERIES = ('goldExtracted', 'efficiency', 'costPerOunce')
+TREND_WINDOWS = {series: (7, 14, 30, 90) for series in TREND_SERIES}
+
+
+class TrendEngine(LockedState):
+    """Rolling trends for several series and window sizes, updated on insert"""
+
+    def __init__(self, windows=TREND_WINDOWS):
+        self._lock = Lock()
+        self.rollers = {series: {window: RollingRegression(window) for window in sizes} for series, sizes in windows.items()}
+
+    def __call__(self, batch):
+        """Store listener: slide every window over a freshly appended batch"""
+        with self._lock:
+            for series, rollers in self.rollers.items():
+                values = batch[series]
+                for roller in rollers.values():
+                    roller.extend(values)
+
+    def trend(self, series, window):
+        with self._lock:
+            return self.rollers[series][window].trend()
+
+    def snapshot(self, series=None):
+        """Every window's trend, {series: {window: Trend}}"""
+        with self._lock:
+            return {
+                name: {window: roller.trend() for window, roller in rollers.items()}
+                for name, rollers in self.rollers.items()
+                if series is None or name == series
+            }
+
+
+def _grown(array, required):
+    """array itself if it holds `required` items, else a copy with doubled capacity"""
+    if required <= len(array):
+        return array
+    capacity = max(len(array), 1024)
+    while capacity < required:
+        capacity *= 2
+    grown = np.empty(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+DailyRange = namedtuple('DailyRange', ['count', 'sums', 'squares', 'cross', 'group_counts', 'group_sums', 'rows'])
+
+
+class DailyIndex(LockedState):
+    """Date-partitioned index: per-day and per-(day, shift) and (day, weather) sums, updated on insert
     
-    insights.append({
-        "title": "Optimal Shift Performance",
-        "description": f"{best_shift} shift shows highest average production ({shift_analysis[best_shift]['avg_production']:.1f} oz). Consider allocating experienced workers and premium equipment to {best_shift.lower()} operations.",
-        "confidence": 88
-    })
+    Days are kept sorted, so a ?from=&to= range is two binary searches into the per-day
+    sums, which answer a range's counts, totals and means without touching its rows. A
+    date-ordered permutation of the rows gives the rows of a range the same way; it is
+    extended in place while entries arrive in date order and re-sorted lazily after a
+    back-dated insert.
+    
+    Which fields and groups are summed is up to the owner: every sum costs a float per
+    day (per shift or weather for group sums), and whatever is left out is gathered from
+    the range's rows instead, which is cheap when a partition holds few rows per day.
+    """
+
+    TOTAL_FIELDS = ('goldExtracted', 'oreProcessed', 'workers', 'equipmentHours', 'operationalCost')  # Columns of daily()
+    SQUARE_FIELDS = ('goldExtracted', 'operationalCost')  # With moments, their spread and correlation come from sums too
+    GROUPS = ('shift', 'weather')
+    GROUP_FIELDS = ('goldExtracted', 'costPerOunce', 'efficiency')  # What the shift and weather breakdowns average
+
+    def __init__(self, fields=AGGREGATE_FIELDS, groups=GROUPS, group_fields=GROUP_FIELDS, moments=True):
+        self._lock = Lock()
+        self.days = np.empty(0, dtype='datetime64[D]')
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = {field: np.zeros(0) for field in dict.fromkeys(self.TOTAL_FIELDS + tuple(fields))}
+        self.squares = {field: np.zeros(0) for field in self.SQUARE_FIELDS} if moments else {}
+        self.cross = np.zeros(0) if moments else None  # Sum of goldExtracted * operationalCost
+        group_fields = tuple(dict.fromkeys(('goldExtracted',) + tuple(group_fields)))  # daily() reports gold per shift
+        self.group_counts = {group: np.zeros((0, 0), dtype=np.int64) for group in dict.fromkeys(('shift',) + tuple(groups))}
+        self.group_sums = {group: {field: np.zeros((0, 0)) for field in group_fields} for group in self.group_counts}
+        self._summed = tuple(dict.fromkeys(tuple(self.sums) + tuple(self.squares) + group_fields))
+        self._length = 0
+        self._row_days = np.empty(0, dtype='datetime64[D]')
+        self._order = np.empty(0, dtype=np.int64)
+        self._order_days = np.empty(0, dtype='datetime64[D]')
+        self._ordered = True
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Only the filled part of the row arrays; the date-ordered days are re-derived on restore
+        length = state['_length']
+        state.update(_row_days=state['_row_days'][:length].view(np.int64), _order=state['_order'][:length])
+        del state['_order_days']
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._row_days = self._row_days.view('datetime64[D]')
+        self._order_days = self._row_days[self._order]
+
+    def _add_days(self, new_days):
+        days = np.union1d(self.days, new_days)
+        slots = np.searchsorted(days, self.days)
+
+        def spread(values):
+            grown = np.zeros((len(days),) + values.shape[1:], dtype=values.dtype)
+            grown[slots] = values
+            return grown
+
+        self.counts = spread(self.counts)
+        self.sums = {field: spread(values) for field, values in self.sums.items()}
+        self.squares = {field: spread(values) for field, values in self.squares.items()}
+        self.cross = None if self.cross is None else spread(self.cross)
+        self.group_counts = {group: spread(counts) for group, counts in self.group_counts.items()}
+        self.group_sums = {group: {field: spread(values) for field, values in sums.items()} for group, sums in self.group_sums.items()}
+        self.days = days
+
+    def _add_labels(self, group, count):
+        pad = ((0, 0), (0, count - self.group_counts[group].shape[1]))
+        self.group_counts[group] = np.pad(self.group_counts[group], pad)
+        self.group_sums[group] = {field: np.pad(values, pad) for field, values in self.group_sums[group].items()}
+
+    def __call__(self, batch):
+        """Store listener: add a freshly appended batch to its days' sums"""
+        dates = batch['date']
+        series = {field: aggregate_column(batch, field) for field in self._summed}
+        with self._lock:
+            new_days = np.setdiff1d(dates, self.days)
+            if len(new_days):
+                self._add_days(new_days)
+            for group in self.group_counts:
+                if len(batch.labels(group)) > self.group_counts[group].shape[1]:
+                    self._add_labels(group, len(batch.labels(group)))
+            
+            n_days = len(self.days)
+            slots = np.searchsorted(self.days, dates)
+            self.counts += np.bincount(slots, minlength=n_days)
+            for field, values in self.sums.items():
+                values += np.bincount(slots, weights=series[field], minlength=n_days)
+            for field, values in self.squares.items():
+                values += np.bincount(slots, weights=series[field] ** 2, minlength=n_days)
+            if self.cross is not None:
+                self.cross += np.bincount(slots, weights=series['goldExtracted'] * series['operationalCost'], minlength=n_days)
+            for group, counts in self.group_counts.items():
+                n_labels = counts.shape[1]
+                cells = slots * n_labels + batch[group]
+                counts += np.bincount(cells, minlength=n_days * n_labels).reshape(n_days, n_labels)
+                for field, values in self.group_sums[group].items():
+                    values += np.bincount(cells, weights=series[field], minlength=n_days * n_labels).reshape(n_days, n_labels)
+            
+            start, stop = self._length, self._length + len(batch)
+            self._row_days = _grown(self._row_days, stop)
+            self._row_days[start:stop] = dates
+            if self._ordered and np.all(dates[1:] >= dates[:-1]) and (start == 0 or dates[0] >= self._order_days[start - 1]):
+                self._order = _grown(self._order, stop)
+                self._order_days = _grown(self._order_days, stop)
+                self._order[start:stop] = np.arange(start, stop)
+                self._order_days[start:stop] = dates
+            else:
+                self._ordered = False
+            self._length = stop
+
+    def _day_slice(self, days, start, stop):
+        first = 0 if start is None else np.searchsorted(days, start, side='left')
+        last = len(days) if stop is None else np.searchsorted(days, stop, side='right')
+        return slice(first, last)
+
+    def daily(self, start=None, stop=None):
+        """Per-day totals for the days in [start, stop], oldest first"""
+        with self._lock:
+            days = self._day_slice(self.days, start, stop)
+            return {
+                'date': self.days[days],
+                'count': self.counts[days].copy(),
+                **{field: self.sums[field][days].copy() for field in self.TOTAL_FIELDS},
+                'shiftCount': self.group_counts['shift'][days].copy(),
+                'shiftGold': self.group_sums['shift']['goldExtracted'][days].copy()
+            }
+
+    def _rows(self, start, stop):
+        if not self._ordered:
+            order = np.argsort(self._row_days[:self._length], kind='stable')
+            self._order = _grown(order, self._length)
+            self._order_days = self._row_days[order]
+            self._ordered = True
+        # Appends only write past _length and a re-sort replaces the array, so this slice never changes
+        return self._order[self._day_slice(self._order_days[:self._length], start, stop)]
+
+    def rows(self, start=None, stop=None):
+        """Store rows dated within [start, stop], in date order"""
+        with self._lock:
+            return self._rows(start, stop).copy()
+
+    def summary(self, start=None, stop=None):
+        """Sums over the days in [start, stop] and the rows dated within them, read together so they agree"""
+        with self._lock:
+            days = self._day_slice(self.days, start, stop)
+            return DailyRange(
+                int(self.counts[days].sum()),
+                {field: float(values[days].sum()) for field, values in self.sums.items()},
+                {field: float(values[days].sum()) for field, values in self.squares.items()},
+                None if self.cross is None else float(self.cross[days].sum()),
+                {group: counts[days].sum(axis=0) for group, counts in self.group_counts.items()},
+                {group: {field: values[days].sum(axis=0) for field, values in sums.items()} for group, sums in self.group_sums.items()},
+                self._rows(start, stop)
+            )
+
+
+class RangeStats:
+    """RunningStats over a date range: the total from per-day sums, extremes from the range's rows on first use"""
+
+    def __init__(self, group, field, total=None, squares=None):
+        self._group = group
+        self._field = field
+        self._total = total
+        self._squares = squares
+        self.count = group.count
+
+    @functools.cached_property
+    def values(self):
+        return np.asarray(self._group.column(self._field), dtype=np.float64)
+
+    @functools.cached_property
+    def total(self):
+        return float(np.sum(self.values)) if self._total is None else self._total
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        if not self.count:
+            return 0.0
+        if self._squares is None:
+            return float(np.var(self.values))
+        return max(self._squares / self.count - self.mean ** 2, 0.0)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def minimum(self):
+        return float(np.min(self.values)) if self.count else math.inf
+
+    @property
+    def maximum(self):
+        return float(np.max(self.values)) if self.count else -math.inf
+
+    @property
+    def argmin(self):
+        return self._group.row(int(np.argmin(self.values))) if self.count else -1
+
+    @property
+    def argmax(self):
+        return self._group.row(int(np.argmax(self.values))) if self.count else -1
+
+
+class RangeQuantiles:
+    """QuantileSketch's query over a date range's rows, exact since they are at hand"""
+
+    def __init__(self, stats):
+        self._stats = stats
+
+    def quantile(self, q):
+        if not self._stats.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        result = np.quantile(self._stats.values, q, method='inverted_cdf')  # An observed value, as the sketch returns
+        return result if np.ndim(q) else float(result)
+
+
+class RangeGroup:
+    """GroupAggregate over the rows of a date range, or of one shift or weather within it
+    
+    Counts and totals come from the daily index's per-day sums; anything needing the rows
+    themselves (extremes, quantiles, the top producers) gathers their columns when first asked.
+    Row numbers index into data, as a throwaway AggregateEngine fed data would report them.
+    """
+
+    def __init__(self, data, summary, group=None, code=None, count=None):
+        self._data = data
+        self._selector = (group, code)
+        if group is None:
+            self.count = summary.count
+            self._totals, self._squares, self._cross = summary.sums, summary.squares, summary.cross
+        else:
+            self.count = count
+            self._totals = {field: float(values[code]) for field, values in summary.group_sums.get(group, {}).items()}
+            self._squares, self._cross = {}, None
+        self.stats = {}
+        self.sketches = {field: RangeQuantiles(self[field]) for field in SKETCH_FIELDS}
+
+    def __getitem__(self, field):
+        stats = self.stats.get(field)
+        if stats is None:
+            stats = self.stats[field] = RangeStats(self, field, self._totals.get(field), self._squares.get(field))
+        return stats
+
+    @functools.cached_property
+    def _positions(self):
+        group, code = self._selector
+        return None if group is None else np.flatnonzero(self._data[group] == code)
+
+    def column(self, field):
+        values = aggregate_column(self._data, field)
+        return values if self._positions is None else values[self._positions]
+
+    def row(self, index):
+        return index if self._positions is None else int(self._positions[index])
+
+    def correlation(self):
+        """Pearson correlation of goldExtracted and operationalCost"""
+        gold, cost = self['goldExtracted'], self['operationalCost']
+        std_product = gold.std * cost.std
+        if not std_product:
+            return 0.0
+        cross = float(np.dot(gold.values, cost.values)) if self._cross is None else self._cross
+        return (cross / self.count - gold.mean * cost.mean) / std_product
+
+    @functools.cached_property
+    def top_production(self):
+        top = TopK(10, payload=('equipmentHours',))
+        if self.count:
+            rows = np.arange(self.count) if self._positions is None else self._positions
+            top.update(self['goldExtracted'].values, rows, {'equipmentHours': self.column('equipmentHours')})
+        return top
+
+
+def range_snapshot(data, summary):
+    """AggregateSnapshot of a date range, built from DailyIndex.summary() over the rows in data"""
+    def groups(group):
+        counts = summary.group_counts.get(group)
+        if counts is None:  # Not summed per day by this index; count the range's rows
+            counts = np.bincount(data[group], minlength=len(data.labels(group)))
+        return {
+            label: RangeGroup(data, summary, group, code, int(counts[code]))
+            for code, label in enumerate(data.labels(group)) if code < len(counts) and counts[code]
+        }
+    return AggregateSnapshot(RangeGroup(data, summary), groups('shift'), groups('weather'))
+
+
+class RegressionModel(LockedState):
+    """Multivariate least squares predicting goldExtracted and operationalCost, updated on insert
+    
+    Features are an intercept, workers, equipment hours and ore processed plus one-hot shift
+    and weather. Only XᵀX, Xᵀy and yᵀy are kept, so a new batch costs O(rows x features²)
+    and the model never refits from scratch; fit() solves the small features x features
+    system into an immutable RegressionFit.
+    """
+
+    NUMERIC_FEATURES = ('workers', 'equipmentHours', 'oreProcessed')
+    CATEGORICAL_FEATURES = ('shift', 'weather')
+    TARGETS = ('goldExtracted', 'operationalCost')
+    CHUNK_ROWS = 65536  # Bounds the design matrix built for one slice of a large batch
+
+    def __init__(self):
+        self._lock = Lock()
+        self.labels = {field: () for field in self.CATEGORICAL_FEATURES}
+        self.count = 0
+        size = 1 + len(self.NUMERIC_FEATURES)
+        self._xtx = np.zeros((size, size))
+        self._xty = np.zeros((size, len(self.TARGETS)))
+        self._yty = np.zeros(len(self.TARGETS))
+
+    def _add_labels(self, labels):
+        # A new category's indicator was 0 for every earlier row, so its XᵀX rows and columns start at 0
+        offset = 1 + len(self.NUMERIC_FEATURES)
+        for field in self.CATEGORICAL_FEATURES:
+            known = len(self.labels[field])
+            added = len(labels[field]) - known
+            if added > 0:
+                at = offset + known
+                self._xtx = np.insert(np.insert(self._xtx, [at] * added, 0, axis=0), [at] * added, 0, axis=1)
+                self._xty = np.insert(self._xty, [at] * added, 0, axis=0)
+                self.labels[field] = tuple(labels[field])
+            offset += len(self.labels[field])
+
+    @classmethod
+    def design(cls, labels, numeric, codes, length):
+        """Design matrix for numeric feature columns and categorical codes into labels"""
+        design = np.zeros((length, 1 + len(cls.NUMERIC_FEATURES) + sum(len(labels[field]) for field in cls.CATEGORICAL_FEATURES)))
+        design[:, 0] = 1
+        for column, field in enumerate(cls.NUMERIC_FEATURES, 1):
+            design[:, column] = numeric[field]
+        offset = 1 + len(cls.NUMERIC_FEATURES)
+        for field in cls.CATEGORICAL_FEATURES:
+            design[np.arange(length), offset + codes[field]] = 1
+            offset += len(labels[field])
+        return design
+
+    def __call__(self, batch):
+        """Store listener: fold a freshly appended batch into the normal equations"""
+        with self._lock:
+            self._add_labels({field: batch.labels(field) for field in self.CATEGORICAL_FEATURES})
+            for start in range(0, len(batch), self.CHUNK_ROWS):
+                rows = slice(start, start + self.CHUNK_ROWS)
+                design = self.design(
+                    self.labels,
+                    {field: batch[field][rows] for field in self.NUMERIC_FEATURES},
+                    {field: batch[field][rows] for field in self.CATEGORICAL_FEATURES},
+                    len(batch[self.TARGETS[0]][rows])
+                )
+                targets = np.column_stack([batch[field][rows] for field in self.TARGETS])
+                self._xtx += design.T @ design
+                self._xty += design.T @ targets
+                self._yty += np.einsum('ij,ij->j', targets, targets)
+            self.count += len(batch)
+
+    def fit(self):
+        """Solve the normal equations as they stand"""
+        with self._lock:
+            count, labels = self.count, dict(self.labels)
+            xtx, xty, yty = self._xtx.copy(), self._xty.copy(), self._yty.copy()
+        # lstsq gives the minimum-norm solution, which copes with the collinear one-hot blocks
+        coefficients = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+        r2 = np.zeros(len(self.TARGETS))
+        if count > 1:
+            # RSS = yᵀy - 2βᵀXᵀy + βᵀXᵀXβ, TSS = yᵀy - (Σy)²/n
+            rss = yty - 2 * np.einsum('ij,ij->j', coefficients, xty) + np.einsum('ij,ik,kj->j', coefficients, xtx, coefficients)
+            tss = yty - xty[0] ** 2 / count
+            r2 = np.where(tss > 0, 1 - rss / np.where(tss > 0, tss, 1), 0.0)
+        return RegressionFit(count, labels, coefficients, dict(zip(self.TARGETS, r2.tolist())))
+
+
+class RegressionFit(namedtuple('RegressionFit', ['rows', 'labels', 'coefficients', 'r2'])):
+    """Immutable solved RegressionModel; coefficients has a column per target"""
+
+    @property
+    def features(self):
+        names = ['intercept', *RegressionModel.NUMERIC_FEATURES]
+        for field in RegressionModel.CATEGORICAL_FEATURES:
+            names.extend(f"{field}={label}" for label in self.labels[field])
+        return names
+
+    def coefficient_table(self):
+        """{target: {feature: coefficient}}"""
+        return {
+            target: dict(zip(self.features, self.coefficients[:, index].tolist()))
+            for index, target in enumerate(RegressionModel.TARGETS)
+        }
+
+    def predict(self, plans):
+        """Score plan columns ({feature: list}) in one matrix product; rows are TARGETS
+        
+        Raises ValueError for missing or non-numeric inputs and for unknown categories.
+        """
+        length = len(plans[RegressionModel.NUMERIC_FEATURES[0]])
+        numeric = {}
+        for field in RegressionModel.NUMERIC_FEATURES:
+            try:
+                numeric[field] = np.array(plans[field], dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} must be a number in every plan")
+            if not np.all(np.isfinite(numeric[field])):
+                raise ValueError(f"{field} must be a number in every plan")
+        codes = {}
+        for field in RegressionModel.CATEGORICAL_FEATURES:
+            lookup = {label: code for code, label in enumerate(self.labels[field])}
+            unknown = sorted({str(label) for label in plans[field] if not isinstance(label, str) or label not in lookup})
+            if unknown:
+                raise ValueError(f"Unknown {field}: {', '.join(unknown)}. Use one of: {', '.join(self.labels[field])}")
+            codes[field] = np.fromiter((lookup[label] for label in plans[field]), dtype=np.int64, count=length)
+        return RegressionModel.design(self.labels, numeric, codes, length) @ self.coefficients
+
+    def to_json(self):
+        return {'rows': self.rows, 'labels': self.labels, 'coefficients': self.coefficients.tolist(), 'r2': self.r2}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['rows'], {field: tuple(labels) for field, labels in data['labels'].items()}, np.array(data['coefficients']), data['r2'])
+
+
+class SeasonalFit(namedtuple('SeasonalFit', ['last_date', 'weekday_index', 'trend'])):
+    """Classical multiplicative decomposition of daily production: a weekday index times a linear trend"""
+
+    WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+    TREND_DAYS = 21  # The trend is fitted to the last 3 weeks of the deseasonalized series
+
+    @staticmethod
+    def weekdays(dates):
+        return (dates.astype('datetime64[D]').astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+
+    @property
+    def weekly(self):
+        """Whether a weekday pattern was found; fits of under two weeks of days leave the index flat"""
+        return bool(np.ptp(self.weekday_index) > 1e-3)
+
+    @classmethod
+    def fit(cls, daily):
+        """Fit from DailyIndex.daily() totals"""
+        dates, values = daily['date'], daily['goldExtracted']
+        weekdays = cls.weekdays(dates)
+        index = np.ones(7)
+        if len(values) >= 14:
+            # Ratio of each day to its centred 7-day moving average, averaged per weekday
+            moving_average = np.convolve(values, np.ones(7) / 7, mode='valid')
+            ratios = values[3:-3] / moving_average
+            counts = np.bincount(weekdays[3:-3], minlength=7)
+            sums = np.bincount(weekdays[3:-3], weights=ratios, minlength=7)
+            index = np.where(counts > 0, sums / np.maximum(counts, 1), 1.0)
+            index /= index.mean()
+        deseasonalized = values / index[weekdays] if len(values) else values
+        trend = RollingRegression.fit(deseasonalized[-cls.TREND_DAYS:])
+        return cls(dates[-1] if len(dates) else None, index, trend)
+
+    def forecast(self, days=7):
+        """(dates, production) for the next `days` calendar days"""
+        if self.last_date is None:
+            return np.empty(0, dtype='datetime64[D]'), np.zeros(0)
+        dates = self.last_date + np.arange(1, days + 1)
+        # Extrapolate the fitted line (centred on the window's middle), then reapply the weekday pattern
+        steps = self.trend.count - (self.trend.count - 1) / 2 + np.arange(days)
+        level = self.trend.mean + self.trend.slope * steps
+        return dates, np.maximum(0, level * self.weekday_index[self.weekdays(dates)])
+
+    def to_json(self):
+        return {
+            'lastDate': None if self.last_date is None else str(self.last_date),
+            'weekdayIndex': self.weekday_index.tolist(),
+            'trend': self.trend._asdict()
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        last_date = None if data['lastDate'] is None else np.datetime64(data['lastDate'], 'D')
+        return cls(last_date, np.array(data['weekdayIndex']), Trend(**data['trend']))
+
+
+PartitionModels = namedtuple('PartitionModels', ['regression', 'seasonal'])
+ModelSnapshot = namedtuple('ModelSnapshot', ['version', 'trained_at', 'models'])  # models: {site or None: PartitionModels}
+
+
+class ModelTrainer:
+    """Retrains models on a background thread and publishes immutable, versioned snapshots
+    
+    A store listener only notes the data version; the thread retrains once the data has
+    moved by retrain_rows rows, or by any rows at all after retrain_seconds. Handlers read
+    `snapshot`, which is swapped in a single assignment, so they never see a half-trained
+    model. Snapshots are also written to disk so a restarted worker serves at once.
+    """
+
+    def __init__(self, train, path=None, retrain_rows=100, retrain_seconds=60):
+        self._train = train
+        self.path = path
+        self.retrain_rows = retrain_rows
+        self.retrain_seconds = retrain_seconds
+        self.snapshot = None
+        self._version = 0
+        self._retrain_requested = False
+        self._condition = Condition()
+        self._ready = Event()
+        self._thread = None
+        self.trainings = 0
+        self.training_seconds = 0.0
+        self.load_seconds = None
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """Register a callable that receives every newly trained snapshot"""
+        self._listeners.append(listener)
+
+    def __call__(self, batch):
+        """Store listener: note the new data version, waking the trainer once it has moved far enough"""
+        with self._condition:
+            self._version = batch.first_row + len(batch)
+            if self.snapshot is None or self._version - self.snapshot.version >= self.retrain_rows:
+                self._condition.notify()
+
+    def start(self):
+        """Load the last saved snapshot, if any, then start the training thread (idempotent)"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._load()
+            self._thread = Thread(target=self._run, name='model-trainer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        if self.snapshot is not None:
+            self._notify(self.snapshot)  # A snapshot loaded from disk reaches the listeners too, off the startup path
+        while True:
+            with self._condition:
+                while self.snapshot is not None and not self._due():
+                    self._condition.wait(self.retrain_seconds)
+                version = self._version
+                self._retrain_requested = False
+            try:
+                self._publish(version)
+            except Exception:
+                logger.exception("Model training failed")
+                time.sleep(self.retrain_seconds)
+
+    def request_retrain(self):
+        """Retrain as soon as the thread is free, e.g. for a site the current snapshot has no models for"""
+        with self._condition:
+            if not self._retrain_requested:
+                self._retrain_requested = True
+                self._condition.notify()
+
+    def _due(self):
+        if self._retrain_requested:
+            return True
+        moved = self._version - self.snapshot.version
+        return moved >= self.retrain_rows or (moved > 0 and time.time() - self.snapshot.trained_at >= self.retrain_seconds)
+
+    def _publish(self, version):
+        started = time.perf_counter()
+        snapshot = ModelSnapshot(version, time.time(), self._train())
+        self.training_seconds = time.perf_counter() - started
+        metrics.observe('gold_mine_stage_seconds', self.training_seconds, stage='model_training')
+        self.trainings += 1
+        self.snapshot = snapshot
+        self._ready.set()
+        if self.path:
+            self._save(snapshot)
+        self._notify(snapshot)
+
+    def _notify(self, snapshot):
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                logger.exception("Model snapshot listener failed")
+
+    def current(self, timeout=30):
+        """The latest snapshot; only the very first request of a fresh deployment waits for one"""
+        self.start()
+        if self.snapshot is None:
+            self._ready.wait(timeout)
+        return self.snapshot
+
+    def metrics(self):
+        snapshot = self.snapshot
+        with self._condition:
+            version = self._version
+        return {
+            "version": snapshot.version if snapshot else None,
+            "dataVersion": version,
+            "staleRows": version - snapshot.version if snapshot else version,
+            "ageSeconds": time.time() - snapshot.trained_at if snapshot else None,
+            "trainings": self.trainings,
+            "trainingSeconds": self.training_seconds,
+            "snapshotLoadSeconds": self.load_seconds
+        }
+
+    def _save(self, snapshot):
+        data = {
+            'version': snapshot.version,
+            'trainedAt': snapshot.trained_at,
+            'models': [
+                {'site': site, 'regression': models.regression.to_json(), 'seasonal': models.seasonal.to_json()}
+                for site, models in snapshot.models.items()
+            ]
+        }
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, 'w') as snapshot_file:
+                json.dump(data, snapshot_file)
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save model snapshot: %s", e)
+
+    def _load(self):
+        if not self.path:
+            return
+        started = time.perf_counter()
+        try:
+            with open(self.path) as snapshot_file:
+                data = json.load(snapshot_file)
+            models = {
+                entry['site']: PartitionModels(RegressionFit.from_json(entry['regression']), SeasonalFit.from_json(entry['seasonal']))
+                for entry in data['models']
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Model snapshot unavailable, training from scratch: %s", e)
+            return
+        if data['version'] > self._version:
+            return  # Saved against rows this log does not have
+        self.snapshot = ModelSnapshot(data['version'], data['trainedAt'], models)
+        self.load_seconds = time.perf_counter() - started
+        self._ready.set()
+
+class SitePartition:
+    """One site's own columns, running aggregates and daily index
+    
+    Indices into its views, aggregates and daily index count the site's rows only;
+    view() maps them back to store rows.
+    """
+
+    def __init__(self, parent):
+        self._parent = parent
+        self._rows = np.empty(0, dtype=np.int64)
+        self.store = ProductionStore()
+        self.aggregates = AggregateEngine()
+        # A site has a few entries a day, so its ranges gather their rows rather than keep a sum per field and day
+        self.daily = DailyIndex(fields=(), groups=(), group_fields=(), moments=False)
+        self.model = RegressionModel()
+        self.store.subscribe(self.aggregates)
+        self.store.subscribe(self.daily)
+        self.store.subscribe(self.model)
+
+    def __getstate__(self):
+        # The parent store is linked back in by SitePartitions when unpickled
+        state = dict(self.__dict__, _rows=self._rows[:len(self.store)])
+        del state['_parent']
+        return state
+
+    def extend(self, batch):
+        start = len(self.store)
+        self._rows = _grown(self._rows, start + len(batch))
+        self._rows[start:start + len(batch)] = batch.rows
+        columns = {field: batch[field] for field in LOG_FIELDS}
+        self.store.extend_columns(columns, {field: batch.labels(field) for field in CATEGORICAL_FIELDS})
+
+    def view(self):
+        view = self.store.view()
+        view.rows = self._rows[:len(view)]
+        view.user_offset = self._parent.user_offset
+        return view
+
+
+Partition = namedtuple('Partition', ['view', 'aggregates', 'daily', 'model'])  # What SitePartition offers, for the whole store
+
+
+class SitePartitions:
+    """Store listener that routes every appended row to its site's partition
+    
+    Partitions restored from a snapshot stay pickled until a request or a new row needs
+    them, so a restart does not unpickle every site's aggregates and indexes up front.
+    """
+
+    def __init__(self, parent):
+        self._parent = parent
+        self._lock = Lock()
+        self._sites = {}
+        self._pickled = {}  # Restored partitions not needed yet
+
+    def __getstate__(self):
+        with self._lock:
+            sites, pickled = dict(self._sites), dict(self._pickled)
+        # One pickle per site, so a restart can unpickle sites one at a time
+        pickled.update((site, pickle.dumps(partition, protocol=pickle.HIGHEST_PROTOCOL)) for site, partition in sites.items())
+        return {'_pickled': {site: pickle.PickleBuffer(blob) for site, blob in pickled.items()}}
+
+    def __setstate__(self, state):
+        """Restore into a live instance, which keeps its parent store"""
+        with self._lock:
+            self._sites = {}
+            self._pickled = state['_pickled']
+
+    def _partition(self, site):
+        partition = self._sites.get(site)
+        if partition is None and site in self._pickled:
+            partition = self._sites[site] = pickle.loads(self._pickled.pop(site))
+            partition._parent = self._parent
+        return partition
+
+    def __call__(self, batch):
+        codes = batch['site']
+        labels = batch.labels('site')
+        # One stable sort groups the batch by site, keeping each site's rows in order
+        order = np.argsort(codes, kind='stable')
+        present, starts = np.unique(codes[order], return_index=True)
+        with self._lock:
+            for code, rows in zip(present, np.split(order, starts[1:])):
+                partition = self._partition(labels[code])
+                if partition is None:
+                    partition = self._sites[labels[code]] = SitePartition(self._parent)
+                partition.extend(batch.take(rows))
+
+    def __getitem__(self, site):
+        with self._lock:
+            partition = self._partition(site)
+        if partition is None:
+            raise KeyError(site)
+        return partition
+
+    def names(self):
+        with self._lock:
+            return sorted(self._sites.keys() | self._pickled.keys())
+
+
+def rows_to_columns(rows):
+    """Convert LOG_FIELDS tuples (or entry dicts) to (columns, labels) in ProductionStore.extend_columns form"""
+    rows = [tuple(row.get(field) for field in LOG_FIELDS) if isinstance(row, dict) else row for row in rows]
+    values = dict(zip(LOG_FIELDS, zip(*rows)))
+    columns = {}
+    labels = {}
+    for field in LOG_FIELDS:
+        if field in CATEGORICAL_FIELDS:
+            labels[field], columns[field] = np.unique(np.array(values[field], dtype=str), return_inverse=True)
+        else:
+            columns[field] = np.array(values[field], dtype=COLUMN_DTYPES[field])
+    return columns, labels
+
+
+class LogAppend:
+    """A column batch waiting for the log writer; start is its first row once committed"""
+
+    def __init__(self, columns, labels, seed=False):
+        self.length = len(columns['goldExtracted'])
+        created_at = np.asarray(columns.get('createdAt', np.datetime64('NaT')), dtype=COLUMN_DTYPES['createdAt'])
+        self.columns = {**columns, 'createdAt': np.broadcast_to(created_at, (self.length,))}
+        self.labels = {field: tuple(str(label) for label in labels[field]) for field in CATEGORICAL_FIELDS}
+        self.seed = seed
+        self.start = None
+        self.error = None
+        self.done = Event()
+
+
+def write_mapped(path, value):
+    """Atomically write value as a pickle followed by its out-of-band buffers (NumPy arrays, PickleBuffer blobs)
+    
+    Layout: magic, payload length, payload, aligned buffers, their (offset, length) table, table length.
+    """
+    buffers = []
+    payload = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC + len(payload).to_bytes(8, 'little') + payload)
+        spans = []
+        for buffer in buffers:
+            raw = buffer.raw()
+            position = snapshot_file.tell()
+            padding = -position % SNAPSHOT_ALIGNMENT
+            snapshot_file.write(bytes(padding))
+            spans.append((position + padding, raw.nbytes))
+            snapshot_file.write(raw)
+        table = pickle.dumps(spans)
+        snapshot_file.write(table + len(table).to_bytes(8, 'little'))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, path)
+
+def read_mapped(path):
+    """Load a write_mapped() file; its buffers become views of a private (copy-on-write) mapping, not copies"""
+    with open(path, 'rb') as snapshot_file:
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(mapped)
+    header = len(SNAPSHOT_MAGIC) + 8
+    if len(view) < header + 8 or view[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a snapshot")
+    payload_length = int.from_bytes(view[len(SNAPSHOT_MAGIC):header], 'little')
+    table_length = int.from_bytes(view[-8:], 'little')
+    spans = pickle.loads(view[len(view) - 8 - table_length:-8])
+    return pickle.loads(view[header:header + payload_length], buffers=[view[start:start + length] for start, length in spans])
+
+
+class ProductionLog:
+    """Durable SQLite (WAL) log of production rows, the source of truth shared by every worker process
+    
+    Appends are queued to a writer thread that commits everything pending in one transaction
+    (group commit) and only then applies it to the in-memory store, after any rows other
+    processes committed first, so row numbers and versions agree across workers.
+    
+    Snapshots hold the store's columns and, in a second file, the state of the derived
+    listeners (aggregates, indexes, site partitions, models), so a restart maps both in
+    instead of replaying every row through the listeners; only the log tail is replayed.
+    """
+
+    def __init__(self, path, snapshot_every=100000):
+        self.path = path
+        self.snapshot_path = None if path == ':memory:' else path + '.snapshot'
+        self.derived_path = None if path == ':memory:' else path + '.snapshot.derived'
+        self.snapshot_every = snapshot_every
+        self._queue = queue.Queue()
+        self._snapshot_rows = 0
+        self._store = None
+        self._derived = ()
+        self._writer = None
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=FULL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries (row INTEGER PRIMARY KEY, date TEXT, shift TEXT, '
+            'goldExtracted REAL, oreProcessed REAL, workers INTEGER, equipmentHours REAL, weather TEXT, '
+            'operationalCost REAL, efficiency REAL, costPerOunce REAL, site TEXT, createdAt TEXT)'
+        )
+        self._add_site_column()
+        self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        
+        # Separate connection so request threads can poll for other processes' commits
+        self._monitor = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._monitor_lock = Lock()
+        self._data_version = None
+
+    def _add_site_column(self):
+        """Upgrade a log written before sites existed; its rows all belong to DEFAULT_SITE"""
+        columns = {row[1] for row in self._connection.execute('PRAGMA table_info(entries)')}
+        if 'site' in columns:
+            return
+        try:
+            self._connection.execute(f"ALTER TABLE entries ADD COLUMN site TEXT NOT NULL DEFAULT '{DEFAULT_SITE}'")
+        except sqlite3.OperationalError as e:
+            # Another worker process upgraded it first
+            if 'duplicate column' not in str(e):
+                raise
+
+    def restore(self, store, derived=()):
+        """Load the snapshot plus the log tail into an empty store; returns rows restored
+        
+        derived are store listeners whose state is snapshotted with the columns. When the
+        saved state matches the snapshot they are restored from it rather than fed its rows.
+        """
+        self._derived = tuple(derived)
+        total = self._connection.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM entries').fetchone()[0]
+        start = 0
+        rebuilt = bool(self._derived)
+        if self.snapshot_path and total:
+            try:
+                snapshot = read_mapped(self.snapshot_path)
+                rows = snapshot['rows']
+                if rows <= total:
+                    columns = {field: snapshot['columns'][field].view(COLUMN_DTYPES[field]) for field in LOG_FIELDS}
+                    states = self._derived_states(rows)
+                    store.extend_columns(columns, snapshot['labels'], skip=self._derived if states else ())
+                    for listener, state in zip(self._derived, states or ()):
+                        listener.__setstate__(state)
+                    start = rows
+                    rebuilt = rebuilt and states is None
+            except (OSError, KeyError, ValueError, pickle.UnpicklingError) as e:
+                logger.warning("Snapshot unavailable, replaying full log: %s", e)
+        # Listeners rebuilt from the rows are snapshotted again at the next chance (at the latest on close)
+        self._snapshot_rows = 0 if rebuilt else start
+        
+        tail = self._tail(start)
+        if tail:
+            store.extend_columns(*rows_to_columns(tail))
+        
+        store.mark_user_offset(self._user_offset())
+        return total
+
+    def _derived_states(self, rows):
+        """Saved listener states for a snapshot of rows rows, or None if there are none that match"""
+        if not self._derived:
+            return None
+        try:
+            saved = read_mapped(self.derived_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logger.warning("Derived snapshot unreadable, rebuilding from the rows: %s", e)
+            return None
+        listeners = [type(listener).__name__ for listener in self._derived]
+        if (saved.get('version'), saved.get('rows'), saved.get('listeners')) != (DERIVED_SNAPSHOT_VERSION, rows, listeners):
+            return None
+        return saved['states']
+
+    def _tail(self, start):
+        return self._connection.execute(
+            f"SELECT {', '.join(LOG_FIELDS)} FROM entries WHERE row >= ? ORDER BY row", (start,)
+        ).fetchall()
+
+    def _user_offset(self):
+        user_offset = self._connection.execute("SELECT value FROM meta WHERE key = 'user_offset'").fetchone()
+        return int(user_offset[0]) if user_offset else 0
+
+    def attach(self, store):
+        """Start the writer that appends committed rows to store"""
+        self._store = store
+        self._writer = Thread(target=self._run, name='production-log-writer', daemon=True)
+        self._writer.start()
+
+    def append(self, columns, labels, seed=False):
+        """Durably append a column batch, then apply it to the store; returns its first row
+        
+        With seed=True the batch is training data, written only if the log is still empty, and
+        marks where user-recorded entries begin; returns None if another process seeded first.
+        """
+        item = LogAppend(columns, labels, seed)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise RuntimeError(f"Production log unavailable: {item.error}")
+        return item.start
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            appends = [item for item in items if isinstance(item, LogAppend)]
+            try:
+                with metrics.stage('log_commit'):
+                    foreign, user_offset = self._commit(appends)
+            except sqlite3.Error as e:
+                logger.exception("Production log commit failed")
+                for item in appends:
+                    item.error = e
+            else:
+                # Rows other workers committed first, then ours, in log order; listeners update the aggregates
+                try:
+                    with metrics.stage('store_apply'):
+                        if foreign:
+                            self._store.extend_columns(*rows_to_columns(foreign))
+                        for item in appends:
+                            if item.start is not None:
+                                self._store.extend_columns(item.columns, item.labels)
+                    if user_offset != self._store.user_offset:
+                        self._store.mark_user_offset(user_offset)
+                except Exception as e:
+                    # Keep the writer alive: waiting requests get the error instead of hanging
+                    logger.exception("Applying committed rows to the store failed")
+                    for item in appends:
+                        item.error = e
+            for item in items:
+                if isinstance(item, LogAppend):
+                    item.done.set()
+                elif isinstance(item, Event):
+                    item.set()
+            if None in items:
+                return
+            if self.snapshot_path and len(self._store) - self._snapshot_rows >= self.snapshot_every:
+                try:
+                    self.write_snapshot()
+                except OSError:
+                    logger.exception("Could not write the production snapshot")
+
+    def _commit(self, appends):
+        """One transaction, and so one fsync, for every append that queued up meanwhile"""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE' if appends else 'BEGIN')
+        try:
+            foreign = self._tail(len(self._store))
+            row = len(self._store) + len(foreign)
+            for item in appends:
+                if item.seed and row:
+                    continue
+                item.start = row
+                batch = ProductionView(item.columns, item.labels, item.length, 0, first_row=row)
+                connection.executemany(
+                    f"INSERT INTO entries (row, {', '.join(LOG_FIELDS)}) VALUES ({', '.join('?' * (len(LOG_FIELDS) + 1))})",
+                    self._rows(batch)
+                )
+                row += item.length
+                if item.seed:
+                    connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('user_offset', ?)", (str(row),))
+            user_offset = self._user_offset()
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        return foreign, user_offset
+
+    @staticmethod
+    def _rows(batch):
+        """The batch as SQLite row tuples, converted a column at a time rather than value by value"""
+        columns = []
+        for field in LOG_FIELDS:
+            values = batch[field]
+            if field in CATEGORICAL_FIELDS:
+                values = np.asarray(batch.labels(field) or [None], dtype=object)[values]
+            elif field == 'createdAt':
+                values = np.where(np.isnat(values), None, values.astype(str))
+            elif field == 'date':
+                values = values.astype(str)
+            columns.append(values.tolist())
+        return zip(range(batch.first_row, batch.first_row + len(batch)), *columns)
+
+    def flush(self):
+        """Block until everything queued so far is committed and rows from other processes are applied"""
+        done = Event()
+        self._queue.put(done)
+        done.wait()
+
+    def sync(self):
+        """Catch up on rows other worker processes committed; a single PRAGMA when nothing changed"""
+        with self._monitor_lock:
+            data_version = self._monitor.execute('PRAGMA data_version').fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+        if changed:
+            self.flush()
+
+    def write_snapshot(self):
+        """Write the committed columns and derived listener state to snapshots, atomically replacing the old ones
+        
+        Runs on the writer thread (or once it has stopped), so no rows land while the listeners are saved.
+        """
+        view = self._store.view()
+        rows = len(view)
+        if self._derived:
+            write_mapped(self.derived_path, {
+                'version': DERIVED_SNAPSHOT_VERSION,
+                'rows': rows,
+                'listeners': [type(listener).__name__ for listener in self._derived],
+                'states': [listener.__getstate__() for listener in self._derived]
+            })
+        write_mapped(self.snapshot_path, {
+            'rows': rows,
+            'columns': {field: view[field].view(np.uint8) for field in LOG_FIELDS},  # Raw bytes, so dates map too
+            'labels': {field: list(view.labels(field)) for field in CATEGORICAL_FIELDS}
+        })
+        self._snapshot_rows = rows
+
+    def close(self):
+        """Commit outstanding rows, snapshot and stop the writer"""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+        if self.snapshot_path and len(self._store) > self._snapshot_rows:
+            self.write_snapshot()
+        self._connection.close()
+        self._monitor.close()
+
+
+class PriceHistory:
+    """Fixed-size ring buffer of price ticks keyed by epoch seconds"""
+
+    def __init__(self, capacity=4096, window=24 * 3600):
+        self.window = window
+        self._lock = Lock()
+        self._times = np.zeros(capacity)
+        self._prices = np.zeros(capacity)
+        self._changes = np.zeros(capacity)
+        self._sources = [None] * capacity
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, epoch, price, change, source):
+        with self._lock:
+            capacity = len(self._times)
+            self._times[self._next] = epoch
+            self._prices[self._next] = price
+            self._changes[self._next] = change
+            self._sources[self._next] = source
+            self._next = (self._next + 1) % capacity
+            self._size = min(self._size + 1, capacity)
+
+    def _ordered(self):
+        start = (self._next - self._size) % len(self._times)
+        return (np.arange(self._size) + start) % len(self._times)
+
+    def entries(self, since=None):
+        """Ticks newer than since (default: the retention window), oldest first"""
+        since = time.time() - self.window if since is None else since
+        with self._lock:
+            order = self._ordered()
+            order = order[self._times[order] > since]
+            return [
+                {
+                    'price': float(self._prices[i]),
+                    'timestamp': datetime.fromtimestamp(self._times[i]).isoformat(),
+                    'change': float(self._changes[i]),
+                    'source': self._sources[i]
+                }
+                for i in order
+            ]
+
+    def series(self, since=None):
+        """(epoch seconds, prices) of ticks newer than since (default: the retention window), oldest first"""
+        since = time.time() - self.window if since is None else since
+        with self._lock:
+            order = self._ordered()
+            order = order[self._times[order] > since]
+            return self._times[order], self._prices[order]
+
+    def average(self, since=None):
+        """Mean price over ticks newer than since (default: the retention window), or None"""
+        since = time.time() - self.window if since is None else since
+        with self._lock:
+            order = self._ordered()
+            prices = self._prices[order][self._times[order] > since]
+        return float(np.mean(prices)) if len(prices) else None
+
+    def volatility(self, horizon, min_ticks=10):
+        """Standard deviation of log price changes scaled to horizon seconds, from live ticks; None if too few"""
+        since = time.time() - self.window
+        with self._lock:
+            order = self._ordered()
+            live = np.array([self._sources[i] != 'intelligent_simulation' for i in order], dtype=bool)
+            keep = live & (self._times[order] > since)
+            times, prices = self._times[order][keep], self._prices[order][keep]
+        if len(prices) < min_ticks or times[-1] <= times[0]:
+            return None
+        returns = np.diff(np.log(prices))
+        step = (times[-1] - times[0]) / len(returns)
+        volatility = float(np.std(returns) * math.sqrt(horizon / step))
+        return volatility if volatility > 0 else None
+
+
+class CircuitBreaker:
+    """Per-source breaker: opens after repeated failures and retries after jittered exponential backoff"""
+
+    def __init__(self, failure_threshold=3, base_delay=30, max_delay=1800):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def is_open(self):
+        return self.failures >= self.failure_threshold and time.time() < self.retry_at
+
+    def allow(self):
+        return not self.is_open
+
+    def record_success(self):
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - self.failure_threshold))
+            # Jitter so that workers sharing an upstream do not retry in lockstep
+            self.retry_at = time.time() + delay * random.uniform(0.5, 1.0)
+
+
+class SharedQuote:
+    """Latest price quote kept in the production database, so every worker process serves the same price"""
+
+    def __init__(self, path):
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def load(self):
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'gold_price_quote'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, quote):
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('gold_price_quote', ?)", (json.dumps(quote),))
+
+    def claim_refresh(self, ttl):
+        """Take the upstream refresh lease for ttl seconds; False while another worker holds it"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            lease = self._connection.execute("SELECT value FROM meta WHERE key = 'gold_price_lease'").fetchone()
+            if lease and float(lease[0]) > now:
+                self._connection.execute('ROLLBACK')
+                return False
+            self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('gold_price_lease', ?)", (str(now + ttl),))
+            self._connection.execute('COMMIT')
+            return True
+
+
+class GoldPriceService:
+    """Serves the latest gold price from memory and refreshes it from the API sources in the background"""
+
+    def __init__(self, sources, refresh_interval=300, timeout=10, shared=None, poll_interval=5):
+        self.sources = sources
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.shared = shared
+        self.poll_interval = min(poll_interval, refresh_interval) if shared else refresh_interval
+        self.breakers = {source['name']: CircuitBreaker() for source in sources}
+        self.history = PriceHistory()
+        self._lock = Lock()
+        self._wake = Event()
+        self._listeners = []
+        self._quote = None
+        self._price = None
+        self._thread = None
+
+    def subscribe(self, listener):
+        """Register a callable that receives every new quote"""
+        self._listeners.append(listener)
+
+    def quote(self):
+        """Latest quote, never blocking on upstream; a stale or missing quote triggers a background refresh"""
+        self.start()
+        with self._lock:
+            quote = self._quote
+        if quote is None and self.shared is not None:
+            shared = self.shared.load()
+            quote = self._adopt(shared) if shared else None
+        if quote is None:
+            # First request since startup: answer from the simulation while the sources are tried
+            self._wake.set()
+            return self._simulate()
+        age = time.time() - quote['epoch']
+        if age > self.refresh_interval:
+            self._wake.set()
+        return {key: value for key, value in quote.items() if key != 'epoch'}
+
+    def start(self):
+        """Start the refresh thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='gold-price-refresh', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Gold price refresh failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _fetch(self, source):
+        req = urllib.request.Request(source["url"])
+        for key, value in source.get("headers", {}).items():
+            req.add_header(key, value)
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            return source["parser"](json.loads(response.read().decode()))
+
+    def refresh(self):
+        """Try each source whose breaker is closed; publishes the result
+        
+        When none answers, the last good quote keeps being served, stale, and only a service
+        that never had one falls back to simulation. With a shared quote, a fresh quote from
+        another worker is adopted instead, and only the worker holding the refresh lease calls upstream.
+        """
+        if self.shared is not None:
+            quote = self.shared.load()
+            fresh = quote is not None and time.time() - quote['epoch'] < self.refresh_interval
+            if fresh or not self.shared.claim_refresh(self.timeout * len(self.sources) + self.poll_interval):
+                return self._adopt(quote) if quote else None
+            if quote:
+                self._adopt(quote)  # Another worker's last good quote, should every source fail here too
+        
+        for source in self.sources:
+            breaker = self.breakers[source['name']]
+            if not breaker.allow():
+                continue
+            try:
+                with metrics.stage('price_fetch'):
+                    price = self._fetch(source)
+            except Exception as e:
+                logger.warning("API %s failed: %s", source['name'], e)
+                metrics.increment('gold_mine_price_source_failures_total', source=source['name'])
+                breaker.record_failure()
+                continue
+
+            if price and 1500 <= price <= 3000:  # Sanity check for realistic gold prices
+                breaker.record_success()
+                return self._publish(price, source['name'])
+            metrics.increment('gold_mine_price_source_failures_total', source=source['name'])
+            breaker.record_failure()
+
+        if self.sources:
+            metrics.increment('gold_mine_price_fallbacks_total')
+        with self._lock:
+            last = self._quote
+        if last is not None and last['source'] != 'intelligent_simulation':
+            return last
+        quote = self._simulate()
+        return self._publish(quote['price'], quote['source'], note=quote['note'])
+
+    def _simulate(self):
+        """Realistic gold price simulation with market-like volatility, used when all APIs are unavailable"""
+        base_price = 2025  # Current approximate gold price (as of 2024)
+
+        # Simulate realistic intraday volatility (0.5-2% typical)
+        volatility = 0.01  # 1% volatility
+        random_factor = (random.random() - 0.5) * 2  # -1 to +1
+        price_change = base_price * volatility * random_factor
+
+        # Add trend component (slight upward bias for gold)
+        trend_component = 0.25 * random.random()  # Small upward trend
+
+        # Ensure price stays within realistic bounds
+        simulated_price = max(1800, min(2500, base_price + price_change + trend_component))
+        change = simulated_price - self._price if self._price else 0
+
+        return {
+            "success": True,
+            "price": round(simulated_price, 2),
+            "change": round(change, 2),
+            "timestamp": datetime.now().isoformat(),
+            "source": "intelligent_simulation",
+            "note": "Real-time APIs unavailable. Using market-pattern simulation."
+        }
+
+    def _publish(self, price, source, note=None):
+        now = time.time()
+        change = price - self._price if self._price else 0
+        quote = {
+            "success": True,
+            "price": round(price, 2),
+            "change": round(change, 2),
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+            "source": source,
+            "epoch": now
+        }
+        if note:
+            quote["note"] = note
+
+        if self.shared is not None:
+            self.shared.save(quote)
+        return self._adopt(quote)
+
+    def _adopt(self, quote):
+        with self._lock:
+            if self._quote is not None and self._quote['epoch'] >= quote['epoch']:
+                return self._quote
+            self._price = quote['price']
+            self._quote = quote
+        self.history.append(quote['epoch'], quote['price'], quote['change'], quote['source'])
+        for listener in self._listeners:
+            listener(quote['price'], quote)
+        return quote
+
+
+class ResponseCache:
+    """LRU cache of rendered response bodies and their ETags"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+class EventSubscriber:
+    """One dashboard stream's bounded queue of encoded events"""
+
+    def __init__(self, size):
+        self.queue = deque(maxlen=size)
+        self.lagged = False
+        self.wake = Event()
+
+
+class EventBroadcaster:
+    """Fans new-entry, price and model-version events out to every open dashboard stream
+    
+    Each event is encoded once and the same bytes are queued for every subscriber, so a
+    publish costs one append per stream. Queues are bounded: a stream that falls
+    EVENT_QUEUE_SIZE events behind has its backlog dropped and is sent a single resync
+    event instead, so a stalled client never holds memory or slows the others down.
+    """
+
+    def __init__(self, queue_size=EVENT_QUEUE_SIZE, poll=None, poll_interval=EVENT_POLL_SECONDS):
+        self.queue_size = queue_size
+        self.stream_id = f"{os.getpid()}.{int(time.time())}"
+        self.published = 0
+        self.dropped = 0
+        self._poll = poll
+        self._poll_interval = poll_interval
+        self._lock = Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=queue_size)
+        self._thread = None
+
+    def publish(self, name, data):
+        """Queue an event for every subscriber; never blocks on a slow client"""
+        with self._lock:
+            self.published += 1
+            event_id = f"{self.stream_id}.{self.published}"
+            message = f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data)}\n\n".encode()
+            self._recent.append((self.published, message))
+            for subscriber in self._subscribers:
+                if len(subscriber.queue) == self.queue_size:
+                    subscriber.lagged = True
+                    subscriber.queue.clear()
+                    self.dropped += 1
+                if not subscriber.lagged:
+                    subscriber.queue.append(message)
+                subscriber.wake.set()
+
+    def subscribe(self, last_event_id=None):
+        """Open a stream; with the Last-Event-ID of a dropped connection, missed events are replayed"""
+        subscriber = EventSubscriber(self.queue_size)
+        with self._lock:
+            if last_event_id:
+                stream_id, _, number = last_event_id.rpartition('.')
+                if stream_id == self.stream_id and number.isdigit() and (not self._recent or self._recent[0][0] <= int(number) + 1):
+                    subscriber.queue.extend(message for published, message in self._recent if published > int(number))
+                else:
+                    # Reconnected to another worker, or missed more than is kept: start over
+                    subscriber.lagged = True
+                subscriber.wake.set()
+            self._subscribers.add(subscriber)
+            if self._poll is not None and self._thread is None:
+                self._thread = Thread(target=self._run, name='event-poll', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self, subscriber, keepalive=EVENT_KEEPALIVE_SECONDS):
+        """Server-sent event bytes for one subscriber, ending when the client disconnects"""
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                if not subscriber.wake.wait(keepalive):
+                    yield b": keep-alive\n\n"
+                    continue
+                subscriber.wake.clear()
+                with self._lock:
+                    messages = list(subscriber.queue)
+                    subscriber.queue.clear()
+                    lagged, subscriber.lagged = subscriber.lagged, False
+                if lagged:
+                    yield b"event: resync\ndata: {}\n\n"
+                if messages:
+                    yield b"".join(messages)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _run(self):
+        # Rows other worker processes commit only reach this one when it syncs
+        while True:
+            time.sleep(self._poll_interval)
+            if self._subscribers:
+                try:
+                    self._poll()
+                except Exception:
+                    logger.exception("Event poll failed")
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": self.dropped
+            }
+
+    def on_entries(self, batch):
+        """Store listener: announce new rows, including the entries themselves for small batches"""
+        version = batch.first_row + len(batch)
+        event = {"version": version, "rows": len(batch)}
+        if len(batch) <= EVENT_MAX_ENTRIES:
+            first = max(batch.user_offset - batch.first_row, 0)
+            event["entries"] = batch.records(first)
+        self.publish('entries', event)
+
+    def on_price(self, price, quote):
+        """Price service listener"""
+        self.publish('price', {key: value for key, value in quote.items() if key != 'epoch'})
+
+    def on_models(self, snapshot):
+        """Model trainer listener: cached insights from older model versions are now stale"""
+        self.publish('insights', {"modelVersion": snapshot.version, "trainedAt": snapshot.trained_at})
+
+class Histogram:
+    """Latency histogram with fixed buckets, in the Prometheus cumulative layout when rendered"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class StageTimer:
+    """Context manager timing one stage of a request into the stage histogram"""
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe('gold_mine_stage_seconds', time.perf_counter() - self.started, stage=self.stage)
+
+
+class MetricsRegistry:
+    """Per-process histograms, counters and scrape-time gauges, rendered in Prometheus text format
+    
+    Recording costs a bisect and a dict update under one lock; values such as the dataset size
+    are read only when /metrics is scraped. When disabled, recording calls
+    return at once and stage() hands back a shared no-op context manager.
+    """
+
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    NO_STAGE = contextlib.nullcontext()
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collected = {}
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.BUCKETS)
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def stage(self, name):
+        """Time a `with` block as one stage of the current request or background job"""
+        return StageTimer(self, name) if self.enabled else self.NO_STAGE
+
+    def register(self, name, collect, kind='gauge'):
+        """Register a metric read at scrape time: collect() returns a number, {labels: number} or None"""
+        self._collected[name] = (kind, collect)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = [(key, list(histogram.counts), histogram.total) for key, histogram in self._histograms.items()]
+            counters = list(self._counters.items())
+        
+        lines = []
+        described = set()
+        
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+        
+        for (name, labels), counts, total in sorted(histograms):
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip([*self.BUCKETS, '+Inf'], counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {total}")
+            lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+        for (name, labels), value in sorted(counters):
+            describe(name, 'counter')
+            lines.append(f"{name}{self._labels(labels)} {value}")
+        for name, (kind, collect) in self._collected.items():
+            try:
+                values = collect()
+            except Exception:
+                logger.exception("Metric %s unavailable", name)
+                continue
+            if values is None:
+                continue
+            describe(name, kind)
+            for labels, value in (values.items() if isinstance(values, dict) else [((), values)]):
+                lines.append(f"{name}{self._labels(labels)} {float(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+METRIC_HELP = {
+    'gold_mine_request_seconds': "Time spent in each route's handler",
+    'gold_mine_stage_seconds': "Time spent in each stage of request handling and background work",
+    'gold_mine_price_source_failures_total': "Failed gold price fetches per API source",
+    'gold_mine_price_fallbacks_total': "Refreshes no API source answered, so the last good quote or intelligent_simulation was served",
+    'gold_mine_rows': "Production rows in the store",
+    'gold_mine_user_entries': "Production rows recorded by users rather than seeded as training data",
+    'gold_mine_sites': "Sites with production data",
+    'gold_mine_response_cache_hits_total': "Insight responses served from the response cache",
+    'gold_mine_response_cache_misses_total': "Insight responses that had to be computed",
+    'gold_mine_response_cache_hit_ratio': "Share of insight requests served from the response cache",
+    'gold_mine_response_cache_entries': "Entries held in the response cache",
+    'gold_mine_model_version': "Data version the current model snapshot was trained on",
+    'gold_mine_model_stale_rows': "Rows that arrived since the current model snapshot was trained",
+    'gold_mine_gold_price': "Gold price the insights are using",
+    'gold_mine_event_subscribers': "Open dashboard event streams",
+    'gold_mine_events_dropped_total': "Event stream backlogs dropped because a dashboard fell behind"
+}
+
+metrics = MetricsRegistry(DEFAULT_CONFIG['METRICS_ENABLED'])
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with encoding timed as its own stage"""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.stage('json_encode'):
+            return super().dumps(obj, **kwargs)
+
+
+app.json = TimedJSONProvider(app)
+
+
+class RequestProfile:
+    """Stack samples and allocation stats for one request
+    
+    A daemon thread reads the request thread's stack from sys._current_frames() every
+    interval, so the handler itself runs unmodified; only the sampler pays for the walk.
+    The GIL switch interval is lowered to the sampling interval meanwhile, or CPU-bound
+    handlers would only yield to the sampler every 5 ms. With allocations on, tracemalloc
+    traces the request too; that slows allocation-heavy pure Python many times over, so
+    leave it off when the durations themselves matter.
+    """
+
+    def __init__(self, method, path, interval, allocations=True):
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.traces_allocations = allocations
+        self.thread_id = get_ident()
+        self.stacks = {}  # Collapsed stack, root first -> samples
+        self.samples = 0
+        self._stopping = Event()
+        self._sampler = Thread(target=self._sample, name='profile-sampler', daemon=True)
+
+    def start(self):
+        if self.traces_allocations:
+            self._owns_tracing = not tracemalloc.is_tracing()
+            if self._owns_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.take_snapshot()
+            self._baseline_bytes = tracemalloc.get_traced_memory()[0]
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self.recorded_at = datetime.now().isoformat()
+        self.started = time.perf_counter()
+        self._sampler.start()
+
+    def _sample(self):
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def stop(self, status, top_allocations):
+        self.seconds = time.perf_counter() - self.started
+        self._stopping.set()
+        self._sampler.join()
+        sys.setswitchinterval(self._switch_interval)
+        self.status = status
+        if not self.traces_allocations:
+            self.peak_bytes = self.retained_bytes = self.allocations = None
+            return
+        
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._owns_tracing:
+            tracemalloc.stop()
+        self.peak_bytes = peak - self._baseline_bytes
+        self.retained_bytes = current - self._baseline_bytes
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        growth = snapshot.filter_traces(ignored).compare_to(self._baseline.filter_traces(ignored), 'lineno')
+        self.allocations = [
+            {
+                "location": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "sizeKb": round(stat.size_diff / 1024, 1),
+                "blocks": stat.count_diff
+            }
+            for stat in growth[:top_allocations] if stat.size_diff > 0
+        ]
+        self._baseline = None
+
+    def collapsed(self):
+        """The stacks in the collapsed format flamegraph.pl, speedscope and inferno read"""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "recordedAt": self.recorded_at,
+            "durationMs": round(self.seconds * 1000, 2),
+            "samples": self.samples,
+            "intervalMs": self.interval * 1000,
+            "peakAllocatedKb": None if self.peak_bytes is None else round(self.peak_bytes / 1024, 1),
+            "retainedKb": None if self.retained_bytes is None else round(self.retained_bytes / 1024, 1)
+        }
+
+    def details(self, top_functions=15):
+        """The summary plus the functions most often on top of the stack and the largest allocation sites"""
+        leaves = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        hottest = sorted(leaves.items(), key=lambda item: -item[1])[:top_functions]
+        return {
+            **self.summary(),
+            "hottestFunctions": [
+                {"function": leaf, "samples": count, "share": round(count / self.samples, 3)} for leaf, count in hottest
+            ],
+            "allocations": self.allocations
+        }
+
+
+class Profiler:
+    """On-demand request profiling and the most recent profiles of this process
+    
+    tracemalloc is process-wide, so one request is profiled at a time; a request asking
+    for a profile while another runs is served normally. Paths can also be armed to
+    profile their next few requests, for traffic whose headers cannot be changed.
+    """
+
+    KEEP = 20
+    TOP_ALLOCATIONS = 25
+    MAX_ARMED = 100
+
+    def __init__(self):
+        self._running = Lock()
+        self._lock = Lock()
+        self._armed = {}  # Path -> (requests left to profile, trace allocations)
+        self._profiles = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def arm(self, path, count, allocations=True):
+        """Profile the next count requests to path; a count of 0 disarms it"""
+        with self._lock:
+            if count:
+                self._armed[path] = (count, allocations)
+            else:
+                self._armed.pop(path, None)
+        return self.armed()
+
+    def armed(self):
+        with self._lock:
+            return {path: {"count": count, "allocations": allocations} for path, (count, allocations) in self._armed.items()}
+
+    def take_armed(self, path):
+        """Use up one armed profile for this path: whether to trace allocations, or None if none are left"""
+        with self._lock:
+            if path not in self._armed:
+                return None
+            left, allocations = self._armed[path]
+            if left == 1:
+                del self._armed[path]
+            else:
+                self._armed[path] = (left - 1, allocations)
+            return allocations
+
+    def begin(self, method, path, interval, allocations=True):
+        """Start profiling the calling thread's request, or return None if another profile is running"""
+        if not self._running.acquire(blocking=False):
+            return None
+        try:
+            profile = RequestProfile(method, path, interval, allocations)
+            profile.start()
+        except BaseException:
+            self._running.release()
+            raise
+        return profile
+
+    def finish(self, profile, status):
+        """Stop a profile begun by begin(), keep it and return its id"""
+        try:
+            profile.stop(status, self.TOP_ALLOCATIONS)
+        finally:
+            self._running.release()
+        profile_id = f"{os.getpid()}-{next(self._ids)}"
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.KEEP:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def summaries(self):
+        with self._lock:
+            return [{"id": profile_id, **profile.summary()} for profile_id, profile in reversed(self._profiles.items())]
+
+
+profiler = Profiler()
+
+# Runtime state, built on first use by initialize_state()
+production_store = None
+aggregates = None
+trends = None
+daily_index = None
+production_model = None
+site_partitions = None
+model_trainer = None
+production_log = None
+price_service = None
+event_broadcaster = None
+_state_lock = Lock()
+
+# Global gold price data
+current_gold_price = 2000  # Default fallback price
+
+# Multiple API sources for reliability
+GOLD_PRICE_SOURCES = [
+    {
+        "name": "MetalPriceAPI",
+        "url": "https://api.metalpriceapi.com/v1/latest?api_key=demo&base=USD&currencies=XAU",
+        "parser": lambda data: 1 / float(data['rates']['XAU']) if 'rates' in data and 'XAU' in data['rates'] else None
+    },
+    {
+        "name": "GoldAPI",
+        "url": "https://www.goldapi.io/api/XAU/USD",
+        "headers": {"X-ACCESS-TOKEN": "goldapi-demo-key"},
+        "parser": lambda data: float(data['price']) if 'price' in data else None
+    }
+]
+
+def update_current_gold_price(price, quote):
+    """Price service listener: keep the module-level price the ML endpoints read current"""
+    global current_gold_price
+    current_gold_price = price
+
+metrics.register('gold_mine_rows', lambda: len(production_store))
+metrics.register('gold_mine_user_entries', lambda: len(production_store) - production_store.user_offset)
+metrics.register('gold_mine_sites', lambda: len(site_partitions.names()))
+metrics.register('gold_mine_response_cache_hits_total', lambda: response_cache.hits, kind='counter')
+metrics.register('gold_mine_response_cache_misses_total', lambda: response_cache.misses, kind='counter')
+metrics.register('gold_mine_response_cache_hit_ratio', lambda: response_cache.hits / max(response_cache.hits + response_cache.misses, 1))
+metrics.register('gold_mine_response_cache_entries', lambda: len(response_cache))
+metrics.register('gold_mine_model_version', lambda: model_trainer.metrics()['version'])
+metrics.register('gold_mine_model_stale_rows', lambda: model_trainer.metrics()['staleRows'])
+metrics.register('gold_mine_gold_price', lambda: current_gold_price)
+metrics.register('gold_mine_event_subscribers', lambda: event_broadcaster.metrics()['subscribers'])
+metrics.register('gold_mine_events_dropped_total', lambda: event_broadcaster.metrics()['dropped'], kind='counter')
+
+
+# Simulated historical data for ML training
+SHIFT_MULTIPLIERS = {'Day': 1.2, 'Evening': 1.0, 'Night': 0.8}  # Base production varies by shift
+WEATHER_MULTIPLIERS = {
+    'Clear': 1.1, 'Partly Cloudy': 1.0, 'Cloudy': 0.95,
+    'Light Rain': 0.85, 'Heavy Rain': 0.6, 'Windy': 0.9
+}
+WEATHER_PROBABILITIES = {
+    'Clear': 0.3, 'Partly Cloudy': 0.25, 'Cloudy': 0.2,
+    'Light Rain': 0.15, 'Heavy Rain': 0.05, 'Windy': 0.05
+}
+
+def generate_training_data(days=90, shifts=tuple(SHIFT_MULTIPLIERS), sites=1, seed=None, end_date=None):
+    """Generate realistic gold mining production data for ML training
+    
+    Produces days x sites x shifts rows (ordered by day, then site, then shift) in one
+    batch of array ops and returns (columns, labels) for ProductionStore.extend_columns.
+    seed is anything numpy.random.default_rng accepts, including a Generator.
+    """
+    rng = np.random.default_rng(seed)
+    weather_conditions = list(WEATHER_MULTIPLIERS)
+    site_labels = [f"Site {i + 1}" for i in range(sites)]
+    rows_per_day = sites * len(shifts)
+    count = days * rows_per_day
+    
+    end_date = np.datetime64(end_date or datetime.now().date(), 'D')
+    day_index = np.repeat(np.arange(days), rows_per_day)
+    shift_codes = np.tile(np.arange(len(shifts), dtype=np.int16), days * sites)
+    site_codes = np.tile(np.repeat(np.arange(sites, dtype=np.int16), len(shifts)), days)
+    
+    # Weather impact on production
+    weather_codes = rng.choice(len(weather_conditions), size=count, p=[WEATHER_PROBABILITIES[w] for w in weather_conditions]).astype(np.int16)
+    base_production = 35 * np.array([SHIFT_MULTIPLIERS[shift] for shift in shifts])[shift_codes]
+    
+    # Calculate production with realistic variations
+    production_factor = np.array([WEATHER_MULTIPLIERS[w] for w in weather_conditions])[weather_codes] * (0.8 + 0.4 * rng.random(count))
+    gold_extracted = base_production * production_factor
+    
+    # Ore processing correlates with gold production but has variance
+    ore_efficiency = 0.025 + 0.015 * rng.random(count)  # 2.5-4% efficiency range
+    ore_processed = gold_extracted / ore_efficiency
+    
+    # Workers and equipment hours
+    workers = rng.integers(18, 32, size=count, dtype=np.int32)
+    equipment_hours = workers * 8 * (0.8 + 0.4 * rng.random(count))
+    
+    # Operational costs
+    base_cost_per_worker = 200 + 100 * rng.random(count)
+    equipment_cost_per_hour = 50 + 25 * rng.random(count)
+    operational_cost = workers * base_cost_per_worker + equipment_hours * equipment_cost_per_hour
+    
+    columns = {
+        'date': end_date - days + day_index,
+        'shift': shift_codes,
+        'site': site_codes,
+        'goldExtracted': np.round(gold_extracted, 2),
+        'oreProcessed': np.round(ore_processed, 1),
+        'workers': workers,
+        'equipmentHours': np.round(equipment_hours, 1),
+        'weather': weather_codes,
+        'operationalCost': np.round(operational_cost, 2),
+        'efficiency': np.round((gold_extracted / ore_processed) * 100, 2),
+        'costPerOunce': np.round(operational_cost / gold_extracted, 2)
+    }
+    labels = {'shift': list(shifts), 'site': site_labels, 'weather': weather_conditions}
+    
+    return columns, labels
+
+def load_production_data(store, log, derived=()):
+    """Restore persisted production data, seeding the store with training data on first run"""
+    restored = log.restore(store, derived)
+    log.attach(store)
+    if not restored:
+        # Another worker process may seed first; the log then keeps its rows instead
+        log.append(*generate_training_data(
+            days=app.config['TRAINING_DAYS'], sites=app.config['TRAINING_SITES'], seed=app.config['TRAINING_SEED']
+        ), seed=True)
+
+def train_models(whole, sites):
+    """Fit every partition's models: the whole store (under None) and each site"""
+    partitions = {None: whole, **{name: sites[name] for name in sites.names()}}
+    return {
+        site: PartitionModels(partition.model.fit(), SeasonalFit.fit(partition.daily.daily()))
+        for site, partition in partitions.items()
+    }
+
+def initialize_state():
+    """Build the store, aggregates, log and price service; runs once, on first use rather than at import"""
+    global production_store, aggregates, trends, daily_index, production_model, site_partitions, model_trainer, production_log, price_service, event_broadcaster
+    with _state_lock:
+        if production_store is not None:
+            return
+        started = time.perf_counter()
+        
+        store = ProductionStore()
+        engine = AggregateEngine()
+        store.subscribe(engine)
+        trend_engine = TrendEngine()
+        store.subscribe(trend_engine)
+        day_index = DailyIndex()
+        store.subscribe(day_index)
+        model = RegressionModel()
+        store.subscribe(model)
+        sites = SitePartitions(store)
+        store.subscribe(sites)
+        whole = Partition(store.view, engine, day_index, model)
+        trainer = ModelTrainer(
+            functools.partial(train_models, whole, sites),
+            path=None if app.config['DATA_PATH'] == ':memory:' else app.config['DATA_PATH'] + '.models.json',
+            retrain_rows=app.config['MODEL_RETRAIN_ROWS'], retrain_seconds=app.config['MODEL_RETRAIN_SECONDS']
+        )
+        store.subscribe(trainer)
+        log = ProductionLog(app.config['DATA_PATH'])
+        load_production_data(store, log, derived=(engine, trend_engine, day_index, model, sites))
+        atexit.register(log.close)
+        broadcaster = EventBroadcaster(poll=log.sync)
+        store.subscribe(broadcaster.on_entries)
+        trainer.subscribe(functools.partial(precompute_risk_paths, whole, sites))  # Before dashboards are told to refetch
+        trainer.subscribe(broadcaster.on_models)
+        trainer.start()
+        
+        service = GoldPriceService(GOLD_PRICE_SOURCES, shared=SharedQuote(app.config['DATA_PATH']))
+        service.subscribe(update_current_gold_price)
+        service.subscribe(broadcaster.on_price)
+        
+        # Publish only fully built state to concurrent requests
+        production_store, aggregates, trends, daily_index, production_model, site_partitions = store, engine, trend_engine, day_index, model, sites
+        model_trainer, production_log, price_service, event_broadcaster = trainer, log, service, broadcaster
+        app.config['STATE_LOAD_SECONDS'] = time.perf_counter() - started
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_started = time.perf_counter()
+
+@app.before_request
+def ensure_state():
+    if production_store is None:
+        initialize_state()
+    with metrics.stage('log_sync'):
+        production_log.sync()
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('gold_mine_request_seconds', time.perf_counter() - started, route=route, method=request.method, status=response.status_code)
+    return response
+
+def profile_token_matches():
+    token = app.config['PROFILE_TOKEN']
+    supplied = request.headers.get('X-Profile-Token')
+    return bool(token) and supplied is not None and hmac.compare_digest(supplied.encode(), token.encode())
+
+@app.before_request
+def start_profile():
+    """Profile this request if it carries the profile token or its path is armed"""
+    if not app.config['PROFILE_TOKEN'] or request.path.startswith('/api/admin/'):
+        return
+    if profile_token_matches():
+        allocations = request.headers.get('X-Profile-Allocations', '1') != '0'
+    else:
+        allocations = profiler.take_armed(request.path)
+        if allocations is None:
+            return
+    g.profile = profiler.begin(request.method, request.full_path.rstrip('?'), app.config['PROFILE_INTERVAL'], allocations)
+
+@app.after_request
+def finish_profile(response):
+    if 'profile' in g:
+        profile = g.pop('profile')
+        if profile is None:
+            response.headers['X-Profile-Status'] = 'busy'
+        else:
+            response.headers['X-Profile-Id'] = profiler.finish(profile, response.status_code)
+    return response
+
+@app.teardown_request
+def abandon_profile(error):
+    """Release the profiler if the request failed before finish_profile ran"""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.finish(profile, 500)
+
+def use_gunicorn_error_log():
+    """Under gunicorn, send this module's log records (tracebacks included) to its error log"""
+    error_log = logging.getLogger('gunicorn.error')
+    if error_log.handlers:
+        logger.handlers = error_log.handlers
+        logger.setLevel(error_log.level)
+        logger.propagate = False
+
+def create_app(config=None):
+    """Application factory: applies config overrides and returns the app
+    
+    Nothing heavy happens here. NumPy, the stored data (or synthetic training data)
+    and the dashboard template are all loaded on first use.
+    """
+    app.config.update(config or {})
+    use_gunicorn_error_log()
+    metrics.enabled = app.config['METRICS_ENABLED']
+    app.config['STARTUP_SECONDS'] = time.perf_counter() - STARTUP_STARTED
+    if app.config['STARTUP_SECONDS'] > app.config['STARTUP_BUDGET_SECONDS']:
+        logger.warning("Startup took %.3fs, over the %ss budget", app.config['STARTUP_SECONDS'], app.config['STARTUP_BUDGET_SECONDS'])
+    return app
+
+Asset = namedtuple('Asset', ['mimetype', 'etag', 'encodings'])  # encodings: content coding -> body bytes
+
+def compressed_asset(body, mimetype):
+    """An asset with its body precompressed in every coding that actually makes it smaller"""
+    encodings = {'identity': body}
+    compressors = {'gzip': lambda data: gzip.compress(data, 9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        compressors['br'] = lambda data: brotli.compress(data, quality=11)
+    for coding, compress in compressors.items():
+        compressed = compress(body)
+        if len(compressed) < len(body):
+            encodings[coding] = compressed
+    return Asset(mimetype, hashlib.blake2b(body, digest_size=16).hexdigest(), encodings)
+
+class DashboardAssets:
+    """The dashboard shell and the files it loads, rendered and compressed once
+    
+    The template's inline CSS and JS move to /assets/ under content-hashed names, so they
+    can be cached for a year and a new release changes their URLs. Chart.js and Font Awesome
+    are served the same way, from vendor_path, when they have been vendored there.
+    """
+
+    def __init__(self, template, vendor_path=None):
+        self.assets = {}
+        html = template
+        style = re.search(r'<style>(.*?)</style>', html, re.S)
+        html = html.replace(style.group(0), f'<link href="{self.add("dashboard.css", style.group(1).encode(), "text/css")}" rel="stylesheet">')
+        script = re.search(r'<script>(.*?)</script>', html, re.S)
+        html = html.replace(script.group(0), f'<script src="{self.add("dashboard.js", script.group(1).encode(), "application/javascript")}" defer></script>')
+        for name, url in VENDOR_ASSETS.items():
+            path = os.path.join(vendor_path, name) if vendor_path else None
+            if path and os.path.exists(path):
+                html = html.replace(url, self.add_file(path))
+        self.shell = compressed_asset(html.encode(), 'text/html')
+
+    def add(self, name, body, mimetype):
+        """Register an asset under its fingerprinted name; returns its URL"""
+        asset = compressed_asset(body, mimetype)
+        stem, _, extension = name.rpartition('.')
+        fingerprinted = f"{stem}.{asset.etag[:12]}.{extension}"
+        self.assets[fingerprinted] = asset
+        return f"/assets/{fingerprinted}"
+
+    def add_file(self, path):
+        with open(path, 'rb') as asset_file:
+            body = asset_file.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype == 'text/css':
+            # Point the stylesheet's fonts and images at their own fingerprinted URLs
+            def fingerprint(match):
+                target = os.path.normpath(os.path.join(os.path.dirname(path), match.group(1).decode()))
+                return b'url(' + self.add_file(target).encode() + b')' if os.path.exists(target) else match.group(0)
+            body = CSS_URL_PATTERN.sub(fingerprint, body)
+        return self.add(os.path.basename(path), body, mimetype)
+
+CSS_URL_PATTERN = re.compile(rb'url\((?!\w+:)["\']?([^"\')?#]+)[^)]*\)')  # Relative url(...) references in a stylesheet
+VENDOR_ASSETS = {
+    'chart.js': 'https://cdn.jsdelivr.net/npm/chart.js',
+    'css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css'
+}
+
+def vendor_assets(path, timeout=30):
+    """Download Chart.js and Font Awesome (with the fonts its stylesheet references) into path"""
+    def download(url, target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read()
+        with open(target, 'wb') as asset_file:
+            asset_file.write(body)
+        return body
+    
+    for name, url in VENDOR_ASSETS.items():
+        body = download(url, os.path.join(path, name))
+        if name.endswith('.css'):
+            for reference in sorted(set(CSS_URL_PATTERN.findall(body))):
+                reference = reference.decode()
+                download(urllib.parse.urljoin(url, reference), os.path.normpath(os.path.join(path, os.path.dirname(name), reference)))
+
+@functools.lru_cache(maxsize=None)
+def dashboard_assets():
+    """Build the dashboard shell and assets once, on the first page load"""
+    return DashboardAssets(HTML_TEMPLATE, app.config['VENDOR_PATH'])
+
+def send_asset(asset, immutable=False):
+    """Serve an asset in the best coding the client accepts, with a strong per-coding ETag"""
+    coding = next((coding for coding in ('br', 'gzip') if coding in asset.encodings and request.accept_encodings[coding]), 'identity')
+    response = app.response_class(asset.encodings[coding], mimetype=asset.mimetype)
+    if coding != 'identity':
+        response.headers['Content-Encoding'] = coding
+    response.set_etag(asset.etag if coding == 'identity' else f"{asset.etag}-{coding}")
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable' if immutable else 'no-cache'
+    return response.make_conditional(request)
+
+def cached_insight(uses_price=True):
+    """Serve a view's JSON from the response cache, with ETag revalidation
+    
+    Entries are keyed on (path, data version, model version, gold price bucket, query params),
+    so a new production row, a retrained model or a price move is what invalidates them;
+    uses_price=False leaves the price out of the key for insights that do not depend on it.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            price_bucket = round(current_gold_price / PRICE_BUCKET_DOLLARS) if uses_price else None
+            model_version = model_trainer.snapshot.version if model_trainer.snapshot else None
+            key = (request.path, len(production_store), model_version, price_bucket, tuple(sorted(request.args.items(multi=True))))
+            entry = None if g.get('profile') else response_cache.get(key)  # A profiled request always runs the view
+            if entry is None:
+                with metrics.stage('insight_compute'):
+                    response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = (hashlib.blake2b(body, digest_size=16).hexdigest(), body)
+                response_cache.put(key, entry)
+            
+            etag, body = entry
+            response = app.response_class(body, mimetype='application/json')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+class InvalidQuery(ValueError):
+    """A ?site= or ?from=&to= selection that cannot be served"""
+    status = 400
+
+class ModelNotReady(InvalidQuery):
+    """No trained model snapshot covers the request yet"""
+    status = 503
+
+@app.errorhandler(InvalidQuery)
+def invalid_query(error):
+    return jsonify({"error": str(error)}), error.status
+
+def request_date_range():
+    """The request's inclusive ?from=&to= dates, None where not given"""
+    bounds = []
+    for name in ('from', 'to'):
+        value = request.args.get(name)
+        try:
+            bounds.append(np.datetime64(value, 'D') if value else None)
+        except ValueError:
+            raise InvalidQuery(f"{name} must be a date such as 2024-01-31")
+    if None not in bounds and bounds[0] > bounds[1]:
+        raise InvalidQuery("from must not be after to")
+    return tuple(bounds)
+
+def request_partition():
+    """The ?site= partition, or every site's data when no site is given"""
+    site = request.args.get('site')
+    if site is None:
+        return Partition(production_store.view, aggregates, daily_index, production_model)
+    try:
+        return site_partitions[site]
+    except KeyError:
+        raise InvalidQuery(f"Unknown site: {site}. Use one of: {', '.join(site_partitions.names())}")
+
+def request_models():
+    """The requested site's (or the whole store's) models from the latest snapshot
+    
+    A site added since the snapshot was trained borrows the all-sites regression, with a
+    seasonal fit of its own daily totals, and triggers a retrain that gives it models of its own.
+    """
+    partition = request_partition()
+    snapshot = model_trainer.current()
+    if snapshot is None:
+        raise ModelNotReady("Models are still training; retry shortly")
+    models = snapshot.models.get(request.args.get('site'))
+    if models is None:
+        model_trainer.request_retrain()
+        fallback = snapshot.models.get(None)
+        if fallback is None:
+            raise ModelNotReady("Models are still training; retry shortly")
+        models = PartitionModels(fallback.regression, SeasonalFit.fit(partition.daily.daily()))
+    return models
+
+def partition_data(partition, start=None, stop=None):
+    """(rows, aggregate snapshot) of a partition: all of it, or just the rows dated within [start, stop]
+    
+    The snapshot is taken before the rows are viewed. Entries that land in between only
+    lengthen the view, so every row the snapshot refers to (an argmin, the top producers)
+    is inside it. A range is located with binary searches in the daily index and answered
+    from its per-day sums; the range's rows are only gathered for what sums cannot give.
+    """
+    if start is None and stop is None:
+        stats = partition.aggregates.snapshot()
+        return partition.view(), stats
+    with metrics.stage('range_aggregate'):
+        summary = partition.daily.summary(start, stop)
+        if not summary.count:
+            raise InvalidQuery(f"No production data between {start or 'the start'} and {stop or 'today'}")
+        data = partition.view().select(summary.rows)
+        return data, range_snapshot(data, summary)
+
+def insight_data():
+    """Rows and aggregates an insight reads, narrowed by ?site= and ?from=&to="""
+    return partition_data(request_partition(), *request_date_range())
+
+def daily_series():
+    """Per-day production, efficiency and cost per ounce for the request's site and date range"""
+    return InsightPlan().series
+
+class InsightPlan:
+    """Intermediates the insight families share, each computed at most once per request
+    
+    Sections pull the selected rows, their aggregate snapshot (shift and weather groups
+    included), the daily totals and the trained models from the plan as they need them,
+    so /api/ml/report aggregates a site and date range once for all of its sections.
+    The gold price is read once too, so every section of a report quotes the same price.
+    """
+
+    def __init__(self):
+        self.partition = request_partition()
+        self.start, self.stop = request_date_range()
+        self.price = current_gold_price
+
+    @functools.cached_property
+    def selection(self):
+        """(rows, aggregate snapshot) of the requested site and date range, consistent with each other"""
+        return partition_data(self.partition, self.start, self.stop)
+
+    @property
+    def data(self):
+        return self.selection[0]
+
+    @property
+    def stats(self):
+        return self.selection[1]
+
+    def best_profit_row(self, price):
+        """Index into data of the most profitable row at price"""
+        if self.start is None and self.stop is None:
+            return self.partition.aggregates.best_profit_row(price, self.data)
+        profits = self.data['goldExtracted'] * price - self.data['operationalCost']
+        return int(np.argmax(profits))
+
+    @functools.cached_property
+    def daily(self):
+        """Per-day totals from the daily index"""
+        return self.partition.daily.daily(self.start, self.stop)
+
+    @functools.cached_property
+    def series(self):
+        daily = self.daily
+        return {
+            'goldExtracted': daily['goldExtracted'],
+            'efficiency': daily['goldExtracted'] / daily['oreProcessed'] * 100,
+            'costPerOunce': daily['operationalCost'] / daily['goldExtracted']
+        }
+
+    @functools.cached_property
+    def models(self):
+        return request_models()
+
+    @functools.cached_property
+    def risk_paths(self):
+        """Profitability risk paths for the data version the models were trained on
+        
+        The trainer simulates the whole store's and each site's after every retrain; a date
+        range is simulated on its first request, then served from the cache like the trainer's.
+        """
+        version = model_trainer.snapshot.version if model_trainer.snapshot else None
+        key = (request.args.get('site'), self.start, self.stop, version)
+        paths = risk_paths.get(key)
+        if paths is None:
+            paths = RiskPaths(self.daily, PROFIT_RISK_HORIZON, PROFIT_RISK_PATHS, seed=0)
+            risk_paths.put(key, paths)
+        return paths
+
+@app.route('/')
+def index():
+    return send_asset(dashboard_assets().shell)
+
+@app.route('/assets/<name>')
+def dashboard_asset(name):
+    """Fingerprinted dashboard CSS, JS, vendored libraries and fonts; the name changes with the content"""
+    asset = dashboard_assets().assets.get(name)
+    if asset is None:
+        return jsonify({"error": f"Unknown asset: {name}"}), 404
+    return send_asset(asset, immutable=True)
+
+def known_sites():
+    """Sites the store already has rows for"""
+    return set(production_store.view().labels('site'))
+
+@app.route('/api/production-data', methods=['POST'])
+def add_production_data():
+    """Add new production data entry, validated field by field like a one-row bulk upload"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object with the production entry"}), 400
+    
+    columns, labels, errors = parse_entry_columns({field: [value] for field, value in data.items()}, 1, sites=known_sites())
+    if errors:
+        return jsonify({"error": errors[0][1]}), 400
+    
+    try:
+        row = production_log.append(columns, labels)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    
+    # Only the new entry goes back; clients catch up on others via GET ?since=<version>
+    return jsonify({
+        "success": True,
+        "productionEntry": production_store.view().record(row),
+        "version": row + 1
+    })
+
+@app.route('/api/production-data', methods=['GET'])
+def get_production_data():
+    """Page through recorded entries; ?since=<version> returns only rows added after it, ?latest=1 the last page"""
+    try:
+        since = int(request.args.get('since', 0))
+        cursor = int(request.args.get('cursor', since))
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "since, cursor and limit must be integers"}), 400
+    if limit < 1 or cursor < 0:
+        return jsonify({"error": "limit must be positive and cursor non-negative"}), 400
+    
+    view = production_store.view()
+    if request.args.get('latest') == '1':
+        cursor = len(view) - limit
+    start = max(cursor, view.user_offset)
+    stop = min(start + limit, len(view))
+    
+    return jsonify({
+        "productionData": view.records(start, stop),
+        "version": len(view),
+        "nextCursor": stop if stop < len(view) else None
+    })
+
+@app.route('/api/production-data/bulk', methods=['POST'])
+def add_production_data_bulk():
+    """Stream a CSV, NDJSON, Arrow or Parquet upload into the store in validated chunks"""
+    upload_format = request.args.get('format') or BULK_FORMATS.get(request.mimetype)
+    if upload_format not in BULK_READERS:
+        return jsonify({"error": f"Unsupported upload format: {upload_format or request.mimetype}. Use one of: {', '.join(BULK_READERS)}"}), 415
+
+    accepted = 0
+    rejected = 0
+    errors = []
+    first_row = 1
+    try:
+        for raw, count, row_errors in BULK_READERS[upload_format](request.stream, BULK_CHUNK_ROWS):
+            columns, labels, chunk_errors = parse_entry_columns(raw, count, row_errors, sites=known_sites())
+
+            # Commit each chunk as one batch so memory stays bounded by the chunk size
+            if len(columns['goldExtracted']):
+                try:
+                    production_log.append(columns, labels)
+                except RuntimeError as e:
+                    # Chunks before this one stay committed: tell the client where to resume
+                    return jsonify({"error": str(e), "accepted": accepted, "rowsCommitted": first_row - 1}), 503
+
+            accepted += len(columns['goldExtracted'])
+            rejected += len(chunk_errors)
+            for index, message in chunk_errors[:max(0, MAX_BULK_ERRORS - len(errors))]:
+                errors.append({"row": first_row + index, "error": message})
+            first_row += count
+    except ImportError as e:
+        return jsonify({"error": f"{upload_format} uploads are unavailable: {e}"}), 415
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": f"Unreadable {upload_format} upload near row {first_row}: {e}", "accepted": accepted}), 400
+
+    return jsonify({
+        "success": True,
+        "accepted": accepted,
+        "rejected": rejected,
+        "errors": errors,
+        "errorsTruncated": rejected > len(errors)
+    })
+
+@app.route('/api/ml/forecast')
+@cached_insight(uses_price=False)
+def production_forecast():
+    """Generate ML-based production forecast"""
+    return jsonify({"insights": forecast_insights(InsightPlan())})
+
+def forecast_insights(plan):
+    """7-day production forecast, weather impact and efficiency outlook"""
+    stats = plan.stats
+    
+    if stats.overall.count < 10:
+        return [{"title": "Insufficient Data", "description": "Need more historical data for accurate forecasting."}]
+    
+    insights = []
+    
+    # Seasonal decomposition of daily totals: the trained snapshot, or a one-off fit of a (small) date range
+    if plan.start is None and plan.stop is None:
+        seasonal = plan.models.seasonal
+    else:
+        seasonal = SeasonalFit.fit(plan.daily)
+    trend = seasonal.trend.slope
+    
+    # Weekly forecast
+    _, weekly_forecast = seasonal.forecast(7)
+    
+    total_forecast = float(np.sum(weekly_forecast))
+    description = f"Predicted total production: {total_forecast:.1f} oz gold. Daily average: {total_forecast/7:.1f} oz. Trend analysis shows {'increasing' if trend > 0 else 'decreasing' if trend < 0 else 'stable'} production pattern."
+    if seasonal.weekly:
+        peak_day = int(np.argmax(seasonal.weekday_index))
+        description += f" {SeasonalFit.WEEKDAYS[peak_day]}s run {(seasonal.weekday_index[peak_day] - 1) * 100:.1f}% above the weekly average."
+    
+    insights.append({
+        "title": "7-Day Production Forecast",
+        "description": description,
+        "confidence": 85
+    })
+    
+    # Seasonal analysis
+    weather_impact = analyze_weather_impact(stats)
+    insights.append({
+        "title": "Weather Impact Analysis",
+        "description": f"Clear weather conditions increase production by {weather_impact['clear_boost']:.1f}%. Heavy rain reduces production by {weather_impact['rain_penalty']:.1f}%. Consider weather forecasts for operational planning.",
+        "confidence": 78
+    })
+    
+    # Efficiency predictions
+    avg_efficiency = stats.overall['efficiency'].mean
+    efficiency_trend = RollingRegression.fit(plan.series['efficiency'][-14:]).slope  # 2-week trend
+    
+    insights.append({
+        "title": "Efficiency Optimization Forecast",
+        "description": f"Current efficiency averaging {avg_efficiency:.2f}%. Trend shows {'improving' if efficiency_trend > 0 else 'declining'} efficiency. Target: achieve 4.5% efficiency for optimal gold recovery.",
+        "confidence": 82
+    })
+    
+    return insights
+
+@app.route('/api/ml/optimize')
+@cached_insight(uses_price=False)
+def optimize_operations():
+    """Generate operational optimization recommendations"""
+    return jsonify({"insights": optimization_insights(InsightPlan())})
+
+def optimization_insights(plan):
+    """Shift, workforce, equipment and cost recommendations"""
+    stats = plan.stats
+    
+    insights = []
+    
+    # Shift optimization
+    shift_analysis = analyze_shift_performance(stats)
+    best_shift = max(shift_analysis.keys(), key=lambda k: shift_analysis[k]['avg_production'])
+    
+    insights.append({
+        "title": "Optimal Shift Performance",
+        "description": f"{best_shift} shift shows highest average production ({shift_analysis[best_shift]['avg_production']:.1f} oz). Consider allocating experienced workers and premium equipment to {best_shift.lower()} operations.",
+        "confidence": 88
+    })
     
     # Worker-to-production ratio optimization
-    worker_efficiency = analyze_worker_efficiency(all_data)
+    worker_efficiency = analyze_worker_efficiency(stats, plan.models.regression)
     insights.append({
         "title": "Workforce Optimization",
         "description": f"Optimal worker count: {worker_efficiency['optimal_workers']} per shift. Current efficiency: {worker_efficiency['current_efficiency']:.2f} oz/worker. Potential {worker_efficiency['improvement_potential']:.1f}% improvement with optimization.",
@@ -1125,7 +4380,7 @@ def optimize_operations():
     })
     
     # Equipment utilization
-    equipment_analysis = analyze_equipment_utilization(all_data)
+    equipment_analysis = analyze_equipment_utilization(stats)
     insights.append({
         "title": "Equipment Utilization",
         "description": f"Average equipment utilization: {equipment_analysis['avg_hours']:.1f} hours/shift. High-production correlates with {equipment_analysis['optimal_range']} hours. Consider maintenance scheduling during low-efficiency periods.",
@@ -1133,26 +4388,30 @@ def optimize_operations():
     })
     
     # Cost optimization
-    cost_analysis = analyze_cost_efficiency(all_data)
+    cost_analysis = analyze_cost_efficiency(stats)
     insights.append({
         "title": "Cost Efficiency Optimization", 
         "description": f"Target cost per ounce: ${cost_analysis['target_cost']:.0f}. Current average: ${cost_analysis['current_cost']:.0f}. Potential savings: ${cost_analysis['potential_savings']:.0f}/oz through operational improvements.",
         "confidence": 81
     })
     
-    return jsonify({"insights": insights})
+    return insights
 
 @app.route('/api/ml/efficiency')
+@cached_insight(uses_price=False)
 def analyze_efficiency():
     """Analyze operational efficiency patterns"""
-    all_data = historical_data + production_entries
+    return jsonify({"insights": efficiency_insights(InsightPlan())})
+
+def efficiency_insights(plan):
+    """Efficiency overview, weather effects and the two-week trend"""
+    stats = plan.stats
     
     insights = []
     
     # Overall efficiency analysis
-    efficiencies = [entry['efficiency'] for entry in all_data]
-    avg_efficiency = np.mean(efficiencies)
-    max_efficiency = np.max(efficiencies)
+    avg_efficiency = stats.overall['efficiency'].mean
+    max_efficiency = stats.overall['efficiency'].maximum
     
     insights.append({
         "title": "Efficiency Performance Overview",
@@ -1161,25 +4420,19 @@ def analyze_efficiency():
     })
     
     # Efficiency by conditions
-    weather_efficiency = {}
-    for entry in all_data:
-        weather = entry['weather']
-        if weather not in weather_efficiency:
-            weather_efficiency[weather] = []
-        weather_efficiency[weather].append(entry['efficiency'])
+    weather_efficiency = {weather: group['efficiency'].mean for weather, group in stats.by_weather.items()}
     
-    best_weather = max(weather_efficiency.keys(), key=lambda k: np.mean(weather_efficiency[k]))
-    worst_weather = min(weather_efficiency.keys(), key=lambda k: np.mean(weather_efficiency[k]))
+    best_weather = max(weather_efficiency.keys(), key=lambda k: weather_efficiency[k])
+    worst_weather = min(weather_efficiency.keys(), key=lambda k: weather_efficiency[k])
     
     insights.append({
         "title": "Weather Impact on Efficiency",
-        "description": f"Best conditions: {best_weather} ({np.mean(weather_efficiency[best_weather]):.2f}% efficiency). Worst conditions: {worst_weather} ({np.mean(weather_efficiency[worst_weather]):.2f}% efficiency). Weather planning critical for optimization.",
+        "description": f"Best conditions: {best_weather} ({weather_efficiency[best_weather]:.2f}% efficiency). Worst conditions: {worst_weather} ({weather_efficiency[worst_weather]:.2f}% efficiency). Weather planning critical for optimization.",
         "confidence": 86
     })
     
     # Trend analysis
-    recent_efficiency = efficiencies[-14:]  # Last 2 weeks
-    trend = calculate_linear_trend(recent_efficiency)
+    trend = RollingRegression.fit(plan.series['efficiency'][-14:]).slope  # Last 2 weeks
     
     insights.append({
         "title": "Efficiency Trend Analysis",
@@ -1187,22 +4440,26 @@ def analyze_efficiency():
         "confidence": 79
     })
     
-    return jsonify({"insights": insights})
+    return insights
 
 @app.route('/api/ml/cost-prediction')
+@cached_insight(uses_price=False)
 def cost_prediction():
     """Predict operational costs and optimization opportunities"""
-    all_data = historical_data + production_entries
+    return jsonify({"insights": cost_insights(InsightPlan())})
+
+def cost_insights(plan):
+    """Cost per ounce, its drivers and its one-week outlook"""
+    stats = plan.stats
     
     insights = []
     
     # Cost per ounce analysis
-    costs_per_ounce = [entry['costPerOunce'] for entry in all_data]
-    avg_cost = np.mean(costs_per_ounce)
-    min_cost = np.min(costs_per_ounce)
+    avg_cost = stats.overall['costPerOunce'].mean
+    min_cost = stats.overall['costPerOunce'].minimum
     
     # Find conditions for minimum cost
-    min_cost_entry = min(all_data, key=lambda x: x['costPerOunce'])
+    min_cost_entry = plan.data.record(stats.overall['costPerOunce'].argmin)
     
     insights.append({
         "title": "Cost Efficiency Analysis",
@@ -1211,11 +4468,8 @@ def cost_prediction():
     })
     
     # Cost prediction based on production levels
-    production_levels = [entry['goldExtracted'] for entry in all_data]
-    operational_costs = [entry['operationalCost'] for entry in all_data]
-    
     # Simple linear relationship
-    correlation = np.corrcoef(production_levels, operational_costs)[0, 1]
+    correlation = stats.overall.correlation()
     
     insights.append({
         "title": "Production-Cost Correlation",
@@ -1224,17 +4478,8 @@ def cost_prediction():
     })
     
     # Cost optimization recommendations
-    worker_costs = []
-    equipment_costs = []
-    
-    for entry in all_data:
-        estimated_worker_cost = entry['workers'] * 250  # Estimated worker cost per day
-        estimated_equipment_cost = entry['equipmentHours'] * 75  # Estimated equipment cost per hour
-        worker_costs.append(estimated_worker_cost / entry['goldExtracted'])
-        equipment_costs.append(estimated_equipment_cost / entry['goldExtracted'])
-    
-    avg_worker_cost_per_oz = np.mean(worker_costs)
-    avg_equipment_cost_per_oz = np.mean(equipment_costs)
+    avg_worker_cost_per_oz = stats.overall['laborCostPerOunce'].mean
+    avg_equipment_cost_per_oz = stats.overall['equipmentCostPerOunce'].mean
     
     insights.append({
         "title": "Cost Breakdown Analysis",
@@ -1243,9 +4488,9 @@ def cost_prediction():
     })
     
     # Future cost prediction
-    recent_costs = costs_per_ounce[-10:]  # Last 10 entries
-    cost_trend = calculate_linear_trend(recent_costs)
-    predicted_cost = recent_costs[-1] + (cost_trend * 7)  # 7 days ahead
+    recent_costs = RollingRegression.fit(plan.series['costPerOunce'][-10:])  # Last 10 days
+    cost_trend = recent_costs.slope
+    predicted_cost = recent_costs.last + (cost_trend * 7)  # 7 days ahead
     
     insights.append({
         "title": "Cost Trend Prediction",
@@ -1253,136 +4498,331 @@ def cost_prediction():
         "confidence": 75
     })
     
-    return jsonify({"insights": insights})
+    return insights
 
-@app.route('/api/gold-price')
-def get_gold_price():
-    """Get current gold price from multiple API sources or intelligent fallback"""
-    global current_gold_price, gold_price_history
-    
-    # Multiple API sources for reliability
-    api_sources = [
-        {
-            "name": "MetalPriceAPI",
-            "url": "https://api.metalpriceapi.com/v1/latest?api_key=demo&base=USD&currencies=XAU",
-            "parser": lambda data: 1 / float(data['rates']['XAU']) if 'rates' in data and 'XAU' in data['rates'] else None
-        },
-        {
-            "name": "GoldAPI",
-            "url": "https://www.goldapi.io/api/XAU/USD",
-            "headers": {"X-ACCESS-TOKEN": "goldapi-demo-key"},
-            "parser": lambda data: float(data['price']) if 'price' in data else None
+@app.route('/api/ml/trends')
+@cached_insight(uses_price=False)
+def trend_analysis():
+    """Linear trends for every tracked series and window
+    
+    ?unit=day (the default) fits the last N days of daily totals, within ?from=&to= if given;
+    ?unit=entry reads the last N entries straight from the running sums.
+    """
+    series = request.args.get('series')
+    unit = request.args.get('unit', 'day')
+    if series is not None and series not in TREND_WINDOWS:
+        return jsonify({"error": f"Unknown series: {series}. Use one of: {', '.join(TREND_WINDOWS)}"}), 400
+    if unit not in ('day', 'entry'):
+        return jsonify({"error": "unit must be day or entry"}), 400
+    
+    if unit == 'entry':
+        snapshot = trends.snapshot(series)
+    else:
+        snapshot = {
+            name: {window: RollingRegression.fit(values[-window:]) for window in TREND_WINDOWS[name]}
+            for name, values in daily_series().items()
+            if series is None or name == series
         }
-    ]
+    return jsonify({
+        "unit": unit,
+        "trends": {
+            name: {str(window): trend._asdict() for window, trend in windows.items()}
+            for name, windows in snapshot.items()
+        }
+    })
+
+@app.route('/api/ml/percentiles')
+@cached_insight(uses_price=False)
+def percentile_analysis():
+    """Approximate percentiles from the streaming sketches and the top producing entries, for everything or one ?shift= / ?weather="""
+    series = request.args.get('series', 'costPerOunce')
+    if series not in SKETCH_FIELDS:
+        return jsonify({"error": f"Unknown series: {series}. Use one of: {', '.join(SKETCH_FIELDS)}"}), 400
+    try:
+        levels = [float(q) for q in request.args.get('q', '0.1,0.25,0.5,0.75,0.9').split(',')]
+    except ValueError:
+        levels = []
+    if not levels or not all(0 <= q <= 1 for q in levels):
+        return jsonify({"error": "q must be a comma-separated list of levels between 0 and 1"}), 400
     
-    for api in api_sources:
-        try:
-            req = urllib.request.Request(api["url"])
-            if "headers" in api:
-                for key, value in api["headers"].items():
-                    req.add_header(key, value)
-                    
-            with urllib.request.urlopen(req, timeout=10) as response:
-                data = json.loads(response.read().decode())
-                price = api["parser"](data)
-                
-                if price and 1500 <= price <= 3000:  # Sanity check for realistic gold prices
-                    # Calculate change from previous price
-                    change = price - current_gold_price if current_gold_price > 0 else 0
-                    current_gold_price = price
-                    
-                    # Store price history
-                    gold_price_history.append({
-                        'price': price,
-                        'timestamp': datetime.now().isoformat(),
-                        'change': change,
-                        'source': api["name"]
-                    })
-                    
-                    # Keep only last 24 hours
-                    day_ago = datetime.now() - timedelta(hours=24)
-                    gold_price_history = [
-                        entry for entry in gold_price_history 
-                        if datetime.fromisoformat(entry['timestamp']) > day_ago
-                    ]
-                    
-                    return jsonify({
-                        "success": True,
-                        "price": round(price, 2),
-                        "change": round(change, 2),
-                        "timestamp": datetime.now().isoformat(),
-                        "source": api["name"]
-                    })
-                    
-        except Exception as e:
-            print(f"API {api['name']} failed: {e}")
-            continue
+    data, stats = insight_data()
+    group = stats.overall
+    for field, groups in (('shift', stats.by_shift), ('weather', stats.by_weather)):
+        label = request.args.get(field)
+        if label is not None:
+            if label not in groups:
+                return jsonify({"error": f"Unknown {field}: {label}. Use one of: {', '.join(groups)}"}), 400
+            group = groups[label]
+    
+    top = group.top_production
+    return jsonify({
+        "series": series,
+        "count": group.count,
+        "percentiles": dict(zip(map(str, levels), group.sketches[series].quantile(levels).tolist())),
+        "topProduction": [data.record(int(row)) for row in top.rows[np.argsort(-top.values)]]
+    })
+
+@app.route('/api/ml/predict', methods=['POST'])
+def predict_production():
+    """Score a batch of hypothetical shift plans with the regression model, vectorized"""
+    payload = request.get_json(silent=True)
+    plans = payload.get('plans') if isinstance(payload, dict) else payload
+    if not isinstance(plans, list) or not plans or not all(isinstance(plan, dict) for plan in plans):
+        return jsonify({"error": 'Send a list of shift plans, or {"plans": [...]}; each needs workers, equipmentHours, oreProcessed, shift and weather'}), 400
     
-    # If all APIs fail, use intelligent simulation based on market patterns
+    model = request_models().regression
+    columns = {field: [plan.get(field) for plan in plans] for field in RegressionModel.NUMERIC_FEATURES + RegressionModel.CATEGORICAL_FEATURES}
+    started = time.perf_counter()
     try:
-        # Use realistic gold price simulation with market-like volatility
-        base_price = 2025  # Current approximate gold price (as of 2024)
-        
-        # Simulate realistic intraday volatility (0.5-2% typical)
-        volatility = 0.01  # 1% volatility
-        random_factor = (random.random() - 0.5) * 2  # -1 to +1
-        price_change = base_price * volatility * random_factor
-        
-        # Add trend component (slight upward bias for gold)
-        trend_component = 0.25 * random.random()  # Small upward trend
-        
-        simulated_price = base_price + price_change + trend_component
-        
-        # Ensure price stays within realistic bounds
-        simulated_price = max(1800, min(2500, simulated_price))
-        
-        change = simulated_price - current_gold_price if current_gold_price > 0 else 0
-        current_gold_price = simulated_price
-        
-        # Store simulated price
-        gold_price_history.append({
-            'price': simulated_price,
-            'timestamp': datetime.now().isoformat(),
-            'change': change,
-            'source': 'intelligent_simulation'
-        })
-        
-        return jsonify({
-            "success": True,
-            "price": round(simulated_price, 2),
-            "change": round(change, 2),
-            "timestamp": datetime.now().isoformat(),
-            "source": "intelligent_simulation",
-            "note": "Real-time APIs unavailable. Using market-pattern simulation."
-        })
-        
-    except Exception as e:
-        # Ultimate fallback with static price
-        current_gold_price = 2025
-        return jsonify({
-            "success": True,
-            "price": 2025,
-            "change": 0,
-            "timestamp": datetime.now().isoformat(),
-            "source": "static_fallback"
-        })
+        predictions = model.predict(columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    elapsed = time.perf_counter() - started
+    
+    return jsonify({
+        "predictions": [dict(zip(RegressionModel.TARGETS, row)) for row in predictions.tolist()],
+        "model": {"version": model_trainer.snapshot.version, "rows": model.rows, "r2": model.r2, "coefficients": model.coefficient_table()},
+        "microsecondsPerRow": elapsed / len(plans) * 1e6
+    })
+
+@app.route('/api/ml/scenarios', methods=['GET', 'POST'])
+def scenario_analysis():
+    """What-if profit surfaces and breakeven curves over grids of price, workforce, equipment hours and weather mix
+    
+    POST {"goldPrice": [...], "workers": {"start": 15, "stop": 35, "step": 1}, "equipmentHours": [...],
+    "weatherMix": [{"Clear": 0.7, "Heavy Rain": 0.3}]}; every axis is optional and a GET uses
+    grids around today's price and the averages of the selected site and date range.
+    """
+    payload = request.get_json(silent=True) if request.method == 'POST' else {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Send a JSON object of scenario grids"}), 400
+    regression = request_models().regression
+    stats = insight_data()[1]  # Averages and mixes of the ?site= and ?from=&to= selection
+    if not stats.overall.count:
+        return jsonify({"error": "No production data to simulate from"}), 400
+    
+    weather_labels = regression.labels['weather']
+    historical_mix = [stats.by_weather[label].count if label in stats.by_weather else 0 for label in weather_labels]
+    mean_workers = round(stats.overall['workers'].mean)
+    mean_hours = round(stats.overall['equipmentHours'].mean, -1)
+    prices = scenario_axis(payload.get('goldPrice'), current_gold_price + np.arange(-500, 501, 50), 'goldPrice')
+    workers = scenario_axis(payload.get('workers'), np.arange(max(mean_workers - 10, 1), mean_workers + 11), 'workers')
+    hours = scenario_axis(payload.get('equipmentHours'), np.arange(max(mean_hours - 100, 0), mean_hours + 101, 10), 'equipmentHours')
+    mixes = weather_mixes(payload.get('weatherMix'), weather_labels, np.divide(historical_mix, sum(historical_mix)))
+    scenarios = len(prices) * len(workers) * len(hours) * len(mixes)
+    if scenarios > MAX_SCENARIOS:
+        return jsonify({"error": f"{scenarios} scenarios requested; the limit is {MAX_SCENARIOS}"}), 400
+    
+    started = time.perf_counter()
+    production, operational_cost, breakeven, profit = simulate_scenarios(regression, stats, prices, workers, hours, mixes)
+    best = np.unravel_index(np.argmax(profit), profit.shape)
+    elapsed = time.perf_counter() - started
+    
+    return jsonify({
+        "axes": {
+            "goldPrice": prices.tolist(),
+            "workers": workers.tolist(),
+            "equipmentHours": hours.tolist(),
+            "weatherMix": [dict(zip(weather_labels, mix)) for mix in mixes.tolist()]
+        },
+        "production": production.tolist(),
+        "operationalCost": operational_cost.tolist(),
+        "breakevenPrice": np.where(np.isfinite(breakeven), breakeven, None).tolist(),
+        "profit": profit.tolist(),
+        "best": {
+            "goldPrice": float(prices[best[0]]),
+            "workers": float(workers[best[1]]),
+            "equipmentHours": float(hours[best[2]]),
+            "weatherMix": int(best[3]),
+            "profit": float(profit[best])
+        },
+        "scenarios": scenarios,
+        "modelVersion": model_trainer.snapshot.version,
+        "microsecondsPerScenario": elapsed / scenarios * 1e6
+    })
+
+@app.route('/api/ml/risk')
+def risk_analysis():
+    """Monte Carlo VaR/CVaR of profit over ?horizon= days (default 30) from ?paths= simulated paths
+    
+    ?seed= makes a run reproducible; ?stream=1 returns NDJSON, one line per completed chunk,
+    so the percentiles can be watched as they converge.
+    """
+    try:
+        paths = int(request.args.get('paths', 1000000))
+        horizon = int(request.args.get('horizon', 30))
+        seed = int(request.args['seed']) if 'seed' in request.args else None
+    except ValueError:
+        return jsonify({"error": "paths, horizon and seed must be integers"}), 400
+    if not 1 <= paths <= MAX_RISK_PATHS or not 1 <= horizon <= 366:
+        return jsonify({"error": f"paths must be 1-{MAX_RISK_PATHS} and horizon 1-366 days"}), 400
+    daily = request_partition().daily.daily(*request_date_range())
+    if len(daily['date']) < 7:
+        return jsonify({"error": "Need at least 7 days of production data to simulate from"}), 400
+    
+    price, volatility = current_gold_price, price_volatility(horizon)
+    simulation = run_risk_simulation(daily, price, volatility, horizon, paths, seed, risk_pool())
+    inputs = {"goldPrice": price, "volatility": volatility, "horizonDays": horizon, "historicalDays": len(daily['date'])}
+    
+    if request.args.get('stream') == '1':
+        def progress():
+            with contextlib.closing(simulation):  # A disconnect cancels the chunks not yet started
+                for accumulator in simulation:
+                    yield json.dumps({**accumulator.summary(), "done": accumulator.count == paths}) + "\n"
+        return Response(stream_with_context(progress()), mimetype='application/x-ndjson')
+    
+    started = time.perf_counter()
+    for accumulator in simulation:
+        pass
+    return jsonify({**accumulator.summary(), "inputs": inputs, "seconds": time.perf_counter() - started})
+
+@app.route('/api/ml/models')
+def model_status():
+    """Model snapshot version, staleness and training/load timings, plus each partition's fit quality"""
+    snapshot = model_trainer.current(timeout=0)
+    return jsonify({
+        "metrics": model_trainer.metrics(),
+        "models": {
+            site or "all": {"rows": models.regression.rows, "r2": models.regression.r2, "seasonal": models.seasonal.to_json()}
+            for site, models in (snapshot.models.items() if snapshot else ())
+        }
+    })
+
+@app.route('/api/ml/sites')
+@cached_insight(uses_price=False)
+def site_breakdown():
+    """Shift, workforce, equipment and cost analysis per site, plus all sites combined"""
+    start, stop = request_date_range()
+    snapshot = model_trainer.current()
+    names = site_partitions.names()
+    partitions = [site_partitions[name] for name in names] + [Partition(production_store.view, aggregates, daily_index, production_model)]
+    models = [snapshot.models.get(name) if snapshot else None for name in names + [None]]
+    results = list(analysis_pool().map(functools.partial(site_analysis, start=start, stop=stop), partitions, models))
+    if results[-1] is None:
+        raise InvalidQuery(f"No production data between {start or 'the start'} and {stop or 'today'}")
+    
+    return jsonify({
+        "sites": {name: result for name, result in zip(names, results) if result is not None},
+        "all": results[-1]
+    })
+
+@app.route('/api/events')
+def dashboard_events():
+    """Server-sent events: new entries, gold price ticks and retrained model versions"""
+    price_service.start()
+    subscriber = event_broadcaster.subscribe(request.headers.get('Last-Event-ID'))
+    response = Response(event_broadcaster.stream(subscriber), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Keep reverse proxies from buffering the stream
+    return response
+
+@app.route('/api/charts/market')
+def market_chart():
+    """Gold price ticks from the last 24 hours, downsampled to ?points=
+    
+    Not response-cached: ticks arrive independently of the data version.
+    """
+    points = request_points()
+    epochs, prices = price_service.history.series()
+    keep = lttb(epochs, prices, points)
+    return jsonify({
+        "labels": [datetime.fromtimestamp(epoch).isoformat() for epoch in epochs[keep].tolist()],
+        "values": prices[keep].tolist(),
+        "ticks": len(epochs)
+    })
+
+@app.route('/api/charts/<name>')
+@cached_insight(uses_price=False)
+def chart_data(name):
+    """Pre-aggregated series for one dashboard chart, downsampled to ?points=, honouring ?site= and ?from=&to="""
+    if name not in CHART_BUILDERS:
+        return jsonify({"error": f"Unknown chart: {name}. Use one of: {', '.join(sorted(CHART_BUILDERS) + ['market'])}"}), 404
+    return jsonify(CHART_BUILDERS[name](request_points()))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Route and stage timing histograms, price source counters and dataset/cache gauges for Prometheus"""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED)"}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def profiling_admin(view):
+    """Restrict a profiling admin view to requests carrying PROFILE_TOKEN in X-Profile-Token"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not app.config['PROFILE_TOKEN']:
+            return jsonify({"error": "Profiling is disabled (PROFILE_TOKEN)"}), 404
+        if not profile_token_matches():
+            return jsonify({"error": "X-Profile-Token is missing or wrong"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/profiles', methods=['GET', 'POST'])
+@profiling_admin
+def request_profiles():
+    """List this worker's recent request profiles, or arm a path to profile its next requests
+    
+    POST {"path": "/api/ml/market-analysis", "count": 3} profiles the next three requests
+    to that path on this worker, whoever sends them; "allocations": false skips tracemalloc.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        path = data.get('path')
+        count = data.get('count', 1)
+        allocations = data.get('allocations', True)
+        if not isinstance(path, str) or not path.startswith('/') or path.startswith('/api/admin/'):
+            raise InvalidQuery("path must be a route path such as /api/ml/market-analysis")
+        if not isinstance(count, int) or isinstance(count, bool) or not 0 <= count <= Profiler.MAX_ARMED:
+            raise InvalidQuery(f"count must be an integer 0-{Profiler.MAX_ARMED}")
+        if not isinstance(allocations, bool):
+            raise InvalidQuery("allocations must be true or false")
+        return jsonify({"armed": profiler.arm(path, count, allocations), "worker": os.getpid()}), 202
+    return jsonify({"profiles": profiler.summaries(), "armed": profiler.armed(), "worker": os.getpid()})
+
+@app.route('/api/admin/profiles/<profile_id>')
+@profiling_admin
+def request_profile(profile_id):
+    """One profile as JSON, or with ?format=collapsed its stacks in flamegraph collapsed format"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"No profile {profile_id} on worker {os.getpid()}"}), 404
+    if request.args.get('format') == 'collapsed':
+        return Response(profile.collapsed(), mimetype='text/plain')
+    return jsonify({"id": profile_id, **profile.details()})
+
+@app.route('/api/gold-price')
+def get_gold_price():
+    """Get the current gold price from the in-memory cache kept fresh by the price service"""
+    return jsonify(price_service.quote())
+
+@app.route('/api/gold-price/history')
+def get_gold_price_history():
+    """Price ticks from the last 24 hours, oldest first"""
+    return jsonify({"history": price_service.history.entries()})
 
 @app.route('/api/ml/market-analysis')
+@cached_insight()
 def market_analysis():
     """Analyze market conditions and profitability"""
-    all_data = historical_data + production_entries
+    return jsonify({"insights": market_insights(InsightPlan())})
+
+def market_insights(plan):
+    """Breakeven price, price sensitivity and market timing at the plan's gold price"""
+    stats = plan.stats
+    price = plan.price
     
     insights = []
     
     # Current market conditions
+    breakeven_price = calculate_breakeven_price(stats)
     insights.append({
         "title": "Current Market Position",
-        "description": f"Gold trading at ${current_gold_price:,.0f}/oz. Based on recent production costs, your breakeven price is approximately ${calculate_breakeven_price(all_data):,.0f}/oz. Current market provides {((current_gold_price - calculate_breakeven_price(all_data)) / calculate_breakeven_price(all_data) * 100):.1f}% profit buffer.",
+        "description": f"Gold trading at ${price:,.0f}/oz. Based on recent production costs, your breakeven price is approximately ${breakeven_price:,.0f}/oz. Current market provides {((price - breakeven_price) / breakeven_price * 100):.1f}% profit buffer.",
         "confidence": 90
     })
     
     # Price sensitivity analysis
-    price_sensitivity = analyze_price_sensitivity(all_data)
+    price_sensitivity = analyze_price_sensitivity(stats, breakeven_price)
     insights.append({
         "title": "Price Sensitivity Analysis",
         "description": f"A $100 gold price increase would boost daily profit by ${price_sensitivity['price_impact']:,.0f}. At current efficiency, you need gold above ${price_sensitivity['minimum_viable_price']:,.0f}/oz for profitable operations.",
@@ -1390,44 +4830,50 @@ def market_analysis():
     })
     
     # Market timing recommendations
-    historical_avg = sum(entry.get('marketPrice', current_gold_price) for entry in all_data) / len(all_data)
-    if current_gold_price > historical_avg * 1.1:
+    historical_avg = price_service.history.average() or price
+    if price > historical_avg * 1.1:
         market_status = "Strong market conditions. Consider maximizing production."
-    elif current_gold_price < historical_avg * 0.9:
+    elif price < historical_avg * 0.9:
         market_status = "Challenging market. Focus on cost optimization."
     else:
         market_status = "Stable market conditions. Maintain consistent operations."
     
     insights.append({
         "title": "Market Timing Analysis",
-        "description": f"Current price vs historical average: {((current_gold_price / historical_avg - 1) * 100):+.1f}%. {market_status}",
+        "description": f"Current price vs historical average: {((price / historical_avg - 1) * 100):+.1f}%. {market_status}",
         "confidence": 78
     })
     
-    return jsonify({"insights": insights})
+    return insights
 
 @app.route('/api/ml/profitability')
+@cached_insight()
 def profitability_analysis():
     """Analyze overall profitability and optimization opportunities"""
-    all_data = historical_data + production_entries
+    return jsonify({"insights": profitability_insights(InsightPlan())})
+
+def profitability_insights(plan):
+    """Profit, return, best-day potential and Monte Carlo risk at the plan's gold price"""
+    stats = plan.stats
+    price = plan.price
     
     insights = []
     
     # Overall profitability metrics
-    total_production = sum(entry['goldExtracted'] for entry in all_data)
-    total_costs = sum(entry['operationalCost'] for entry in all_data)
-    total_revenue = total_production * current_gold_price
+    total_production = stats.overall['goldExtracted'].total
+    total_costs = stats.overall['operationalCost'].total
+    total_revenue = total_production * price
     total_profit = total_revenue - total_costs
     profit_margin = (total_profit / total_revenue) * 100
     
     insights.append({
         "title": "Overall Profitability Analysis",
-        "description": f"Total profit: ${total_profit:,.0f} from {total_production:.1f} oz production. Profit margin: {profit_margin:.1f}%. Revenue per ounce: ${current_gold_price:,.0f}. Cost per ounce: ${total_costs/total_production:.0f}.",
+        "description": f"Total profit: ${total_profit:,.0f} from {total_production:.1f} oz production. Profit margin: {profit_margin:.1f}%. Revenue per ounce: ${price:,.0f}. Cost per ounce: ${total_costs/total_production:.0f}.",
         "confidence": 95
     })
     
     # ROI and payback analysis
-    daily_avg_profit = total_profit / len(all_data) if all_data else 0
+    daily_avg_profit = total_profit / stats.overall.count if stats.overall.count else 0
     monthly_profit = daily_avg_profit * 30
     
     insights.append({
@@ -1437,8 +4883,8 @@ def profitability_analysis():
     })
     
     # Optimization opportunities
-    best_day = max(all_data, key=lambda x: (x['goldExtracted'] * current_gold_price - x['operationalCost']))
-    best_profit = best_day['goldExtracted'] * current_gold_price - best_day['operationalCost']
+    best_day = plan.data.record(plan.best_profit_row(price))
+    best_profit = best_day['goldExtracted'] * price - best_day['operationalCost']
     
     insights.append({
         "title": "Optimization Potential",
@@ -1446,146 +4892,453 @@ def profitability_analysis():
         "confidence": 82
     })
     
-    # Risk assessment
-    profit_variability = np.std([entry['goldExtracted'] * current_gold_price - entry['operationalCost'] for entry in all_data])
-    risk_level = "High" if profit_variability > daily_avg_profit * 0.5 else "Medium" if profit_variability > daily_avg_profit * 0.3 else "Low"
+    # Risk assessment: Monte Carlo over a month of historical days and gold price moves (seeded, so cached answers agree)
+    risk = plan.risk_paths.summary(price, price_volatility(PROFIT_RISK_HORIZON))
+    var_95 = risk['levels'][0]
+    expected_profit = risk['expectedProfit']
+    risk_level = "High" if var_95['valueAtRisk'] > abs(expected_profit) * 0.5 else "Medium" if var_95['valueAtRisk'] > abs(expected_profit) * 0.3 else "Low"
     
     insights.append({
         "title": "Profitability Risk Assessment",
-        "description": f"Profit variability: ${profit_variability:,.0f} (Risk level: {risk_level}). Weather and operational factors cause {(profit_variability/daily_avg_profit*100):.1f}% profit variation. Consider hedging strategies for price protection.",
+        "description": f"Monthly profit at 95% confidence: at least ${var_95['profitPercentile']:,.0f} (expected ${expected_profit:,.0f}; VaR ${var_95['valueAtRisk']:,.0f}, CVaR ${var_95['conditionalValueAtRisk']:,.0f}; Risk level: {risk_level}). Simulated from weather, cost and production swings in past days plus gold price volatility. Consider hedging strategies for price protection.",
         "confidence": 79
     })
     
-    return jsonify({"insights": insights})
+    return insights
+
+REPORT_SECTIONS = {  # ?sections= name (the family's own endpoint) -> insights builder
+    'forecast': forecast_insights,
+    'optimize': optimization_insights,
+    'efficiency': efficiency_insights,
+    'cost-prediction': cost_insights,
+    'market-analysis': market_insights,
+    'profitability': profitability_insights
+}
+
+@app.route('/api/ml/report')
+@cached_insight()
+def insight_report():
+    """Every insight family, or those named in ?sections=, from one shared InsightPlan
+    
+    A section whose models are still training reports the error in place of its insights,
+    so the other sections are still served.
+    """
+    names = [name.strip() for name in request.args.get('sections', ','.join(REPORT_SECTIONS)).split(',') if name.strip()]
+    unknown = [name for name in names if name not in REPORT_SECTIONS]
+    if unknown or not names:
+        raise InvalidQuery(f"Unknown section: {', '.join(unknown) or '(none given)'}. Use any of: {', '.join(REPORT_SECTIONS)}")
+    
+    plan = InsightPlan()
+    sections = {}
+    for name in dict.fromkeys(names):
+        try:
+            sections[name] = {"insights": REPORT_SECTIONS[name](plan)}
+        except ModelNotReady as error:
+            sections[name] = {"error": str(error)}
+    return jsonify({"goldPrice": plan.price, "sections": sections})
+
+@functools.lru_cache(maxsize=None)
+def analysis_pool():
+    """Pool that runs per-site analyses side by side, one thread per core"""
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='site-analysis')
+
+def site_analysis(partition, models, start=None, stop=None):
+    """One partition's breakdown for /api/ml/sites; None if it has no rows in range"""
+    try:
+        _, stats = partition_data(partition, start, stop)
+    except InvalidQuery:
+        return None
+    
+    return {
+        "entries": stats.overall.count,
+        "production": stats.overall['goldExtracted'].total,
+        "shifts": analyze_shift_performance(stats),
+        "workforce": analyze_worker_efficiency(stats, models.regression if models else None),
+        "equipment": analyze_equipment_utilization(stats),
+        "costs": analyze_cost_efficiency(stats)
+    }
 
-def calculate_breakeven_price(data):
+def calculate_breakeven_price(stats):
     """Calculate breakeven gold price based on operational costs"""
-    if not data:
+    if not stats.overall.count:
         return 1500
     
-    avg_production = sum(entry['goldExtracted'] for entry in data) / len(data)
-    avg_cost = sum(entry['operationalCost'] for entry in data) / len(data)
+    avg_production = stats.overall['goldExtracted'].mean
+    avg_cost = stats.overall['operationalCost'].mean
     
     return avg_cost / avg_production if avg_production > 0 else 1500
 
-def analyze_price_sensitivity(data):
+def analyze_price_sensitivity(stats, breakeven_price):
     """Analyze sensitivity to gold price changes"""
-    if not data:
+    if not stats.overall.count:
         return {"price_impact": 0, "minimum_viable_price": 1500}
     
-    avg_production = sum(entry['goldExtracted'] for entry in data) / len(data)
-    avg_cost = sum(entry['operationalCost'] for entry in data) / len(data)
+    avg_production = stats.overall['goldExtracted'].mean
     
     price_impact = avg_production * 100  # Impact of $100 price change
-    minimum_viable_price = avg_cost / avg_production if avg_production > 0 else 1500
+    minimum_viable_price = breakeven_price
     
     return {
         "price_impact": price_impact,
         "minimum_viable_price": minimum_viable_price
     }
 
-def calculate_linear_trend(values):
-    """Calculate linear trend from a series of values"""
-    if len(values) < 2:
-        return 0
+def simulate_path_totals(seed, paths, daily_gold, daily_cost, horizon):
+    """(production, cost, gold price shock) over `horizon` days for each of `paths` Monte Carlo paths
+    
+    Each path draws its days (production and cost together, so weather and cost swings stay
+    jointly distributed) from the historical daily totals, and one standard normal price shock.
+    Runs in pool processes, so it only takes plain arrays and a SeedSequence.
+    """
+    rng = np.random.default_rng(seed)
+    gold = np.zeros(paths)
+    cost = np.zeros(paths)
+    for _ in range(horizon):
+        days = rng.integers(0, len(daily_gold), size=paths)
+        gold += daily_gold[days]
+        cost += daily_cost[days]
+    return gold, cost, rng.standard_normal(paths)
+
+def path_profits(gold, cost, shocks, price, volatility):
+    """Profit of each path under a lognormal gold price around price"""
+    return price * np.exp(volatility * shocks - volatility ** 2 / 2) * gold - cost
+
+def simulate_profit_paths(seed, paths, daily_gold, daily_cost, price, volatility, horizon):
+    """Profit over `horizon` days for each of `paths` Monte Carlo paths"""
+    return path_profits(*simulate_path_totals(seed, paths, daily_gold, daily_cost, horizon), price, volatility)
+
+class RiskAccumulator:
+    """Running mean of simulated profits plus only the worst tail needed for VaR/CVaR, merged chunk by chunk"""
+
+    def __init__(self, paths, levels=(0.95, 0.99)):
+        self.levels = levels
+        self.keep = math.ceil(paths * (1 - min(levels)))
+        self.tail = np.empty(0)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, profits):
+        self.count += len(profits)
+        self.total += float(np.sum(profits))
+        merged = np.concatenate([self.tail, profits])
+        keep = min(self.keep, len(merged))
+        self.tail = np.partition(merged, keep - 1)[:keep] if keep else merged[:0]
+
+    def summary(self):
+        mean = self.total / self.count if self.count else 0.0
+        tail = np.sort(self.tail)
+        levels = []
+        for level in self.levels:
+            worst = tail[:max(math.ceil(self.count * (1 - level)), 1)]
+            levels.append({
+                "level": level,
+                "profitPercentile": float(worst[-1]),  # At least this much profit with probability `level`
+                "valueAtRisk": mean - float(worst[-1]),
+                "conditionalValueAtRisk": mean - float(np.mean(worst))
+            })
+        return {"paths": self.count, "expectedProfit": mean, "levels": levels}
+
+@functools.lru_cache(maxsize=None)
+def risk_pool():
+    """Process pool for Monte Carlo chunks; spawned, so workers never inherit the server's threads"""
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context('spawn'))
+
+def risk_chunks(paths, seed):
+    """(SeedSequence, paths) of each chunk of a run
+    
+    Every chunk gets its own child of one SeedSequence, so a seeded run gives the same
+    paths whatever the pool size or completion order.
+    """
+    chunks = math.ceil(paths / RISK_CHUNK_PATHS)
+    sizes = [min(RISK_CHUNK_PATHS, paths - chunk * RISK_CHUNK_PATHS) for chunk in range(chunks)]
+    return list(zip(np.random.SeedSequence(seed).spawn(chunks), sizes))
+
+def run_risk_simulation(daily, price, volatility, horizon, paths, seed=None, pool=None, max_in_flight=None):
+    """Yield a RiskAccumulator as each chunk of paths completes
+    
+    With a pool, at most max_in_flight chunks (default one per CPU) are submitted at a time and
+    each result is dropped once folded in, so memory stays bounded by the window, not by paths.
+    Closing the generator early, as a dropped ?stream=1 client does, cancels the pending chunks.
+    """
+    arguments = (daily['goldExtracted'], daily['operationalCost'], price, volatility, horizon)
+    chunks = iter(risk_chunks(paths, seed))
+    accumulator = RiskAccumulator(paths)
+    if pool is None:
+        for chunk_seed, size in chunks:
+            accumulator.add(simulate_profit_paths(chunk_seed, size, *arguments))
+            yield accumulator
+        return
+    
+    def submit(count):
+        return {pool.submit(simulate_profit_paths, chunk_seed, size, *arguments) for chunk_seed, size in itertools.islice(chunks, count)}
+    
+    pending = submit(max_in_flight or os.cpu_count() or 1)
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending |= submit(len(done))
+            while done:
+                accumulator.add(done.pop().result())
+                yield accumulator
+    finally:
+        for future in pending:
+            future.cancel()
+
+class RiskPaths:
+    """The price-free part of a seeded Monte Carlo run: each path's production, cost and price shock
+    
+    The profitability insight keeps one per partition, date range and data version, and
+    prices it at the current gold price and volatility in one vectorised pass, so a price
+    move never re-simulates.
+    """
+
+    def __init__(self, daily, horizon, paths, seed):
+        arguments = (daily['goldExtracted'], daily['operationalCost'], horizon)
+        results = [simulate_path_totals(chunk_seed, size, *arguments) for chunk_seed, size in risk_chunks(paths, seed)]
+        self.gold, self.cost, self.shocks = (np.concatenate(parts) for parts in zip(*results))
+
+    def summary(self, price, volatility):
+        accumulator = RiskAccumulator(len(self.gold))
+        accumulator.add(path_profits(self.gold, self.cost, self.shocks, price, volatility))
+        return accumulator.summary()
+
+risk_paths = ResponseCache(max_entries=64)  # (site, from, to, data version) -> RiskPaths of the profitability insight
+
+def precompute_risk_paths(whole, sites, snapshot):
+    """Model trainer listener: simulate the whole store's and each site's profitability risk on the trainer thread
+    
+    At most half the cache is filled, so date ranges requested since keep their entries.
+    """
+    for site in list(snapshot.models)[:risk_paths.max_entries // 2]:
+        daily = (whole if site is None else sites[site]).daily.daily()
+        if len(daily['date']):
+            risk_paths.put((site, None, None, snapshot.version), RiskPaths(daily, PROFIT_RISK_HORIZON, PROFIT_RISK_PATHS, seed=0))
+
+def price_volatility(horizon):
+    """Gold price volatility over horizon days, from the price history or the monthly fallback"""
+    return price_service.history.volatility(horizon * 24 * 3600) or GOLD_MONTHLY_VOLATILITY * math.sqrt(horizon / 30)
+
+def lttb(x, y, points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw the series (x sorted) with `points` points
+    
+    The first and last points are always kept; in between, each bucket contributes the
+    point forming the largest triangle with the previously kept point and the next
+    bucket's average, which preserves peaks and troughs that plain striding drops.
+    """
+    length = len(x)
+    if points >= length:
+        return np.arange(length)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, length - 1, points - 1).astype(np.int64)
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    
+    keep = np.empty(points, dtype=np.int64)
+    keep[0] = previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_stop = stop, edges[bucket + 2]
+            next_x = (x_sums[next_stop] - x_sums[next_start]) / (next_stop - next_start)
+            next_y = (y_sums[next_stop] - y_sums[next_start]) / (next_stop - next_start)
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        keep[bucket + 1] = previous = start + int(np.argmax(areas))
+    keep[-1] = length - 1
+    return keep
+
+def request_points():
+    """The ?points= budget of a chart request"""
+    try:
+        points = int(request.args.get('points', DEFAULT_CHART_POINTS))
+    except ValueError:
+        raise InvalidQuery("points must be an integer")
+    if not 3 <= points <= MAX_CHART_POINTS:
+        raise InvalidQuery(f"points must be 3-{MAX_CHART_POINTS}")
+    return points
+
+def production_chart(points):
+    """Daily gold production, from the daily index"""
+    daily = request_partition().daily.daily(*request_date_range())
+    keep = lttb(daily['date'].astype(np.int64), daily['goldExtracted'], points)
+    return {
+        "labels": daily['date'][keep].astype(str).tolist(),
+        "values": daily['goldExtracted'][keep].tolist(),
+        "days": len(daily['date'])
+    }
+
+def group_chart(grouping):
+    """Average gold production per shift or weather, from the running aggregates"""
+    def build(points):
+        groups = getattr(insight_data()[1], grouping)
+        return {
+            "labels": list(groups),
+            "values": [group['goldExtracted'].mean for group in groups.values()]
+        }
+    return build
+
+def scatter_chart(x_field, y_field):
+    """Per-entry scatter of two fields, ordered by x and downsampled so outliers survive"""
+    def build(points):
+        data = insight_data()[0]
+        order = np.argsort(data[x_field], kind='stable')
+        x, y = data[x_field][order], data[y_field][order]
+        keep = lttb(x, y, points)
+        return {"x": x[keep].tolist(), "y": y[keep].tolist(), "entries": len(data)}
+    return build
+
+CHART_BUILDERS = {
+    'production': production_chart,
+    'shift': group_chart('by_shift'),
+    'weather': group_chart('by_weather'),
+    'cost': scatter_chart('operationalCost', 'goldExtracted'),
+    # Cost per ounce rather than margin, so the cached series does not depend on the price;
+    # the dashboard converts it to a margin at the current price
+    'profitability': scatter_chart('goldExtracted', 'costPerOunce')
+}
+
+def scenario_axis(value, default, name):
+    """A scenario grid axis from a list of numbers or a {"start", "stop", "step"} range (stop included)"""
+    if value is None:
+        return np.asarray(default, dtype=np.float64)
+    try:
+        if isinstance(value, dict):
+            start, stop, step = (float(value[key]) for key in ('start', 'stop', 'step'))
+            if step <= 0:
+                raise ValueError
+            axis = np.arange(start, stop + step / 2, step)
+        else:
+            axis = np.array(value, dtype=np.float64).ravel()
+    except (KeyError, TypeError, ValueError):
+        raise InvalidQuery(f"{name} must be a list of numbers or a {{start, stop, step}} range with a positive step")
+    if not len(axis) or not np.all(np.isfinite(axis)):
+        raise InvalidQuery(f"{name} must have at least one finite value")
+    return axis
+
+def weather_mixes(value, labels, default):
+    """Rows of weather weights (summing to 1) over labels, from a list of {weather: weight} dicts"""
+    if value is None:
+        return np.asarray([default])
+    if not isinstance(value, list) or not value or not all(isinstance(mix, dict) for mix in value):
+        raise InvalidQuery("weatherMix must be a list of {weather: weight} objects")
+    lookup = {label: code for code, label in enumerate(labels)}
+    mixes = np.zeros((len(value), len(labels)))
+    for row, mix in enumerate(value):
+        for label, weight in mix.items():
+            if label not in lookup:
+                raise InvalidQuery(f"Unknown weather: {label}. Use one of: {', '.join(labels)}")
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise InvalidQuery("weatherMix weights must be non-negative numbers")
+            mixes[row, lookup[label]] = weight
+        if mixes[row].sum() <= 0:
+            raise InvalidQuery("Every weatherMix needs a positive weight")
+    return mixes / mixes.sum(axis=1, keepdims=True)
+
+def simulate_scenarios(regression, stats, prices, workers, hours, mixes):
+    """Profit surface over price x workers x equipment hours x weather mix in one broadcast pass
     
-    n = len(values)
-    x = np.arange(n)
-    y = np.array(values)
+    The regression is linear, so a weather mix enters as its weighted effect and ore processed
+    and the shift mix as their historical averages. Production, cost and the breakeven price
+    do not depend on the gold price and are computed once, on the workers x hours x mix grid.
+    """
+    table = regression.coefficient_table()
+    gold, cost = (np.array([table[target].get(feature, 0.0) for feature in regression.features]) for target in RegressionModel.TARGETS)
+    features = {feature: index for index, feature in enumerate(regression.features)}
+    shift_mix = np.zeros(len(features))
+    for shift, group in stats.by_shift.items():
+        if f"shift={shift}" in features:  # Shifts first seen after the snapshot was trained have no effect yet
+            shift_mix[features[f"shift={shift}"]] = group.count / stats.overall.count
+    fixed = shift_mix.copy()
+    fixed[features['intercept']] = 1
+    fixed[features['oreProcessed']] = stats.overall['oreProcessed'].mean
+    weather = np.zeros((len(mixes), len(features)))
+    weather[:, [features[f"weather={label}"] for label in regression.labels['weather']]] = mixes
     
-    # Linear regression slope
-    slope = ((n * np.sum(x * y)) - (np.sum(x) * np.sum(y))) / ((n * np.sum(x**2)) - (np.sum(x)**2))
-    return slope
+    coefficients = np.column_stack([gold, cost])
+    base = fixed @ coefficients  # (targets,)
+    grid = (
+        base
+        + workers[:, None, None, None] * coefficients[features['workers']]
+        + hours[None, :, None, None] * coefficients[features['equipmentHours']]
+        + (weather @ coefficients)[None, None, :, :]
+    )  # (workers, hours, mixes, targets)
+    production = np.maximum(grid[..., 0], 0)
+    operational_cost = grid[..., 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        breakeven = np.where(production > 0, operational_cost / production, np.inf)
+    profit = prices[:, None, None, None] * production - operational_cost
+    return production, operational_cost, breakeven, profit
 
-def analyze_weather_impact(data):
+def analyze_weather_impact(stats):
     """Analyze weather impact on production"""
-    weather_production = {}
-    for entry in data:
-        weather = entry['weather']
-        if weather not in weather_production:
-            weather_production[weather] = []
-        weather_production[weather].append(entry['goldExtracted'])
+    weather_production = {weather: group['goldExtracted'].mean for weather, group in stats.by_weather.items()}
     
-    clear_avg = np.mean(weather_production.get('Clear', [35]))
-    rain_avg = np.mean(weather_production.get('Heavy Rain', [20]))
-    overall_avg = np.mean([entry['goldExtracted'] for entry in data])
+    clear_avg = weather_production.get('Clear', 35)
+    rain_avg = weather_production.get('Heavy Rain', 20)
+    overall_avg = stats.overall['goldExtracted'].mean
     
     return {
         'clear_boost': ((clear_avg - overall_avg) / overall_avg) * 100,
         'rain_penalty': ((overall_avg - rain_avg) / overall_avg) * 100
     }
 
-def analyze_shift_performance(data):
+def analyze_shift_performance(stats):
     """Analyze performance by shift"""
-    shift_data = {}
-    for entry in data:
-        shift = entry['shift']
-        if shift not in shift_data:
-            shift_data[shift] = {'productions': [], 'costs': []}
-        shift_data[shift]['productions'].append(entry['goldExtracted'])
-        shift_data[shift]['costs'].append(entry['costPerOunce'])
-    
     result = {}
-    for shift, values in shift_data.items():
+    for shift, group in stats.by_shift.items():
         result[shift] = {
-            'avg_production': np.mean(values['productions']),
-            'avg_cost': np.mean(values['costs']),
-            'efficiency': np.mean(values['productions']) / np.mean(values['costs'])
+            'avg_production': group['goldExtracted'].mean,
+            'avg_cost': group['costPerOunce'].mean,
+            'efficiency': group['goldExtracted'].mean / group['costPerOunce'].mean
         }
     
     return result
 
-def analyze_worker_efficiency(data):
+def analyze_worker_efficiency(stats, regression):
     """Analyze worker efficiency patterns"""
-    worker_productions = []
-    for entry in data:
-        worker_productions.append({
-            'workers': entry['workers'],
-            'production': entry['goldExtracted'],
-            'efficiency': entry['goldExtracted'] / entry['workers']
-        })
-    
-    efficiencies = [wp['efficiency'] for wp in worker_productions]
-    avg_efficiency = np.mean(efficiencies)
+    avg_efficiency = stats.overall['goldPerWorker'].mean
     
     # Find optimal worker count
-    worker_counts = [wp['workers'] for wp in worker_productions]
-    optimal_workers = int(np.mean(worker_counts))
+    optimal_workers = int(stats.overall['workers'].mean)
+    
+    # Predicted gain from every shift producing like the best one, with crew, equipment, ore and weather held equal
+    improvement_potential = None
+    avg_production = stats.overall['goldExtracted'].mean
+    if regression is not None and avg_production:
+        shift_effects = regression.coefficient_table()['goldExtracted']
+        effects = {shift: shift_effects.get(f"shift={shift}", 0.0) for shift in stats.by_shift}
+        current_mix = sum(effects[shift] * group.count for shift, group in stats.by_shift.items()) / stats.overall.count
+        improvement_potential = (max(effects.values(), default=0.0) - current_mix) / avg_production * 100
     
     return {
         'current_efficiency': avg_efficiency,
         'optimal_workers': optimal_workers,
-        'improvement_potential': 15  # Estimated improvement percentage
+        'improvement_potential': improvement_potential
     }
 
-def analyze_equipment_utilization(data):
+def analyze_equipment_utilization(stats):
     """Analyze equipment utilization patterns"""
-    equipment_data = []
-    for entry in data:
-        equipment_data.append({
-            'hours': entry['equipmentHours'],
-            'production': entry['goldExtracted']
-        })
-    
-    avg_hours = np.mean([ed['hours'] for ed in equipment_data])
+    avg_hours = stats.overall['equipmentHours'].mean
     
-    # Find optimal range
-    high_production_entries = sorted(equipment_data, key=lambda x: x['production'], reverse=True)[:10]
-    optimal_hours = np.mean([entry['hours'] for entry in high_production_entries])
+    # Find optimal range (top 10 producing entries, kept on insert)
+    optimal_hours = float(np.mean(stats.overall.top_production.payload['equipmentHours']))
     
     return {
         'avg_hours': avg_hours,
         'optimal_range': f"{optimal_hours-10:.0f}-{optimal_hours+10:.0f}"
     }
 
-def analyze_cost_efficiency(data):
+def analyze_cost_efficiency(stats):
     """Analyze cost efficiency patterns"""
-    costs_per_ounce = [entry['costPerOunce'] for entry in data]
-    current_cost = np.mean(costs_per_ounce)
-    min_cost = np.min(costs_per_ounce)
+    current_cost = stats.overall['costPerOunce'].mean
     
-    # Target cost (10th percentile)
-    target_cost = np.percentile(costs_per_ounce, 10)
+    # Target cost (10th percentile, from the streaming sketch)
+    target_cost = stats.overall.sketches['costPerOunce'].quantile(0.1)
     potential_savings = current_cost - target_cost
     
     return {
@@ -1594,16 +5347,212 @@ def analyze_cost_efficiency(data):
         'potential_savings': potential_savings
     }
 
-def open_browser():
+def _convert_column(values, dtype):
+    """Convert a raw object column to dtype, flagging cells that do not parse instead of raising"""
+    try:
+        return values.astype(dtype), np.zeros(len(values), dtype=bool)
+    except (ValueError, TypeError):
+        pass
+    
+    # Only chunks that contain a malformed cell pay for the per-cell pass
+    converted = np.empty(len(values), dtype=dtype)
+    bad = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        try:
+            converted[index] = value
+        except (ValueError, TypeError):
+            bad[index] = True
+    return converted, bad
+
+def _booleans(column):
+    """Mask of JSON true/false cells, which NumPy would otherwise store as 1/0"""
+    if not set(map(type, column)) & {bool, np.bool_}:
+        return np.zeros(len(column), dtype=bool)
+    return np.fromiter((isinstance(value, (bool, np.bool_)) for value in column), dtype=bool, count=len(column))
+
+def parse_entry_columns(raw, count, row_errors=(), sites=()):
+    """Validate a chunk of raw upload columns and derive efficiency/costPerOunce vectorized
+    
+    Returns (columns, labels, errors): the valid rows in ProductionStore.extend_columns form,
+    and a (chunk index, message) pair for the first problem found in each rejected row.
+    Every label gets permanent aggregate state, so shift and weather must be known values
+    and sites beyond the already known `sites` are only accepted up to MAX_SITES.
+    """
+    valid = np.ones(count, dtype=bool)
+    errors = list(row_errors)
+    for index, _ in row_errors:
+        valid[index] = False
+    
+    def reject(bad, message):
+        for index in np.flatnonzero(bad & valid):
+            errors.append((int(index), message))
+        valid[bad] = False
+    
+    values = {}
+    for field in REQUIRED_FIELDS:
+        column = np.fromiter(raw.get(field, [None] * count), dtype=object, count=count)
+        missing = np.equal(column, None) | np.equal(column, '')
+        reject(missing, f"Missing field: {field}")
+        
+        if field in CATEGORICAL_FIELDS:
+            column[missing] = ''
+            values[field] = column.astype(str)
+            continue
+        
+        column[missing] = 'NaT' if field == 'date' else np.nan
+        values[field], bad = _convert_column(column, COLUMN_DTYPES['date'] if field == 'date' else np.float64)
+        if field == 'date':
+            reject(bad, "Invalid date (expected YYYY-MM-DD)")
+        else:
+            reject(bad | _booleans(column) | ~np.isfinite(values[field]), f"{field} must be a number")
+    
+    site = np.fromiter(raw.get('site', [None] * count), dtype=object, count=count)
+    site[np.equal(site, None) | np.equal(site, '')] = DEFAULT_SITE
+    values['site'] = site.astype(str)
+    
+    reject(~np.isin(values['shift'], list(SHIFT_MULTIPLIERS)), f"shift must be one of: {', '.join(SHIFT_MULTIPLIERS)}")
+    reject(~np.isin(values['weather'], list(WEATHER_PROBABILITIES)), f"weather must be one of: {', '.join(WEATHER_PROBABILITIES)}")
+    reject(np.char.str_len(values['site']) > MAX_SITE_LENGTH, f"site must be at most {MAX_SITE_LENGTH} characters")
+    new_sites = [label for label in np.unique(values['site'][valid]) if label not in sites]
+    room = max(MAX_SITES - len(sites), 0)
+    if len(new_sites) > room:
+        reject(np.isin(values['site'], new_sites[room:]), f"Too many sites (at most {MAX_SITES})")
+    reject(values['goldExtracted'] <= 0, "goldExtracted must be positive")
+    reject(values['oreProcessed'] <= 0, "oreProcessed must be positive")
+    reject((values['workers'] <= 0) | (values['workers'] != np.floor(values['workers'])), "workers must be a positive whole number")
+    reject(values['equipmentHours'] < 0, "equipmentHours cannot be negative")
+    reject(values['operationalCost'] < 0, "operationalCost cannot be negative")
+    
+    columns = {field: values[field][valid] for field in REQUIRED_FIELDS if field not in CATEGORICAL_FIELDS}
+    columns['workers'] = columns['workers'].astype(COLUMN_DTYPES['workers'])
+    columns['efficiency'] = np.round(columns['goldExtracted'] / columns['oreProcessed'] * 100, 2)
+    columns['costPerOunce'] = np.round(columns['operationalCost'] / columns['goldExtracted'], 2)
+    columns['createdAt'] = np.datetime64(datetime.now(), 'us')
+    
+    labels = {}
+    for field in CATEGORICAL_FIELDS:
+        labels[field], columns[field] = np.unique(values[field][valid], return_inverse=True)
+    
+    return columns, labels, sorted(errors)
+
+def _buffered(stream):
+    """Line reads on a raw WSGI input stream go byte by byte; give it a buffer"""
+    return io.BufferedReader(stream) if isinstance(stream, io.RawIOBase) else stream
+
+def read_csv_chunks(stream, chunk_rows):
+    """Yield (raw columns, row count, row errors) chunks from a CSV upload with a header row"""
+    reader = csv.DictReader(io.TextIOWrapper(_buffered(stream), encoding='utf-8-sig', newline=''))
+    while True:
+        rows = list(itertools.islice(reader, chunk_rows))
+        if not rows:
+            return
+        yield {field: [row.get(field) for row in rows] for field in UPLOAD_FIELDS}, len(rows), ()
+
+def read_ndjson_chunks(stream, chunk_rows):
+    """Yield chunks from a newline-delimited JSON upload, one entry object per line"""
+    lines = (line for line in _buffered(stream) if line.strip())
+    while True:
+        batch = list(itertools.islice(lines, chunk_rows))
+        if not batch:
+            return
+        raw = {field: [None] * len(batch) for field in UPLOAD_FIELDS}
+        row_errors = []
+        for index, line in enumerate(batch):
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                row_errors.append((index, f"Invalid JSON: {e}"))
+                continue
+            if not isinstance(record, dict):
+                row_errors.append((index, "Row is not a JSON object"))
+                continue
+            for field in UPLOAD_FIELDS:
+                raw[field][index] = record.get(field)
+        yield raw, len(batch), row_errors
+
+def _arrow_columns(batch):
+    names = batch.schema.names
+    return {field: batch.column(field).to_pylist() if field in names else [None] * batch.num_rows for field in UPLOAD_FIELDS}
+
+def read_arrow_chunks(stream, chunk_rows):
+    """Yield chunks from an Arrow IPC stream upload (requires pyarrow)"""
+    import pyarrow.ipc
+    
+    for batch in pyarrow.ipc.open_stream(stream):
+        for offset in range(0, batch.num_rows, chunk_rows):
+            piece = batch.slice(offset, chunk_rows)
+            yield _arrow_columns(piece), piece.num_rows, ()
+
+def read_parquet_chunks(stream, chunk_rows):
+    """Yield chunks from a Parquet upload (requires pyarrow)
+    
+    The Parquet footer needs random access, so the upload is spooled to a temporary
+    file first; only one row batch at a time is decoded from it.
+    """
+    import pyarrow.parquet
+    
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as spool:
+        shutil.copyfileobj(stream, spool, 1024 * 1024)
+        spool.seek(0)
+        parquet_file = pyarrow.parquet.ParquetFile(spool)
+        present = [field for field in UPLOAD_FIELDS if field in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=present):
+            yield _arrow_columns(batch), batch.num_rows, ()
+
+BULK_READERS = {
+    'csv': read_csv_chunks,
+    'ndjson': read_ndjson_chunks,
+    'arrow': read_arrow_chunks,
+    'parquet': read_parquet_chunks
+}
+
+def open_browser(port=5000):
     """Open browser after delay"""
+    import webbrowser
+    
     time.sleep(3)
-    webbrowser.open('http://localhost:5000')
+    webbrowser.open(f'http://localhost:{port}')
+
+def serve(host, port, workers, threads=4):
+    """Serve the app from a gunicorn pre-fork worker pool
+    
+    Every worker builds its own state on its first request, after the fork, and shares
+    production data and the gold price with the others through the SQLite database.
+    Equivalent to: gunicorn -w <workers> 'gold_mine_productivity_analyzere:create_app()'
+    """
+    from gunicorn.app.base import BaseApplication
+    
+    class WorkerPool(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+        
+        def load(self):
+            use_gunicorn_error_log()
+            return app
+    
+    WorkerPool().run()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gold Mine Productivity Analyzer")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--headless', action='store_true', help="Do not open a browser")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes; more than 1 serves through gunicorn")
+    parser.add_argument('--threads', type=int, default=64, help="Threads per gunicorn worker; each open dashboard holds one for its event stream")
+    parser.add_argument('--vendor-assets', action='store_true', help="Download Chart.js and Font Awesome to VENDOR_PATH and serve them locally")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    create_app({'HEADLESS': args.headless or app.config['HEADLESS']})
+    if args.vendor_assets:
+        vendor_assets(app.config['VENDOR_PATH'])
+        print(f"📦 Vendored Chart.js and Font Awesome into {app.config['VENDOR_PATH']}")
+    
     print("⛏️  Gold Mine Productivity Analyzer")
     print("=" * 50)
     print("✅ AI-powered mining operations optimization")
-    print("🌐 Starting server at http://localhost:5000")
+    print(f"🌐 Starting server at http://localhost:{args.port}")
     print("\nFeatures:")
     print("  • Production forecasting with ML algorithms")
     print("  • Operational efficiency optimization")
@@ -1615,9 +5564,13 @@ if __name__ == '__main__':
     print("-" * 50)
     
     # Auto-open browser
-    Timer(2.0, open_browser).start()
+    if not app.config['HEADLESS']:
+        Timer(2.0, open_browser, args=(args.port,)).start()
     
     try:
-        app.run(debug=False, host='0.0.0.0', port=5000)
+        if args.workers > 1:
+            serve(args.host, args.port, args.workers, args.threads)
+        else:
+            app.run(debug=False, host=args.host, port=args.port)
     except KeyboardInterrupt:
         print("\n👋 Gold Mine Productivity Analyzer stopped successfully")
\ No newline at end of file
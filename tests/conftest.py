@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def analyzer():
+    """The app module with its state built once over a small in-memory store and no network price sources"""
+    import gold_mine_productivity_analyzere as gm
+    gm.GOLD_PRICE_SOURCES.clear()
+    gm.create_app({'DATA_PATH': ':memory:', 'TRAINING_DAYS': 60, 'TRAINING_SEED': 7, 'HEADLESS': True})
+    gm.app.test_client().get('/api/gold-price')
+    yield gm
+    if gm.risk_pool.cache_info().currsize:
+        gm.risk_pool().shutdown()
+
+
+@pytest.fixture
+def client(analyzer):
+    return analyzer.app.test_client()
+
+
+ENTRY = {
+    "date": "2026-01-15", "shift": "Day", "goldExtracted": 30.5, "oreProcessed": 800, "workers": 20,
+    "equipmentHours": 150, "weather": "Clear", "operationalCost": 21000
+}
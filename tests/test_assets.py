@@ -0,0 +1,55 @@
+"""The dashboard shell and its fingerprinted, precompressed assets"""
+
+import gzip
+import hashlib
+import re
+
+
+def asset_urls(client):
+    shell = client.get('/').get_data(as_text=True)
+    return re.findall(r'(?:src|href)="(/assets/[^"]+)"', shell)
+
+
+def test_shell_revalidates_and_points_at_fingerprinted_assets(client):
+    response = client.get('/')
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert '<style>' not in response.get_data(as_text=True)
+    urls = asset_urls(client)
+    assert {url.rsplit('.', 1)[-1] for url in urls} >= {'css', 'js'}
+    assert client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_assets_are_immutable_and_named_by_content(client):
+    for url in asset_urls(client):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        etag = response.get_etag()[0]
+        # The name carries the start of the content hash, so new content means a new URL
+        assert url.split('.')[-2] == etag[:12] == hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()[:12]
+        assert client.get(url, headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+    assert client.get('/assets/dashboard.000000000000.js').status_code == 404
+
+
+def test_assets_are_gzipped_only_for_clients_that_accept_it(client):
+    url = next(url for url in asset_urls(client) if url.endswith('.js'))
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    assert len(zipped.get_data()) < len(plain.get_data())
+    # Each coding has its own ETag, so a cache never answers one coding's revalidation with the other
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+    assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']}).status_code == 304
+    assert client.get(url, headers={'Accept-Encoding': 'identity', 'If-None-Match': zipped.headers['ETag']}).status_code == 200
+
+
+def test_dashboard_escapes_entry_and_insight_text_before_rendering(analyzer):
+    script = re.search(r'<script>(.*?)</script>', analyzer.HTML_TEMPLATE, re.S).group(1)
+    assert 'function escapeHtml(' in script
+    # Site names are free text, so no entry or insight field is interpolated into markup raw
+    assert re.findall(r'\$\{(?:entry|insight)\.\w+\}', script) == []
+    assert 'escapeHtml(entry.site)' in script and 'escapeHtml(insight.description)' in script
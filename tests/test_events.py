@@ -0,0 +1,45 @@
+"""The dashboard's server-sent event stream"""
+
+import json
+
+from conftest import ENTRY
+
+
+def read_events(chunks, name):
+    """Parsed (id, data) of the named events in the next chunk that carries any"""
+    while True:
+        chunk = next(chunks).decode()
+        events = []
+        for message in chunk.split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in message.splitlines() if ': ' in line and not line.startswith(':'))
+            if fields.get('event') == name:
+                events.append((fields['id'], json.loads(fields['data'])))
+        if events:
+            return events
+
+
+def test_posted_entry_is_pushed_to_open_streams(client, analyzer):
+    response = client.get('/api/events', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    chunks = iter(response.response)
+    assert next(chunks) == b"retry: 5000\n\n"
+    
+    entry = {**ENTRY, "goldExtracted": 41.25, "site": "Stream Test"}
+    assert client.post('/api/production-data', json=entry).status_code == 200
+    [(event_id, event)] = read_events(chunks, 'entries')
+    assert event['rows'] == 1
+    assert event['version'] == len(analyzer.production_store)
+    [pushed] = event['entries']
+    assert (pushed['goldExtracted'], pushed['site'], pushed['date']) == (41.25, 'Stream Test', ENTRY['date'])
+    response.close()
+    
+    # A reconnect that sends the last id it saw is replayed only what came after it
+    assert client.post('/api/production-data', json={**entry, "goldExtracted": 42.5}).status_code == 200
+    resumed = client.get('/api/events', headers={'Last-Event-ID': event_id}, buffered=False)
+    chunks = iter(resumed.response)
+    next(chunks)
+    [(_, replayed)] = read_events(chunks, 'entries')
+    assert [row['goldExtracted'] for row in replayed['entries']] == [42.5]
+    resumed.close()
+    assert analyzer.event_broadcaster.metrics()['subscribers'] == 0
@@ -0,0 +1,210 @@
+"""Insight routes over the shared test store"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import ENTRY
+
+
+def test_scenarios_honour_the_date_range(client):
+    assert client.get('/api/ml/scenarios').status_code == 200
+    empty = client.get('/api/ml/scenarios?from=2000-01-01&to=2000-01-31')
+    assert empty.status_code == 400
+    assert 'No production data' in empty.get_json()['error']
+
+
+def test_short_range_forecast_leaves_out_the_weekday_pattern(client):
+    recent = (date.today() - timedelta(days=9)).isoformat()
+    insights = client.get(f'/api/ml/forecast?from={recent}').get_json()['insights']
+    assert 'above the weekly average' not in insights[0]['description']
+    full = client.get('/api/ml/forecast').get_json()['insights']
+    assert 'above the weekly average' in full[0]['description']
+
+
+def test_new_site_is_served_before_its_models_are_trained(client, analyzer):
+    entries = [{**ENTRY, "site": "Test Quarry", "date": f"2026-02-{day:02d}"} for day in range(1, 13)]
+    body = ''.join(json.dumps(entry) + '\n' for entry in entries)
+    assert client.post('/api/production-data/bulk', data=body, content_type='application/x-ndjson').get_json()['accepted'] == 12
+    
+    for route in ('/api/ml/forecast', '/api/ml/optimize', '/api/ml/scenarios'):
+        response = client.get(route + '?site=Test%20Quarry')
+        assert response.status_code == 200, (route, response.get_json())
+    
+    # The fallback asked for a retrain that gives the site its own models
+    deadline = time.time() + 30
+    while 'Test Quarry' not in analyzer.model_trainer.snapshot.models and time.time() < deadline:
+        time.sleep(0.05)
+    assert 'Test Quarry' in analyzer.model_trainer.snapshot.models
+
+
+def test_cached_best_profit_row_stays_inside_an_older_view(analyzer):
+    # A view taken before the best row landed must not be handed that row's index
+    data = analyzer.production_store.view()
+    best = analyzer.aggregates.best_profit_row(2000.0, data)
+    assert best > 0
+    older = analyzer.production_store.view().take(list(range(best)))
+    assert analyzer.aggregates.best_profit_row(2000.0, older) < best
+
+
+def test_whole_store_snapshot_rows_are_inside_the_view(analyzer):
+    partition = analyzer.Partition(analyzer.production_store.view, analyzer.aggregates, analyzer.daily_index, analyzer.production_model)
+    data, stats = analyzer.partition_data(partition)
+    assert stats.overall.count <= len(data)
+    assert stats.overall['costPerOunce'].argmin < len(data)
+
+
+def test_range_snapshot_matches_aggregating_the_rows(analyzer):
+    start = analyzer.np.datetime64(date.today() - timedelta(days=20), 'D')
+    site = analyzer.site_partitions[analyzer.site_partitions.names()[0]]
+    whole = analyzer.Partition(analyzer.production_store.view, analyzer.aggregates, analyzer.daily_index, analyzer.production_model)
+    for partition in (whole, site):
+        data, stats = analyzer.partition_data(partition, start)
+        engine = analyzer.AggregateEngine()
+        engine(data.take(analyzer.np.arange(len(data))))
+        expected = engine.snapshot()
+        assert len(data) == stats.overall.count == expected.overall.count
+        for field in analyzer.AGGREGATE_FIELDS:
+            got, want = stats.overall[field], expected.overall[field]
+            assert got.total == pytest.approx(want.total)
+            assert got.std == pytest.approx(want.std)
+            assert (got.minimum, got.maximum, got.argmin) == (want.minimum, want.maximum, want.argmin)
+        assert stats.overall.correlation() == pytest.approx(expected.overall.correlation())
+        assert sorted(stats.overall.top_production.rows) == sorted(expected.overall.top_production.rows)
+        for grouping in ('by_shift', 'by_weather'):
+            got, want = getattr(stats, grouping), getattr(expected, grouping)
+            assert sorted(got) == sorted(want)
+            for label, group in got.items():
+                assert group.count == want[label].count
+                assert group['goldExtracted'].mean == pytest.approx(want[label]['goldExtracted'].mean)
+                assert group['costPerOunce'].argmin == want[label]['costPerOunce'].argmin
+
+
+def test_profitability_risk_prices_stored_paths_instead_of_simulating(analyzer, monkeypatch):
+    with analyzer.app.test_request_context('/api/ml/profitability'):
+        plan = analyzer.InsightPlan()
+        paths = plan.risk_paths
+        for accumulator in analyzer.run_risk_simulation(plan.daily, 2000.0, 0.05, analyzer.PROFIT_RISK_HORIZON, analyzer.PROFIT_RISK_PATHS, seed=0):
+            pass
+        for got, want in zip(paths.summary(2000.0, 0.05)['levels'], accumulator.summary()['levels']):
+            assert got == pytest.approx(want)
+        
+        # A price move reprices the same paths
+        def simulate(*args):
+            raise AssertionError("re-simulated on the request thread")
+        monkeypatch.setattr(analyzer, 'simulate_path_totals', simulate)
+        monkeypatch.setattr(analyzer, 'current_gold_price', analyzer.current_gold_price + 50)
+        assert analyzer.InsightPlan().risk_paths is paths
+        assert 'Risk Assessment' in analyzer.profitability_insights(analyzer.InsightPlan())[-1]['title']
+
+
+class CountingPool:
+    """A thread pool that records its futures and the most it ever had unfinished at once"""
+
+    def __init__(self, workers):
+        self.pool = ThreadPoolExecutor(workers)
+        self.futures = []
+        self.most_in_flight = 0
+
+    def submit(self, *args):
+        future = self.pool.submit(*args)
+        self.futures.append(future)
+        self.most_in_flight = max(self.most_in_flight, sum(not future.done() for future in self.futures))
+        return future
+
+
+def test_risk_simulation_keeps_a_bounded_window_of_chunks(analyzer):
+    with analyzer.app.test_request_context('/api/ml/risk'):
+        daily = analyzer.InsightPlan().daily
+    paths = analyzer.RISK_CHUNK_PATHS * 8
+    inline = [accumulator.count for accumulator in analyzer.run_risk_simulation(daily, 2000.0, 0.05, 5, paths, seed=3)]
+    counting = CountingPool(2)
+    pooled = [accumulator.count for accumulator in analyzer.run_risk_simulation(daily, 2000.0, 0.05, 5, paths, seed=3, pool=counting, max_in_flight=2)]
+    assert pooled == inline == [analyzer.RISK_CHUNK_PATHS * chunk for chunk in range(1, 9)]
+    assert len(counting.futures) == 8 and counting.most_in_flight <= 2
+    
+    # Closing early (a dropped stream) submits nothing more and cancels what has not started
+    counting = CountingPool(1)
+    simulation = analyzer.run_risk_simulation(daily, 2000.0, 0.05, 5, paths, seed=3, pool=counting, max_in_flight=3)
+    next(simulation)
+    simulation.close()
+    counting.pool.shutdown()
+    assert len(counting.futures) == 4
+    assert sum(future.cancelled() for future in counting.futures) >= 1
+    assert sum(future.done() and not future.cancelled() for future in counting.futures) <= 2
+
+
+def test_aggregate_snapshot_is_unaffected_by_later_rows(analyzer):
+    engine = analyzer.AggregateEngine()
+    store = analyzer.ProductionStore()
+    store.subscribe(engine)
+    store.extend_columns(*analyzer.generate_training_data(days=30, seed=3))
+    before = engine.snapshot()
+    count, total = before.overall.count, before.overall['goldExtracted'].total
+    median = before.overall.sketches['goldExtracted'].quantile(0.5)
+    top = before.overall.top_production.rows.tolist()
+    day = before.by_shift['Day']['goldExtracted'].mean
+    
+    # Far larger values than any seen, so every statistic would move if shared
+    columns, labels = analyzer.generate_training_data(days=30, seed=4)
+    columns['goldExtracted'] = columns['goldExtracted'] * 100
+    store.extend_columns(columns, labels)
+    assert (before.overall.count, before.overall['goldExtracted'].total) == (count, total)
+    assert before.overall.sketches['goldExtracted'].quantile(0.5) == median
+    assert before.overall.top_production.rows.tolist() == top
+    assert before.by_shift['Day']['goldExtracted'].mean == day
+    assert engine.snapshot().overall.count == 2 * count
+
+
+def test_insights_revalidate_by_etag_until_an_entry_is_posted(client, analyzer):
+    first = client.get('/api/ml/profitability')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    
+    hits = analyzer.response_cache.hits
+    again = client.get('/api/ml/profitability', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and not again.get_data()
+    assert analyzer.response_cache.hits == hits + 1
+    
+    # A new entry bumps the data version, so the cached body and its ETag are replaced
+    assert client.post('/api/production-data', json={**ENTRY, "goldExtracted": 480.0, "date": date.today().isoformat()}).status_code == 200
+    fresh = client.get('/api/ml/profitability', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+    assert fresh.get_json() != first.get_json()
+
+
+def test_predict_scores_plans_with_the_returned_coefficients(client):
+    plans = [
+        {"workers": 25, "equipmentHours": 200, "oreProcessed": 1200, "shift": shift, "weather": weather}
+        for shift, weather in (("Day", "Clear"), ("Night", "Heavy Rain"), ("Evening", "Light Rain"))
+    ]
+    response = client.post('/api/ml/predict', json={"plans": plans})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert client.post('/api/ml/predict', json=plans).get_json()['predictions'] == body['predictions']
+    assert len(body['predictions']) == len(plans)
+    assert body['microsecondsPerRow'] >= 0
+    
+    for plan, prediction in zip(plans, body['predictions']):
+        assert set(prediction) == {'goldExtracted', 'operationalCost'}
+        for target, coefficients in body['model']['coefficients'].items():
+            expected = coefficients['intercept'] + coefficients[f"shift={plan['shift']}"] + coefficients[f"weather={plan['weather']}"]
+            expected += sum(coefficients[field] * plan[field] for field in ('workers', 'equipmentHours', 'oreProcessed'))
+            assert prediction[target] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('payload, message', [
+    ({"plans": []}, 'Send a list of shift plans'),
+    ({"plans": [1, 2]}, 'Send a list of shift plans'),
+    ([{**ENTRY, "workers": "many"}], 'workers must be a number'),
+    ([{**ENTRY, "oreProcessed": None}], 'oreProcessed must be a number'),
+    ([ENTRY, {**ENTRY, "weather": "Blizzard"}], 'Unknown weather: Blizzard'),
+])
+def test_predict_rejects_malformed_plans(client, payload, message):
+    response = client.post('/api/ml/predict', json=payload)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
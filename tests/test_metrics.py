@@ -0,0 +1,71 @@
+"""/metrics in the Prometheus text exposition format"""
+
+import re
+
+import pytest
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    """{family: type} and [(name, {label: value}, value)], checking every family is described before its samples"""
+    types, helps, samples = {}, set(), []
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            helps.add(line.split(' ', 3)[2])
+        elif line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            assert name in helps and name not in types, line
+            types[name] = kind
+        else:
+            name, labels, value = SAMPLE.match(line).groups()
+            family = re.sub(r'_(bucket|sum|count)$', '', name) if name not in types else name
+            assert family in types, line
+            if family != name:
+                assert types[family] == 'histogram', line
+            samples.append((name, dict(LABEL.findall(labels or '')), float(value)))
+    return types, samples
+
+
+def test_metrics_use_the_text_exposition_format(client):
+    client.get('/api/production-data?limit=5')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    types, samples = parse(response.get_data(as_text=True))
+    
+    assert types['gold_mine_request_seconds'] == types['gold_mine_stage_seconds'] == 'histogram'
+    assert types['gold_mine_response_cache_hits_total'] == 'counter'
+    assert types['gold_mine_rows'] == types['gold_mine_sites'] == 'gauge'
+    assert all(kind != 'counter' or name.endswith('_total') for name, kind in types.items())
+    rows = [value for name, _, value in samples if name == 'gold_mine_rows']
+    assert rows and rows[0] > 0
+    
+    route = {'route': '/api/production-data', 'method': 'GET', 'status': '200'}
+    buckets = [(labels['le'], value) for name, labels, value in samples
+               if name == 'gold_mine_request_seconds_bucket' and {key: labels[key] for key in route} == route]
+    assert buckets[-1][0] == '+Inf'
+    assert [float(bound) for bound, _ in buckets] == sorted(float(bound) for bound, _ in buckets)
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts) and counts[-1] >= 1  # Cumulative
+    [count] = [value for name, labels, value in samples if name == 'gold_mine_request_seconds_count' and labels == route]
+    [total] = [value for name, labels, value in samples if name == 'gold_mine_request_seconds_sum' and labels == route]
+    assert count == counts[-1] and total > 0
+
+
+def test_label_values_are_escaped(analyzer):
+    registry = analyzer.MetricsRegistry()
+    registry.increment('gold_mine_price_source_failures_total', source='Say "hi"\\\n')
+    registry.observe('gold_mine_stage_seconds', 0.003, stage='x')
+    registry.observe('gold_mine_stage_seconds', 20, stage='x')
+    types, samples = parse(registry.render())
+    assert ('gold_mine_price_source_failures_total', {'source': 'Say \\"hi\\"\\\\\\n'}, 1.0) in samples
+    buckets = {labels['le']: value for name, labels, value in samples if name == 'gold_mine_stage_seconds_bucket'}
+    assert (buckets['0.0025'], buckets['0.005'], buckets['10.0'], buckets['+Inf']) == (0, 1, 1, 2)
+    assert ('gold_mine_stage_seconds_sum', {'stage': 'x'}, pytest.approx(20.003)) in samples
+
+
+def test_disabled_metrics_are_not_served(client, analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer.metrics, 'enabled', False)
+    assert client.get('/metrics').status_code == 404
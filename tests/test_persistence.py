@@ -0,0 +1,73 @@
+"""Restarting from the production log's snapshots"""
+
+import numpy as np
+import pytest
+
+
+def build(gm):
+    """An empty store with the listeners initialize_state() snapshots"""
+    store = gm.ProductionStore()
+    derived = (gm.AggregateEngine(), gm.TrendEngine(), gm.DailyIndex(), gm.RegressionModel(), gm.SitePartitions(store))
+    for listener in derived:
+        store.subscribe(listener)
+    return store, derived
+
+
+def restart(gm, path):
+    store, derived = build(gm)
+    log = gm.ProductionLog(path)
+    log.restore(store, derived)
+    log.attach(store)
+    return log, store, derived
+
+
+def test_restart_restores_listeners_instead_of_replaying(analyzer, tmp_path, monkeypatch):
+    gm = analyzer
+    path = str(tmp_path / 'production.db')
+    log, store, _ = restart(gm, path)
+    log.append(*gm.generate_training_data(days=40, sites=3, seed=1), seed=True)
+    log.close()
+
+    # Rows committed after the last snapshot, as if the process died before writing another
+    log, store, _ = restart(gm, path)
+    log.append(*gm.generate_training_data(days=2, sites=3, seed=2, end_date=np.datetime64('2030-01-02')))
+    log.snapshot_path = None
+    log.close()
+
+    replayed = []
+    fold = gm.AggregateEngine.__call__
+    monkeypatch.setattr(gm.AggregateEngine, '__call__', lambda engine, batch: (replayed.append(len(batch)), fold(engine, batch)))
+    log, store, (engine, trends, daily, model, sites) = restart(gm, path)
+    log.close()
+    monkeypatch.undo()
+    # The snapshot's rows are restored with the listeners; only the log tail is replayed into them,
+    # by the whole store's engine and then each site's
+    assert replayed == [2 * 3 * 3] + [2 * 3] * 3
+
+    rebuilt_store, (rebuilt_engine, rebuilt_trends, rebuilt_daily, rebuilt_model, rebuilt_sites) = build(gm)
+    view = store.view()
+    rebuilt_store.extend_columns({field: view[field] for field in gm.LOG_FIELDS}, {field: view.labels(field) for field in gm.CATEGORICAL_FIELDS})
+    rebuilt_store.mark_user_offset(store.user_offset)
+    assert len(store) == 40 * 3 * 3 + 2 * 3 * 3
+
+    stats, expected = engine.snapshot(), rebuilt_engine.snapshot()
+    assert stats.overall.count == expected.overall.count
+    # The restored listeners saw the rows in two batches, the rebuilt ones in one, so only rounding may differ
+    assert stats.overall['costPerOunce'].mean == pytest.approx(expected.overall['costPerOunce'].mean)
+    assert sorted(stats.by_weather) == sorted(expected.by_weather)
+    restored_days = daily.daily()
+    np.testing.assert_array_equal(restored_days.pop('date'), rebuilt_daily.daily()['date'])
+    for field, values in restored_days.items():
+        np.testing.assert_allclose(values, rebuilt_daily.daily()[field])
+    np.testing.assert_array_equal(daily.rows(np.datetime64('2030-01-01')), rebuilt_daily.rows(np.datetime64('2030-01-01')))
+    np.testing.assert_allclose(model.fit().coefficients, rebuilt_model.fit().coefficients)
+    for series, windows in rebuilt_trends.snapshot().items():
+        for window, trend in windows.items():
+            assert trends.snapshot()[series][window] == pytest.approx(trend)
+
+    assert sites.names() == rebuilt_sites.names()
+    for name in sites.names():
+        site, rebuilt_site = sites[name], rebuilt_sites[name]
+        assert site.aggregates.snapshot().overall['goldExtracted'].total == pytest.approx(rebuilt_site.aggregates.snapshot().overall['goldExtracted'].total)
+        np.testing.assert_array_equal(site.view().rows, rebuilt_site.view().rows)
+        assert site.view().record(0) == rebuilt_site.view().record(0)
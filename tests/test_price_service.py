@@ -0,0 +1,148 @@
+"""The gold price service against a local stub of the upstream price APIs"""
+
+import json
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+
+class StubSource:
+    """A price API on 127.0.0.1 that answers, fails or stalls as the test sets `mode`"""
+
+    def __init__(self):
+        self.mode = 'ok'
+        self.price = 2345.6
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.mode == 'slow':
+                    time.sleep(1)
+                if stub.mode == 'error':
+                    self.send_error(503)
+                    return
+                body = json.dumps({"price": stub.price}).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up waiting
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/price"
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    source = StubSource()
+    yield source
+    source.close()
+
+
+def price_service(gm, stub, **options):
+    source = {"name": "Stub", "url": stub.url, "parser": lambda data: float(data['price']) if 'price' in data else None}
+    return gm.GoldPriceService([source], timeout=0.2, **options)
+
+
+def fallbacks(gm):
+    return gm.metrics._counters.get(('gold_mine_price_fallbacks_total', ()), 0)
+
+
+def test_timed_out_refresh_keeps_serving_the_last_good_quote(analyzer, stub):
+    service = price_service(analyzer, stub)
+    good = service.refresh()
+    assert (good['price'], good['source']) == (2345.6, 'Stub')
+
+    stub.mode = 'slow'
+    before = fallbacks(analyzer)
+    started = time.perf_counter()
+    quote = service.refresh()
+    assert time.perf_counter() - started < 0.9  # Gave up at the 0.2s timeout, not the stub's 1s stall
+    assert quote is good
+    assert service.breakers['Stub'].failures == 1
+    assert fallbacks(analyzer) == before + 1
+    epochs, prices = service.history.series()
+    assert prices.tolist() == [2345.6]
+
+
+def test_quotes_before_the_first_refresh_are_not_counted_as_fallbacks(analyzer, stub):
+    stub.mode = 'slow'
+    service = price_service(analyzer, stub)
+    before = fallbacks(analyzer)
+    for _ in range(100):
+        assert service.quote()['source'] == 'intelligent_simulation'
+    assert fallbacks(analyzer) == before  # The first fetch is still in flight
+
+    deadline = time.time() + 5
+    while fallbacks(analyzer) == before and time.time() < deadline:
+        time.sleep(0.01)
+    assert fallbacks(analyzer) > before  # Counted once that fetch timed out
+
+
+def test_breaker_opens_then_lets_one_trial_through_after_backoff(analyzer, stub):
+    service = price_service(analyzer, stub)
+    breaker = service.breakers['Stub']
+    stub.mode = 'error'
+    for _ in range(breaker.failure_threshold):
+        assert service.refresh()['source'] == 'intelligent_simulation'
+    assert breaker.is_open
+    service.refresh()
+    assert stub.requests == breaker.failure_threshold  # Skipped while open
+
+    # Half-open once the backoff has elapsed: one trial, whose failure reopens it for longer
+    breaker.retry_at = time.time() - 1
+    service.refresh()
+    assert stub.requests == breaker.failure_threshold + 1
+    assert breaker.is_open
+    assert breaker.retry_at - time.time() > breaker.base_delay - 1
+
+    breaker.retry_at = time.time() - 1
+    stub.mode = 'ok'
+    assert service.refresh()['source'] == 'Stub'
+    assert (breaker.failures, breaker.is_open) == (0, False)
+
+
+def test_workers_share_one_quote_and_one_refresh_lease(analyzer, stub, tmp_path):
+    path = str(tmp_path / 'production.db')
+    # A refresh holds the lease for the source timeouts plus one poll: 0.3s here
+    first = price_service(analyzer, stub, shared=analyzer.SharedQuote(path), poll_interval=0.1)
+    second = price_service(analyzer, stub, shared=analyzer.SharedQuote(path), poll_interval=0.1)
+    assert first.refresh()['price'] == 2345.6
+    assert second.refresh()['price'] == 2345.6
+    assert stub.requests == 1  # The second worker adopted the first one's fresh quote
+
+    # Once the quote is stale, only the worker holding the lease calls upstream
+    first.refresh_interval = second.refresh_interval = 0
+    stub.price = 2400.0
+    time.sleep(0.3)
+    assert second.shared.claim_refresh(0.3)
+    assert first.refresh()['price'] == 2345.6
+    assert stub.requests == 1
+    time.sleep(0.3)
+    assert first.refresh()['price'] == 2400.0
+    assert second.refresh()['price'] == 2400.0
+    assert stub.requests == 2
+
+
+def test_market_chart_labels_the_stored_tick_times(client, analyzer):
+    chart = client.get('/api/charts/market').get_json()
+    epochs, prices = analyzer.price_service.history.series()
+    assert chart['ticks'] == len(epochs) > 0
+    assert chart['labels'] == [datetime.fromtimestamp(epoch).isoformat() for epoch in epochs.tolist()]
+    assert chart['values'] == prices.tolist()
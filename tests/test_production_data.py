@@ -0,0 +1,102 @@
+"""Validation of single and bulk production uploads"""
+
+import json
+
+from conftest import ENTRY
+
+
+def test_bulk_ndjson_rejects_booleans_in_numeric_fields(client):
+    body = ''.join(json.dumps(entry) + '\n' for entry in [
+        {**ENTRY, "workers": True},
+        ENTRY,
+        {**ENTRY, "goldExtracted": False}
+    ])
+    response = client.post('/api/production-data/bulk', data=body, content_type='application/x-ndjson')
+    result = response.get_json()
+    assert result['accepted'] == 1
+    assert result['errors'] == [
+        {"row": 1, "error": "workers must be a number"},
+        {"row": 3, "error": "goldExtracted must be a number"}
+    ]
+
+
+def test_single_entry_is_recorded_with_derived_metrics(client):
+    response = client.post('/api/production-data', json={**ENTRY, "site": "North Pit"})
+    assert response.status_code == 200
+    entry = response.get_json()['productionEntry']
+    assert entry['date'] == ENTRY['date']
+    assert entry['site'] == "North Pit"
+    assert entry['workers'] == 20
+    assert entry['efficiency'] == round(30.5 / 800 * 100, 2)
+    assert entry['costPerOunce'] == round(21000 / 30.5, 2)
+
+
+def test_single_entry_rejects_invalid_fields_with_400(client):
+    cases = [
+        ({**ENTRY, "date": "garbage"}, "date"),
+        ({**ENTRY, "goldExtracted": "lots"}, "goldExtracted"),
+        ({**ENTRY, "workers": True}, "workers"),
+        ({**ENTRY, "oreProcessed": 0}, "oreProcessed"),
+        ({key: value for key, value in ENTRY.items() if key != 'shift'}, "shift")
+    ]
+    for entry, field in cases:
+        response = client.post('/api/production-data', json=entry)
+        assert response.status_code == 400, entry
+        assert field in response.get_json()['error']
+    assert client.post('/api/production-data', data='not json', content_type='application/json').status_code == 400
+
+
+def test_latest_page_returns_only_the_newest_entries(client):
+    for gold in (31.0, 32.0, 33.0):
+        assert client.post('/api/production-data', json={**ENTRY, "goldExtracted": gold}).status_code == 200
+    page = client.get('/api/production-data?latest=1&limit=2').get_json()
+    assert [entry['goldExtracted'] for entry in page['productionData']] == [32.0, 33.0]
+    assert page['nextCursor'] is None
+    
+    # Live updates then ask only for the rows added since that version
+    assert client.post('/api/production-data', json={**ENTRY, "goldExtracted": 34.0}).status_code == 200
+    delta = client.get(f"/api/production-data?since={page['version']}").get_json()
+    assert [entry['goldExtracted'] for entry in delta['productionData']] == [34.0]
+
+
+def test_labels_outside_the_known_sets_are_rejected_per_row(client, analyzer, monkeypatch):
+    known = analyzer.known_sites()
+    monkeypatch.setattr(analyzer, 'MAX_SITES', len(known) + 1)
+    body = ''.join(json.dumps(entry) + '\n' for entry in [
+        {**ENTRY, "weather": "Hail of frogs"},
+        {**ENTRY, "shift": "Graveyard"},
+        {**ENTRY, "site": "x" * (analyzer.MAX_SITE_LENGTH + 1)},
+        {**ENTRY, "site": "Cap Pit A"},
+        {**ENTRY, "site": "Cap Pit B"},
+        {**ENTRY, "site": sorted(known)[0]}
+    ])
+    result = client.post('/api/production-data/bulk', data=body, content_type='application/x-ndjson').get_json()
+    assert result['accepted'] == 2
+    assert [error['row'] for error in result['errors']] == [1, 2, 3, 5]
+    assert result['errors'][0]['error'].startswith("weather must be one of")
+    assert result['errors'][1]['error'].startswith("shift must be one of")
+    assert "at most" in result['errors'][2]['error']
+    assert result['errors'][3]['error'] == f"Too many sites (at most {len(known) + 1})"
+    assert analyzer.known_sites() == known | {"Cap Pit A"}
+    
+    response = client.post('/api/production-data', json={**ENTRY, "site": "Cap Pit C"})
+    assert response.status_code == 400
+    assert 'Too many sites' in response.get_json()['error']
+
+
+def test_bulk_upload_reports_committed_rows_when_the_log_fails(client, analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer, 'BULK_CHUNK_ROWS', 2)
+    append = analyzer.production_log.append
+    calls = []
+    
+    def failing_append(columns, labels):
+        calls.append(len(columns['goldExtracted']))
+        if len(calls) == 2:
+            raise RuntimeError("Production log unavailable: disk I/O error")
+        return append(columns, labels)
+    
+    monkeypatch.setattr(analyzer.production_log, 'append', failing_append)
+    body = ''.join(json.dumps(ENTRY) + '\n' for _ in range(5))
+    response = client.post('/api/production-data/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "Production log unavailable: disk I/O error", "accepted": 2, "rowsCommitted": 2}
@@ -0,0 +1,81 @@
+"""On-demand request profiling behind PROFILE_TOKEN"""
+
+import time
+
+import pytest
+
+TOKEN = 'test-profile-token'
+
+
+@pytest.fixture
+def profiling(analyzer, monkeypatch):
+    monkeypatch.setitem(analyzer.app.config, 'PROFILE_TOKEN', TOKEN)
+    yield
+    analyzer.profiler.arm('/api/production-data', 0)
+
+
+def test_profiling_is_off_without_a_configured_token(client):
+    assert client.get('/api/admin/profiles', headers={'X-Profile-Token': ''}).status_code == 404
+    assert 'X-Profile-Id' not in client.get('/api/gold-price', headers={'X-Profile-Token': TOKEN}).headers
+
+
+def test_admin_routes_and_profiling_need_the_token(client, profiling):
+    assert client.get('/api/admin/profiles').status_code == 403
+    assert client.get('/api/admin/profiles', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+    assert client.post('/api/admin/profiles', json={"path": "/api/gold-price"}).status_code == 403
+    assert 'X-Profile-Id' not in client.get('/api/gold-price', headers={'X-Profile-Token': 'wrong'}).headers
+    assert client.get('/api/admin/profiles', headers={'X-Profile-Token': TOKEN}).status_code == 200
+
+
+def test_profiled_request_is_listed_and_served_collapsed(client, profiling):
+    headers = {'X-Profile-Token': TOKEN}
+    response = client.get('/api/ml/scenarios', headers={**headers, 'X-Profile-Allocations': '0'})
+    assert response.status_code == 200
+    profile_id = response.headers['X-Profile-Id']
+    
+    listed = client.get('/api/admin/profiles', headers=headers).get_json()['profiles']
+    assert listed[0]['id'] == profile_id
+    assert (listed[0]['path'], listed[0]['status'], listed[0]['peakAllocatedKb']) == ('/api/ml/scenarios', 200, None)
+    
+    collapsed = client.get(f'/api/admin/profiles/{profile_id}?format=collapsed', headers=headers)
+    assert collapsed.mimetype == 'text/plain'
+    lines = collapsed.get_data(as_text=True).splitlines()
+    samples = [int(line.rsplit(' ', 1)[1]) for line in lines]
+    assert sum(samples) == listed[0]['samples']
+    details = client.get(f'/api/admin/profiles/{profile_id}', headers=headers).get_json()
+    assert sum(function['samples'] for function in details['hottestFunctions']) <= details['samples']
+    assert client.get('/api/admin/profiles/0-0', headers=headers).status_code == 404
+
+
+def test_armed_path_profiles_only_its_next_requests(client, profiling):
+    headers = {'X-Profile-Token': TOKEN}
+    assert client.post('/api/admin/profiles', json={"path": "/api/admin/profiles"}, headers=headers).status_code == 400
+    armed = client.post('/api/admin/profiles', json={"path": "/api/production-data", "count": 2, "allocations": False}, headers=headers)
+    assert armed.status_code == 202
+    assert armed.get_json()['armed'] == {"/api/production-data": {"count": 2, "allocations": False}}
+    profiled = ['X-Profile-Id' in client.get('/api/production-data?limit=1').headers for _ in range(3)]
+    assert profiled == [True, True, False]
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_collapsed_stacks_run_root_first_with_sample_counts(analyzer):
+    profile = analyzer.RequestProfile('GET', '/busy', 0.001, allocations=False)
+    profile.start()
+    busy(0.1)
+    profile.stop(200, 0)
+    assert profile.samples > 10
+    counts = {}
+    for line in profile.collapsed().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        counts[stack] = int(count)
+    assert sum(counts.values()) == profile.samples
+    # The test function calls busy(), so it sits just above it in every stack that reaches busy()
+    busy_stacks = [stack.split(';') for stack in counts if stack.split(';')[-1].startswith('busy (test_profiling.py')]
+    assert busy_stacks
+    assert all(frames[-2].startswith('test_collapsed_stacks_run_root_first_with_sample_counts') for frames in busy_stacks)
+    assert profile.details()['hottestFunctions'][0]['function'].startswith('busy (')
@@ -0,0 +1,35 @@
+"""The import + create_app() startup budget, measured in fresh interpreters"""
+
+import json
+import subprocess
+import sys
+
+from conftest import ROOT
+
+MEASURE = """
+import json
+import sys
+import gold_mine_productivity_analyzere as gm
+gm.create_app()
+print(json.dumps({
+    "seconds": gm.app.config['STARTUP_SECONDS'],
+    "budget": gm.app.config['STARTUP_BUDGET_SECONDS'],
+    "numpyLoaded": any(name in sys.modules for name in ('numpy._core', 'numpy.core'))
+}))
+"""
+
+
+def measure_startup():
+    result = subprocess.run([sys.executable, '-c', MEASURE], cwd=ROOT, capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_within_budget():
+    # Best of three, so one cold page cache on a busy machine does not fail the build
+    runs = [measure_startup() for _ in range(3)]
+    fastest = min(run['seconds'] for run in runs)
+    assert fastest < runs[0]['budget'], f"Startup took {fastest:.3f}s, over the {runs[0]['budget']}s budget"
+
+
+def test_numpy_stays_off_the_startup_path():
+    assert not measure_startup()['numpyLoaded']
@@ -0,0 +1,86 @@
+"""Streaming statistics checked against a recomputation over the raw values"""
+
+import numpy as np
+import pytest
+
+
+def window_fit(values):
+    return np.polyfit(np.arange(len(values)), values, 1)[0] if len(values) > 1 else 0.0
+
+
+def test_rolling_regression_matches_polyfit_over_its_window(analyzer):
+    values = np.random.default_rng(5).normal(100, 20, 5000) + np.arange(5000) * 0.05
+    roller = analyzer.RollingRegression(30)
+    for position, value in enumerate(values, 1):
+        roller.push(value)
+        # Past RESUM_EVERY pushes too, so the periodic exact resum is covered
+        if position in (1, 2, 15, 30, 31, 500, 4097, 5000):
+            window = values[max(position - 30, 0):position]
+            assert roller.slope == pytest.approx(window_fit(window), rel=1e-9, abs=1e-12)
+            assert roller.mean == pytest.approx(np.mean(window))
+            assert (roller.count, roller.last) == (len(window), window[-1])
+
+
+def test_rolling_regression_batches_and_windows_agree_with_polyfit(analyzer):
+    values = np.random.default_rng(6).normal(50, 5, 400)
+    engine = analyzer.TrendEngine({'goldExtracted': (7, 14, 30, 90)})
+    for chunk in np.array_split(values, [5, 6, 120, 121, 300]):
+        engine({'goldExtracted': chunk})
+    for window, trend in engine.snapshot()['goldExtracted'].items():
+        assert trend.slope == pytest.approx(window_fit(values[-window:]), rel=1e-9, abs=1e-12)
+        assert trend.count == window
+    assert analyzer.RollingRegression.fit(values[:10]).slope == pytest.approx(window_fit(values[:10]))
+
+
+def rank_errors(values, sketch, qs):
+    ordered = np.sort(values)
+    estimates = sketch.quantile(qs)
+    low = np.searchsorted(ordered, estimates, side='left') / len(values)
+    high = np.searchsorted(ordered, estimates, side='right') / len(values)
+    # A returned value that repeats spans a range of ranks; count the distance to the nearest one
+    return np.maximum(np.maximum(low - qs, qs - high), 0)
+
+
+def test_quantile_sketch_stays_within_its_rank_error_bound(analyzer):
+    qs = np.linspace(0, 1, 101)
+    values = np.random.default_rng(8).lognormal(3, 1, 100000)
+    sketch = analyzer.QuantileSketch(200)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+    assert sketch.count == len(values)
+    assert sum(len(items) for items in sketch.levels) < 3 * sketch.k  # Bounded by k, not the row count
+    assert rank_errors(values, sketch, qs).max() < 0.02  # ~1.7/k, with headroom for the random offsets
+    assert sketch.quantile(0.5) == sketch.quantile(qs)[50]
+
+
+def test_merged_quantile_sketches_keep_the_bound(analyzer):
+    qs = np.linspace(0, 1, 101)
+    rng = np.random.default_rng(9)
+    # Partitions with different distributions, so the merge has to interleave them
+    parts = [rng.normal(100, 10, 30000), rng.uniform(0, 50, 20000), rng.exponential(40, 50000)]
+    merged = analyzer.QuantileSketch(200)
+    for part in parts:
+        sketch = analyzer.QuantileSketch(200)
+        sketch.update(part)
+        merged.merge(sketch)
+    values = np.concatenate(parts)
+    assert merged.count == len(values)
+    assert rank_errors(values, merged, qs).max() < 0.02
+    assert np.isnan(analyzer.QuantileSketch().quantile(0.5))
+
+
+def test_top_k_matches_a_full_sort(analyzer):
+    rng = np.random.default_rng(10)
+    values = rng.normal(30, 8, 20000)
+    cost = rng.uniform(1000, 5000, len(values))
+    first, second = analyzer.TopK(10, payload=('cost',)), analyzer.TopK(10, payload=('cost',))
+    for rows in np.array_split(np.arange(len(values)), 23):
+        target = first if rows[0] < len(values) // 2 else second
+        target.update(values[rows], rows, {'cost': cost[rows]})
+    first.merge(second)
+    
+    expected = np.argsort(values)[::-1][:10]
+    order = np.argsort(first.values)[::-1]
+    assert first.rows[order].tolist() == expected.tolist()
+    assert first.values[order].tolist() == values[expected].tolist()
+    assert first.payload['cost'][order].tolist() == cost[expected].tolist()